@@ -5,6 +5,8 @@ Sistema ERP Educativo para estudiantes
 
 from routes import auth, profesor, estudiante
 from models import Usuario
+from utils.usuario_actual import cargar_usuario_actual
+from utils.perf_consultas import iniciar_monitor_consultas
 from flask import Flask, render_template, redirect, url_for
 from flask_login import LoginManager, current_user
 from werkzeug.security import generate_password_hash
@@ -43,10 +45,13 @@ app.register_blueprint(auth.bp)
 app.register_blueprint(profesor.bp)
 app.register_blueprint(estudiante.bp)
 
+# Conteo de consultas SQL por solicitud y presupuestos por endpoint
+iniciar_monitor_consultas(app)
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
+    return cargar_usuario_actual(user_id)
 
 
 @app.route('/')
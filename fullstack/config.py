@@ -2,6 +2,7 @@
 Archivo de configuración centralizado
 """
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -45,6 +46,20 @@ class Config:
 
     # Simulación
     DIAS_MAXIMOS_SIMULACION = 56
+    # Sello de versión de la simulación activa (compartido por los procesos del servidor)
+    SIMULACION_VERSION_FILE = os.environ.get('SIMULACION_VERSION_FILE') or os.path.join(
+        tempfile.gettempdir(), 'supply_chain_simulacion.version')
+    # Versiones de escritura por empresa para la caché de respuestas de APIs
+    RESPUESTAS_VERSION_DIR = os.environ.get('RESPUESTAS_VERSION_DIR') or os.path.join(
+        tempfile.gettempdir(), 'supply_chain_respuestas')
+    # Versiones de los campos de autorización cacheados por usuario (rol, empresa, activo)
+    USUARIOS_VERSION_DIR = os.environ.get('USUARIOS_VERSION_DIR') or os.path.join(
+        tempfile.gettempdir(), 'supply_chain_usuarios')
+    # Broker opcional para eventos SSE entre workers (redis://...); vacío = solo en el proceso
+    EVENTOS_REDIS_URL = os.environ.get('EVENTOS_REDIS_URL')
+    # Conexiones SSE abiertas por proceso; cada una ocupa un hilo del worker
+    # (dejar la mayoría de los --threads del Procfile para el resto de solicitudes)
+    EVENTOS_MAXIMO_CONEXIONES = int(os.environ.get('EVENTOS_MAXIMO_CONEXIONES', 8))
     CAPITAL_INICIAL_DEFAULT = 50000000.0
     # Parámetros de inventario por defecto
     INVENTARIO_INICIAL_DEFAULT = 120
@@ -56,6 +71,30 @@ class Config:
     COSTO_FALTANTE_POR_UNIDAD = 10.0  # Penalización por venta perdida
     TASA_MANTENIMIENTO_INVENTARIO_ANUAL = 0.20  # 20% anual
     BASE_DIAS_MANTENIMIENTO = 365
+    COSTO_PEDIDO_COMPRA = 50000.0  # Costo de referencia por orden (solo analítica EOQ)
+
+    # Pronósticos precalculados al cierre de cada día (Planeación / MRP)
+    SNAPSHOTS_PRONOSTICO_ACTIVOS = True
+    # Parte estática del dashboard general precalculada al cierre de cada día
+    SNAPSHOTS_DASHBOARD_ACTIVOS = True
+    # Reparto de la demanda del mercado entre empresas por precio y stock (False: demanda completa para cada una)
+    DEMANDA_COMPETITIVA_ACTIVA = False
+
+    # Monitor de consultas SQL por solicitud (/profesor/perf)
+    PERF_CONSULTAS_ACTIVO = True
+    PERF_UMBRAL_REPETICIONES = 5  # Misma sentencia repetida en una solicitud: posible N+1
+    # Máximo de consultas por solicitud (con cachés frías) de los endpoints más visitados
+    PERF_PRESUPUESTOS_CONSULTAS = {
+        'estudiante.dashboard_general': 25,
+        'estudiante.api_logistica_transito': 6,
+        'estudiante.api_ventas_dashboard': 8,
+        'estudiante.api_ventas_analisis_regiones': 14,
+        'estudiante.api_logistica_fill_rate_region': 8,
+        'estudiante.api_ventas_matriz_precios': 5,
+        'estudiante.api_ventas_competitividad': 6,
+        'estudiante.api_logistica_movimientos': 3,
+    }
+    PERF_PRESUPUESTOS_ESTRICTOS = False  # True: exceder un presupuesto lanza una excepción
 
     # Paginación
     ITEMS_POR_PAGINA = 20
@@ -90,6 +129,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PERF_PRESUPUESTOS_ESTRICTOS = True
 
 
 class DevelopmentConfig(Config):
@@ -113,6 +153,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
     WTF_CSRF_ENABLED = False
+    PERF_PRESUPUESTOS_ESTRICTOS = True
 
 
 # Diccionario de configuraciones
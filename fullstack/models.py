@@ -348,6 +348,11 @@ class MovimientoInventario(db.Model):
     compra = db.relationship('Compra', backref='movimiento_inventario')
     venta = db.relationship('Venta', backref='movimiento_inventario')
     
+    __table_args__ = (
+        # Libro por empresa paginado por cursor (created_at, id)
+        db.Index('ix_movimientos_inventario_emp_fecha_id', 'empresa_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<MovimientoInventario {self.tipo_movimiento} - {self.cantidad} unidades>'
 
@@ -471,3 +476,149 @@ class DisponibilidadVehiculo(db.Model):
 
     def __repr__(self):
         return f'<DisponibilidadVehiculo {self.vehiculo_id} - Empresa {self.empresa_id} - Libre el día {self.dia_disponible_retorno}>'
+
+
+class AprobacionVentaDiaria(db.Model):
+    """Cantidad aprobada por Ventas por día, producto y región (la Decision queda como auditoría)"""
+    __tablename__ = 'aprobaciones_venta_diaria'
+
+    id = db.Column(db.Integer, primary_key=True)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    dia_simulacion = db.Column(db.Integer, nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    region = db.Column(db.String(50), nullable=False)
+    cantidad_solicitada = db.Column(db.Integer, default=0)
+    cantidad_aprobada = db.Column(db.Integer, nullable=False, default=0)
+    decision_id = db.Column(db.Integer, db.ForeignKey('decisiones.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('empresa_id', 'dia_simulacion', 'producto_id', 'region', name='uq_aprobacion_emp_dia_prod_region'),
+    )
+
+    def __repr__(self):
+        return f'<AprobacionVentaDiaria emp={self.empresa_id} dia={self.dia_simulacion} prod={self.producto_id} reg={self.region}>'
+
+
+class EstadoVehiculo(db.Model):
+    """Estado vigente de cada vehículo propio (una fila por empresa y vehículo)"""
+    __tablename__ = 'estado_vehiculos'
+
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), primary_key=True)
+    vehiculo_id = db.Column(db.String(50), primary_key=True)
+    dia_disponible_retorno = db.Column(db.Integer, nullable=False, default=0)  # Ocupado hasta este día inclusive
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<EstadoVehiculo {self.vehiculo_id} - Empresa {self.empresa_id} - Retorno día {self.dia_disponible_retorno}>'
+
+
+class PronosticoSnapshot(db.Model):
+    """Pronóstico precalculado al cierre del día por empresa y producto"""
+    __tablename__ = 'pronosticos_snapshot'
+
+    id = db.Column(db.Integer, primary_key=True)
+    simulacion_id = db.Column(db.Integer, db.ForeignKey('simulacion.id'), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    dia_base = db.Column(db.Integer, nullable=False)  # Último día con datos reales usados
+
+    metodos = db.Column(db.JSON)  # Resultados de comparar_metodos por método base
+    mejor_metodo = db.Column(db.String(50))  # Según obtener_mejor_metodo (MAPE)
+    pronostico_diario = db.Column(db.Float, default=0)  # Pronóstico del mejor método para dia_base + 1
+    proyeccion = db.Column(db.JSON)  # Demanda proyectada para los 7 días siguientes
+    demanda_promedio = db.Column(db.Float, default=0)  # Promedio diario de la serie usada
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('simulacion_id', 'empresa_id', 'producto_id', 'dia_base', name='uq_snapshot_sim_emp_prod_dia'),
+    )
+
+    def __repr__(self):
+        return f'<PronosticoSnapshot empresa={self.empresa_id} prod={self.producto_id} dia={self.dia_base} {self.mejor_metodo}>'
+
+
+class PrecisionPronostico(db.Model):
+    """Precisión realizada de los pronósticos guardados, acumulada por empresa y método"""
+    __tablename__ = 'precision_pronosticos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    simulacion_id = db.Column(db.Integer, db.ForeignKey('simulacion.id'), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    metodo_usado = db.Column(db.String(50), nullable=False)
+
+    observaciones = db.Column(db.Integer, default=0)  # Pronósticos comparados contra demanda real
+    observaciones_porcentuales = db.Column(db.Integer, default=0)  # Solo días con demanda real > 0
+    suma_error_absoluto = db.Column(db.Float, default=0)  # Base para MAD
+    suma_error_porcentual = db.Column(db.Float, default=0)  # Base para MAPE
+    suma_error = db.Column(db.Float, default=0)  # Pronosticado - real, base para el sesgo
+    mape_movil = db.Column(db.Float)  # MAPE suavizado exponencialmente (pesa más lo reciente)
+    ultimo_dia = db.Column(db.Integer)  # Último día evaluado
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('simulacion_id', 'empresa_id', 'metodo_usado', name='uq_precision_sim_emp_metodo'),
+    )
+
+    @property
+    def mad(self):
+        return (self.suma_error_absoluto or 0) / self.observaciones if self.observaciones else 0.0
+
+    @property
+    def mape(self):
+        if not self.observaciones_porcentuales:
+            return 0.0
+        return (self.suma_error_porcentual or 0) / self.observaciones_porcentuales
+
+    @property
+    def sesgo(self):
+        return (self.suma_error or 0) / self.observaciones if self.observaciones else 0.0
+
+    def __repr__(self):
+        return f'<PrecisionPronostico empresa={self.empresa_id} {self.metodo_usado} n={self.observaciones}>'
+
+
+class DashboardSnapshot(db.Model):
+    """Parte estática del dashboard general calculada al cierre del día por empresa"""
+    __tablename__ = 'dashboard_snapshot'
+
+    id = db.Column(db.Integer, primary_key=True)
+    simulacion_id = db.Column(db.Integer, db.ForeignKey('simulacion.id'), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    dia_simulacion = db.Column(db.Integer, nullable=False)  # Día actual para el que se armó el resumen
+    datos = db.Column(db.JSON)  # Métricas, acumulados, ventas del día e histórico operativo
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('simulacion_id', 'empresa_id', 'dia_simulacion', name='uq_dashboard_snapshot_sim_emp_dia'),
+    )
+
+    def __repr__(self):
+        return f'<DashboardSnapshot empresa={self.empresa_id} dia={self.dia_simulacion}>'
+
+
+class PrecioEmpresaProducto(db.Model):
+    """Libro de precios de venta por empresa y producto (opcionalmente por región), vigente desde un día"""
+    __tablename__ = 'precios_empresa_producto'
+
+    id = db.Column(db.Integer, primary_key=True)
+    simulacion_id = db.Column(db.Integer, db.ForeignKey('simulacion.id'), nullable=False)
+    empresa_id = db.Column(db.Integer, db.ForeignKey('empresas.id'), nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    region = db.Column(db.String(50), nullable=True)  # None: aplica a todas las regiones
+    dia_efectivo = db.Column(db.Integer, nullable=False)  # Primer día de ventas con este precio
+    precio = db.Column(db.Float, nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_precios_empresa_producto_sim_emp_dia', 'simulacion_id', 'empresa_id', 'dia_efectivo'),
+    )
+
+    def __repr__(self):
+        return f'<PrecioEmpresaProducto empresa={self.empresa_id} prod={self.producto_id} reg={self.region} dia={self.dia_efectivo} ${self.precio}>'
@@ -3,16 +3,18 @@ Rutas para el rol Estudiante
 Dashboard diferenciado seg�n rol: Ventas, Planeaci�n, Compras, Log�stica
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
 import csv
 import io
+import threading
 from types import SimpleNamespace
+import numpy as np
 from sqlalchemy import func
-from models import (Usuario, Empresa, Simulacion, Inventario, Venta, Compra, Decision,
+from models import (Usuario, Empresa, Inventario, Venta, Compra, Decision,
                     Producto, Pronostico, RequerimientoCompra, MovimientoInventario, DespachoRegional,
-                    DisrupcionEmpresa, DemandaMercadoDiaria, DisponibilidadVehiculo)
+                    DisrupcionEmpresa, DemandaMercadoDiaria, AprobacionVentaDiaria)
 from extensions import db
 from datetime import datetime
 from utils.pronosticos import (
@@ -27,24 +29,30 @@ from utils.logistica import (
     calcular_tiempo_entrega_region, procesar_recepcion_compra, validar_despacho_region,
     distribuir_stock_por_demanda, analizar_cobertura_regional, generar_alertas_logistica,
     sugerir_redistribucion, calcular_stock_disponible_despacho,
-    obtener_ciclo_region, seleccionar_vehiculos_optimos
+    obtener_ciclo_region, seleccionar_vehiculos_optimos, optimizar_asignacion_flota,
+    planificar_flota_horizonte, planificar_redistribucion, movimientos_redistribucion,
+    tarifa_transporte_region, ESTADOS_COBERTURA, VEHICULOS_LOGISTICA
+)
+from utils.contexto_solicitud import contexto_solicitud
+from utils.flota import obtener_ocupacion_flota, dia_retorno_vehiculo, registrar_uso_vehiculos
+from utils.recepciones import recibir_compras_lote
+from utils.transito import obtener_pipeline_transito
+from utils.snapshots_dashboard import obtener_snapshot_dashboard
+from utils.precios import (
+    obtener_ultimos_precios_region, obtener_empresas_con_stock, obtener_stock_empresa,
+    cargar_precios_simulacion, obtener_mapa_precios_empresa, precio_vigente, registrar_precios
+)
+from utils.cache_respuestas import respuesta_cacheada_por_dia
+from utils.movimientos import (
+    LIMITE_PAGINA_DEFECTO, pagina_movimientos, serializar_movimiento, exportar_movimientos_csv
+)
+from utils.eventos import flujo_eventos
+from utils.despachos import (
+    cargar_contexto_despacho, validar_asignaciones_despacho, revisar_asignaciones_despacho,
+    calcular_despachos, resumir_simulacion_despacho, registrar_despachos
 )
-from utils.parametros_iniciales import FLOTA_VEHICULOS
 bp = Blueprint('estudiante', __name__, url_prefix='/estudiante')
 
-# Tarifa base de transporte por unidad según región (flota propia).
-TARIFA_TRANSPORTE_POR_REGION = {
-    'Andina': 500,
-    'Pacífica': 1000,
-    'Caribe': 1000,
-    'Orinoquía': 1500,
-    'Amazonía': 2000,
-}
-
-
-def _tarifa_transporte_region(region):
-    """Retorna la tarifa base por unidad para la región dada."""
-    return float(TARIFA_TRANSPORTE_POR_REGION.get(region, 1000))
 ROL_PLANEACION_COMPRAS = 'compras'
 
 REGIONES_CANONICAS = [
@@ -97,46 +105,13 @@ PROVEEDORES_COMPRA = {
     },
 }
 
-VEHICULOS_LOGISTICA = {
-    codigo: {
-        'nombre': f'Vehículo {codigo}',
-        'capacidad': conf.get('capacidad'),
-        'externo': bool(conf.get('por_unidad', False)),
-    }
-    for codigo, conf in FLOTA_VEHICULOS.items()
-    if codigo != 'V_EXTERNO'
-}
-VEHICULOS_LOGISTICA['EXTERNO'] = {
-    'nombre': 'Vehículo externo',
-    'capacidad': None,
-    'externo': True,
-}
-
 
 def _disrupcion_falla_flota_activa(simulacion, empresa_id):
-    if not simulacion:
-        return False
-
-    return DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa_id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.disrupcion_key == 'falla_flota',
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida != None,
-    ).first() is not None
+    return 'falla_flota' in contexto_solicitud().disrupciones_activas(simulacion, empresa_id)
 
 
 def _opcion_falla_flota(simulacion, empresa_id):
-    if not simulacion:
-        return None
-
-    dis = DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa_id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.disrupcion_key == 'falla_flota',
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida != None,
-    ).first()
+    dis = contexto_solicitud().disrupciones_activas(simulacion, empresa_id).get('falla_flota')
     return dis.opcion_elegida if dis else None
 
 
@@ -155,16 +130,8 @@ def _obtener_capacidades_vehiculos(simulacion, empresa_id):
 
     # Marcar vehículos ocupados por ciclo de uso.
     if simulacion:
-        ocupados = db.session.query(
-            DisponibilidadVehiculo.vehiculo_id,
-            db.func.max(DisponibilidadVehiculo.dia_disponible_retorno).label('dia_retorno')
-        ).filter(
-            DisponibilidadVehiculo.empresa_id == empresa_id,
-            DisponibilidadVehiculo.dia_disponible_retorno >= simulacion.dia_actual,
-        ).group_by(
-            DisponibilidadVehiculo.vehiculo_id
-        ).all()
-        for vehiculo_id, dia_retorno in ocupados:
+        ocupados = obtener_ocupacion_flota(empresa_id, simulacion.dia_actual)
+        for vehiculo_id, dia_retorno in ocupados.items():
             if vehiculo_id in catalogo:
                 catalogo[vehiculo_id]['disponible'] = False
                 catalogo[vehiculo_id]['dia_retorno'] = int(dia_retorno)
@@ -214,29 +181,11 @@ def _pedido_minimo_externo(producto):
 
 def _disrupcion_retraso_proveedor_activa(simulacion, empresa_id):
     """Indica si la disrupción de retraso de proveedor está activa para la empresa."""
-    if not simulacion:
-        return False
-
-    return DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa_id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.disrupcion_key == 'retraso_proveedor',
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida != None,
-    ).first() is not None
+    return 'retraso_proveedor' in contexto_solicitud().disrupciones_activas(simulacion, empresa_id)
 
 
 def _opcion_retraso_proveedor(simulacion, empresa_id):
-    if not simulacion:
-        return None
-
-    dis = DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa_id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.disrupcion_key == 'retraso_proveedor',
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida != None,
-    ).first()
+    dis = contexto_solicitud().disrupciones_activas(simulacion, empresa_id).get('retraso_proveedor')
     return dis.opcion_elegida if dis else None
 
 
@@ -270,6 +219,15 @@ def _calcular_lead_time_compra(producto, proveedor, dis_retraso_activa):
     )
 
 
+def _multiplo_pedido(producto):
+    """Múltiplo de pedido según presentación: 30 para 750mL, 20 para 1L, 1 en otro caso."""
+    if '750' in producto.codigo:
+        return 30
+    if '1L' in producto.codigo or 'L' in producto.codigo.upper():
+        return 20
+    return 1
+
+
 def _validar_multiplos_pedido(producto, cantidad):
     """
     Valida que la cantidad sea múltiplo correcto según tamaño del producto.
@@ -278,11 +236,12 @@ def _validar_multiplos_pedido(producto, cantidad):
     Retorna: (es_valido, mensaje)
     """
     cantidad_int = int(cantidad) if cantidad == int(cantidad) else cantidad
-    
-    if '750' in producto.codigo:
+    multiplo = _multiplo_pedido(producto)
+
+    if multiplo == 30:
         if cantidad_int % 30 != 0:
             return False, f"Productos de 750mL deben pedirse en múltiplos de 30 (ingresaste {cantidad_int})"
-    elif '1L' in producto.codigo or 'L' in producto.codigo.upper():
+    elif multiplo == 20:
         if cantidad_int % 20 != 0:
             return False, f"Productos de 1L deben pedirse en múltiplos de 20 (ingresaste {cantidad_int})"
     
@@ -340,7 +299,7 @@ def _calcular_condiciones_compra(producto, cantidad, simulacion, empresa_id, pro
 
 def obtener_simulacion_activa():
     """Helper para obtener la simulaci�n actualmente activa"""
-    return Simulacion.query.filter_by(activa=True).first()
+    return contexto_solicitud().simulacion
 
 def estudiante_required(f):
     """Decorador para verificar que el usuario sea estudiante"""
@@ -382,13 +341,26 @@ def home():
                 'rol': current_user.rol
             })
     
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     return render_template('estudiante/home.html',
                          empresas_acceso=empresas_acceso,
                          simulacion=simulacion)
 
 
+# Disrupciones que solo ve el rol responsable de responderlas
+DISRUPCION_ROL_RESPONSABLE = {
+    'retraso_proveedor': 'compras',
+    'aumento_demanda': 'ventas',
+    'falla_flota': 'logistica',
+}
+
+
+def _disrupcion_visible_para_rol(disrupcion_key, rol):
+    responsable = DISRUPCION_ROL_RESPONSABLE.get(disrupcion_key)
+    return responsable is None or responsable == rol
+
+
 @bp.route('/dashboard')
 @login_required
 @estudiante_required
@@ -415,7 +387,7 @@ def dashboard_general():
         flash('?? No tienes una empresa asignada. Contacta con tu profesor.', 'warning')
         return redirect(url_for('estudiante.home'))
     
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     if not simulacion:
         flash('No existe una simulaci�n activa', 'error')
@@ -424,56 +396,25 @@ def dashboard_general():
     from utils.procesamiento_dias import asegurar_metricas_base_dia_uno
     asegurar_metricas_base_dia_uno(simulacion, commit=True)
     
-    # Obtener datos generales
+    # Parte estática del tablero (calculada al cierre del día)
+    resumen = obtener_snapshot_dashboard(simulacion, empresa.id, commit=True)
+
+    # Datos vivos: inventario, pronósticos, compras y movimientos del día
     productos = Producto.query.filter_by(activo=True).all()
     inventarios = Inventario.query.filter_by(empresa_id=empresa.id).all()
     
-    # Ventas del d�a actual
-    ventas_dia = Venta.query.filter_by(
-        empresa_id=empresa.id,
-        semana_simulacion=simulacion.dia_actual
-    ).all()
-    
-    # M�trica del d�a
-    from models import Metrica
-    metrica_hoy = Metrica.query.filter_by(
-        empresa_id=empresa.id,
-        semana_simulacion=simulacion.dia_actual
-    ).first()
-    if not metrica_hoy:
-        metrica_hoy = Metrica.query.filter(
-            Metrica.empresa_id == empresa.id,
-            Metrica.semana_simulacion <= simulacion.dia_actual
-        ).order_by(Metrica.semana_simulacion.desc()).first()
-    if not metrica_hoy:
-        metrica_hoy = SimpleNamespace(
-            ingresos=0,
-            costos=0,
-            utilidad=0,
-            nivel_servicio=100.0,
-            rotacion_inventario=0,
-            market_share=0,
-        )
-
-    metricas_acumuladas = Metrica.query.filter(
-        Metrica.empresa_id == empresa.id,
-        Metrica.semana_simulacion >= 1,
-        Metrica.semana_simulacion <= simulacion.dia_actual,
-    ).all()
-    ingresos_acumulados = sum(m.ingresos or 0 for m in metricas_acumuladas)
-    costos_acumulados = sum(m.costos or 0 for m in metricas_acumuladas)
-    utilidad_acumulada = sum(m.utilidad or 0 for m in metricas_acumuladas)
-    
     # Pron�sticos activos
     pronosticos_activos = Pronostico.query.filter_by(
         empresa_id=empresa.id
     ).count()
     
-    # �rdenes en tr�nsito
-    ordenes_transito = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).count()
+    # �rdenes en tr�nsito y pr�ximas a llegar (desde el pipeline cacheado)
+    compras_transito = obtener_pipeline_transito(empresa.id, simulacion.dia_actual)['compras']
+    ordenes_transito = len(compras_transito)
+    ordenes_proximas = [
+        compra for compra in compras_transito
+        if compra.semana_entrega <= simulacion.dia_actual + 21
+    ][:5]
     
     # Requerimientos pendientes
     requerimientos_pendientes = RequerimientoCompra.query.filter_by(
@@ -488,111 +429,6 @@ def dashboard_general():
     movimientos_recientes = MovimientoInventario.query.filter_by(
         empresa_id=empresa.id
     ).order_by(MovimientoInventario.created_at.desc()).limit(10).all()
-    
-    # �rdenes pr�ximas a llegar (pr�ximos 3 d�as)
-    ordenes_proximas = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).filter(
-        Compra.semana_entrega <= simulacion.dia_actual + 21
-    ).order_by(Compra.semana_entrega).limit(5).all()
-
-    # Histórico operativo desde el día 1 (sin mezclar histórico negativo).
-    dia_actual = int(simulacion.dia_actual or 1)
-    dias_periodo = list(range(1, dia_actual + 1))
-
-    demanda_rows = db.session.query(
-        DemandaMercadoDiaria.dia_simulacion,
-        DemandaMercadoDiaria.producto_id,
-        func.sum(DemandaMercadoDiaria.demanda_base).label('demanda_total')
-    ).filter(
-        DemandaMercadoDiaria.simulacion_id == simulacion.id,
-        DemandaMercadoDiaria.dia_simulacion >= 1,
-        DemandaMercadoDiaria.dia_simulacion <= dia_actual,
-    ).group_by(
-        DemandaMercadoDiaria.dia_simulacion,
-        DemandaMercadoDiaria.producto_id,
-    ).all()
-
-    ventas_rows = db.session.query(
-        Venta.semana_simulacion,
-        Venta.producto_id,
-        func.sum(Venta.cantidad_solicitada).label('pedidos_total'),
-        func.sum(Venta.cantidad_vendida).label('vendidas_total'),
-        func.sum(Venta.cantidad_perdida).label('perdidas_total'),
-        func.sum(Venta.ingreso_total).label('ingresos_total')
-    ).filter(
-        Venta.empresa_id == empresa.id,
-        Venta.semana_simulacion >= 1,
-        Venta.semana_simulacion <= dia_actual,
-    ).group_by(
-        Venta.semana_simulacion,
-        Venta.producto_id,
-    ).all()
-
-    demanda_por_dia = {d: 0 for d in dias_periodo}
-    pedidos_por_dia = {d: 0 for d in dias_periodo}
-    vendidas_por_dia = {d: 0 for d in dias_periodo}
-    perdidas_por_dia = {d: 0 for d in dias_periodo}
-    ingresos_por_dia = {d: 0 for d in dias_periodo}
-
-    demanda_por_dia_producto = {}
-    for row in demanda_rows:
-        d = int(row.dia_simulacion)
-        p = int(row.producto_id)
-        demanda_valor = int(round(row.demanda_total or 0))
-        demanda_por_dia_producto[(d, p)] = demanda_valor
-        if d in demanda_por_dia:
-            demanda_por_dia[d] += demanda_valor
-
-    ventas_por_dia_producto = {}
-    for row in ventas_rows:
-        d = int(row.semana_simulacion)
-        p = int(row.producto_id)
-        pedidos_valor = int(round(row.pedidos_total or 0))
-        vendidas_valor = int(round(row.vendidas_total or 0))
-        perdidas_valor = int(round(row.perdidas_total or 0))
-        ingresos_valor = float(row.ingresos_total or 0)
-        ventas_por_dia_producto[(d, p)] = {
-            'pedidos_demandados': pedidos_valor,
-            'unidades_vendidas': vendidas_valor,
-            'unidades_perdidas': perdidas_valor,
-            'ingresos': ingresos_valor,
-        }
-        if d in pedidos_por_dia:
-            pedidos_por_dia[d] += pedidos_valor
-            vendidas_por_dia[d] += vendidas_valor
-            perdidas_por_dia[d] += perdidas_valor
-            ingresos_por_dia[d] += ingresos_valor
-
-    historico_operacion = []
-    producto_nombre_map = {p.id: p.nombre for p in productos}
-    producto_ids_ordenados = sorted(producto_nombre_map.keys(), key=lambda pid: producto_nombre_map[pid])
-    for d in reversed(dias_periodo):
-        for pid in producto_ids_ordenados:
-            demanda_base = demanda_por_dia_producto.get((d, pid), 0)
-            venta_item = ventas_por_dia_producto.get((d, pid), {})
-            pedidos_demandados = int(venta_item.get('pedidos_demandados', 0))
-            unidades_vendidas = int(venta_item.get('unidades_vendidas', 0))
-            unidades_perdidas = int(venta_item.get('unidades_perdidas', 0))
-            ingresos = float(venta_item.get('ingresos', 0))
-
-            if demanda_base <= 0 and pedidos_demandados <= 0 and unidades_vendidas <= 0 and unidades_perdidas <= 0 and ingresos <= 0:
-                continue
-
-            historico_operacion.append({
-                'dia': d,
-                'producto': producto_nombre_map.get(pid, f'Producto {pid}'),
-                'demanda_base': demanda_base,
-                'pedidos_demandados': pedidos_demandados,
-                'unidades_vendidas': unidades_vendidas,
-                'unidades_perdidas': unidades_perdidas,
-                'ingresos': ingresos,
-            })
-
-    total_ventas_periodo = sum(vendidas_por_dia.values())
-    ingresos_periodo = sum(ingresos_por_dia.values())
-    promedio_diario_periodo = (total_ventas_periodo / len(dias_periodo)) if dias_periodo else 0
 
     # --- DISRUPCIONES ---
     # Garantizar que esta empresa tenga sus disrupciones creadas y expiradas
@@ -603,68 +439,25 @@ def dashboard_general():
     if expiradas or nuevas_disrupciones:
         db.session.commit()
 
-    # Disrupción activa sin respuesta (muestra el modal)
-    disrupcion_pendiente_query = DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa.id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida == None
-    )
-    if current_user.rol != 'compras':
-        disrupcion_pendiente_query = disrupcion_pendiente_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'retraso_proveedor'
-        )
-    if current_user.rol != 'ventas':
-        disrupcion_pendiente_query = disrupcion_pendiente_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'aumento_demanda'
-        )
-    if current_user.rol != 'logistica':
-        disrupcion_pendiente_query = disrupcion_pendiente_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'falla_flota'
-        )
-    disrupcion_pendiente = disrupcion_pendiente_query.first()
-
-    # Disrupciones recién expiradas cuya notificación de cierre aún no se vio
-    disrupciones_finalizadas_query = DisrupcionEmpresa.query.filter(
-        DisrupcionEmpresa.empresa_id == empresa.id,
-        DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.activa == False,
-        DisrupcionEmpresa.notificacion_fin_vista == False
-    )
-    if current_user.rol != 'compras':
-        disrupciones_finalizadas_query = disrupciones_finalizadas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'retraso_proveedor'
-        )
-    if current_user.rol != 'ventas':
-        disrupciones_finalizadas_query = disrupciones_finalizadas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'aumento_demanda'
-        )
-    if current_user.rol != 'logistica':
-        disrupciones_finalizadas_query = disrupciones_finalizadas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'falla_flota'
-        )
-    disrupciones_finalizadas = disrupciones_finalizadas_query.all()
-
-    # Disrupciones activas con decisi�n ya tomada (para info en dashboard)
-    disrupciones_activas_query = DisrupcionEmpresa.query.filter(
+    # Disrupciones de la empresa visibles para el rol (una sola consulta)
+    disrupcion_pendiente = None
+    disrupciones_finalizadas = []
+    disrupciones_activas = []
+    for dis in DisrupcionEmpresa.query.filter(
         DisrupcionEmpresa.empresa_id == empresa.id,
         DisrupcionEmpresa.simulacion_id == simulacion.id,
-        DisrupcionEmpresa.activa == True,
-        DisrupcionEmpresa.opcion_elegida != None
-    )
-    if current_user.rol != 'compras':
-        disrupciones_activas_query = disrupciones_activas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'retraso_proveedor'
-        )
-    if current_user.rol != 'ventas':
-        disrupciones_activas_query = disrupciones_activas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'aumento_demanda'
-        )
-    if current_user.rol != 'logistica':
-        disrupciones_activas_query = disrupciones_activas_query.filter(
-            DisrupcionEmpresa.disrupcion_key != 'falla_flota'
-        )
-    disrupciones_activas = disrupciones_activas_query.all()
+    ).order_by(DisrupcionEmpresa.id).all():
+        if not _disrupcion_visible_para_rol(dis.disrupcion_key, current_user.rol):
+            continue
+        if dis.activa and dis.opcion_elegida is None:
+            # Disrupción activa sin respuesta (muestra el modal)
+            disrupcion_pendiente = disrupcion_pendiente or dis
+        elif dis.activa:
+            # Disrupciones activas con decisi�n ya tomada (para info en dashboard)
+            disrupciones_activas.append(dis)
+        elif dis.notificacion_fin_vista == False:
+            # Disrupciones recién expiradas cuya notificación de cierre aún no se vio
+            disrupciones_finalizadas.append(dis)
 
     # Cargar definiciones del cat�logo para el template
     from utils.catalogo_disrupciones import CATALOGO_DISRUPCIONES, get_disrupcion
@@ -674,21 +467,13 @@ def dashboard_general():
                          simulacion=simulacion,
                          productos=productos,
                          inventarios=inventarios,
-                         ventas_dia=ventas_dia,
-                         metrica_hoy=metrica_hoy,
                          pronosticos_activos=pronosticos_activos,
                          ordenes_transito=ordenes_transito,
                          requerimientos_pendientes=requerimientos_pendientes,
                          alertas_inventario=alertas_inventario,
                          movimientos_recientes=movimientos_recientes,
                          ordenes_proximas=ordenes_proximas,
-                         historico_operacion=historico_operacion,
-                         ingresos_acumulados=ingresos_acumulados,
-                         costos_acumulados=costos_acumulados,
-                         utilidad_acumulada=utilidad_acumulada,
-                         total_ventas_periodo=total_ventas_periodo,
-                         ingresos_periodo=ingresos_periodo,
-                         promedio_diario_periodo=promedio_diario_periodo,
+                         **resumen,
                          disrupcion_pendiente=disrupcion_pendiente,
                          disrupciones_finalizadas=disrupciones_finalizadas,
                          disrupciones_activas=disrupciones_activas,
@@ -701,7 +486,7 @@ def dashboard_general():
 def responder_disrupcion():
     """Registra la opcion elegida por el equipo ante una disrupcion."""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
 
     disrupcion_id = request.form.get('disrupcion_id', type=int)
     opcion = request.form.get('opcion', '').upper()
@@ -739,6 +524,7 @@ def responder_disrupcion():
     dis.opcion_elegida = opcion
     dis.usuario_decision_id = current_user.id
     dis.fecha_decision = datetime.utcnow()
+    contexto_solicitud().invalidar_disrupciones()
 
     # Efecto inmediato disrupcion 2 Opcion A: auto-generar orden de compra adicional
     if (opcion == 'A' and dis.disrupcion_key == 'aumento_demanda'
@@ -857,7 +643,7 @@ def marcar_disrupcion_fin_vista():
 @estudiante_required
 @rol_required('ventas')
 def dashboard_ventas():
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     return render_template('estudiante/ventas/dashboard.html',
@@ -867,31 +653,7 @@ def dashboard_ventas():
 
 def _obtener_aprobaciones_ventas_dia(empresa_id, dia_simulacion):
     """Obtiene mapa de aprobaciones guardadas por Ventas para el día actual."""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
-
-    query = Decision.query.filter_by(
-        empresa_id=empresa_id,
-        tipo_decision='ventas_aprobacion_diaria',
-        semana_simulacion=dia_simulacion
-    )
-
-    # Aislar decisiones de ventas a la simulación activa (evita arrastre entre reinicios).
-    if simulacion and simulacion.fecha_inicio:
-        query = query.filter(Decision.created_at >= simulacion.fecha_inicio)
-
-    decision = query.order_by(Decision.created_at.desc()).first()
-
-    mapa = {}
-    if not decision or not decision.datos_decision:
-        return mapa
-
-    for item in decision.datos_decision.get('aprobaciones', []):
-        pid = int(item.get('producto_id', 0))
-        region = item.get('region')
-        cant = int(item.get('cantidad_aprobada', 0))
-        if pid and region:
-            mapa[(pid, region)] = max(0, cant)
-    return mapa
+    return contexto_solicitud().aprobaciones_ventas(empresa_id, dia_simulacion)
 
 
 def _saldo_despachable_por_ventas(empresa_id, dia_simulacion, producto_id, region):
@@ -915,13 +677,84 @@ def _saldo_despachable_por_ventas(empresa_id, dia_simulacion, producto_id, regio
 
 def _vehiculo_ocupado_por_ciclo(empresa_id, vehiculo_id, dia_actual):
     """Retorna día de retorno si el vehículo está ocupado por ciclo en el día actual."""
-    return db.session.query(
-        db.func.max(DisponibilidadVehiculo.dia_disponible_retorno)
-    ).filter(
-        DisponibilidadVehiculo.empresa_id == empresa_id,
-        DisponibilidadVehiculo.vehiculo_id == vehiculo_id,
-        DisponibilidadVehiculo.dia_disponible_retorno >= dia_actual,
-    ).scalar()
+    return dia_retorno_vehiculo(empresa_id, vehiculo_id, dia_actual)
+
+
+def _pronostico_aprobaciones_region(empresa_id, simulacion, dias=7):
+    """Promedio diario de unidades aprobadas por Ventas por región en los últimos días."""
+    filtros = [
+        AprobacionVentaDiaria.empresa_id == empresa_id,
+        AprobacionVentaDiaria.dia_simulacion >= simulacion.dia_actual - dias,
+        AprobacionVentaDiaria.dia_simulacion < simulacion.dia_actual,
+    ]
+    if simulacion.fecha_inicio:
+        filtros.append(AprobacionVentaDiaria.created_at >= simulacion.fecha_inicio)
+
+    dias_con_aprobacion = db.session.query(
+        func.count(func.distinct(AprobacionVentaDiaria.dia_simulacion))
+    ).filter(*filtros).scalar() or 0
+    if not dias_con_aprobacion:
+        return {}
+
+    totales = db.session.query(
+        AprobacionVentaDiaria.region,
+        func.sum(AprobacionVentaDiaria.cantidad_aprobada),
+    ).filter(*filtros).group_by(AprobacionVentaDiaria.region).all()
+    return {region: int(round((total or 0) / dias_con_aprobacion)) for region, total in totales}
+
+
+_PLANES_FLOTA_CACHE = {}
+# Workers gthread: lectura, poda y escritura del caché bajo el mismo lock
+_lock_planes_flota = threading.Lock()
+
+
+def _plan_flota_empresa(simulacion, empresa_id, horizonte):
+    """Plan de flota de horizonte rodante, cacheado por (empresa, día) mientras no cambien sus entradas."""
+    dia = simulacion.dia_actual
+    dias_restantes = max(1, int(simulacion.duracion_semanas or 0) * 7 - dia + 1)
+    horizonte = max(1, min(int(horizonte), dias_restantes))
+
+    hoy = {}
+    for (_producto_id, region), cantidad in _obtener_aprobaciones_ventas_dia(empresa_id, dia).items():
+        if cantidad > 0:
+            hoy[region] = hoy.get(region, 0) + int(cantidad)
+    pronostico = _pronostico_aprobaciones_region(empresa_id, simulacion)
+    if not pronostico:
+        pronostico = dict(hoy)
+
+    catalogo = _obtener_capacidades_vehiculos(simulacion, empresa_id)
+    vehiculos_libres = {}
+    for codigo, conf in catalogo.items():
+        if conf['externo'] or not conf['capacidad']:
+            continue
+        if conf['disponible']:
+            vehiculos_libres[codigo] = dia
+        elif conf.get('dia_retorno') is not None:
+            vehiculos_libres[codigo] = int(conf['dia_retorno']) + 1
+    permitir_externo = _opcion_falla_flota(simulacion, empresa_id) != 'B'
+
+    firma = (
+        simulacion.id, horizonte, permitir_externo,
+        tuple(sorted(hoy.items())), tuple(sorted(pronostico.items())),
+        tuple(sorted(vehiculos_libres.items())),
+    )
+    clave = (empresa_id, dia)
+    with _lock_planes_flota:
+        cacheado = _PLANES_FLOTA_CACHE.get(clave)
+    if cacheado and cacheado[0] == firma:
+        return cacheado[1]
+
+    demandas_por_dia = [hoy] + [pronostico] * (horizonte - 1)
+    plan = planificar_flota_horizonte(demandas_por_dia, dia, vehiculos_libres, permitir_externo)
+    plan['horizonte'] = horizonte
+    plan['pronostico_region'] = pronostico
+
+    # Solo se conservan planes del día en curso
+    with _lock_planes_flota:
+        for clave_vieja in [k for k in _PLANES_FLOTA_CACHE if k[1] != dia]:
+            _PLANES_FLOTA_CACHE.pop(clave_vieja, None)
+        _PLANES_FLOTA_CACHE[clave] = (firma, plan)
+    return plan
 
 
 @bp.route('/api/ventas/pedidos-dia')
@@ -931,7 +764,7 @@ def api_ventas_pedidos_dia():
     """API: pedidos solicitados por región (demanda) y cantidades aprobadas por Ventas."""
     try:
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
 
         if not simulacion:
             return jsonify({'success': False, 'message': 'No hay simulación activa'}), 404
@@ -995,7 +828,7 @@ def api_ventas_aprobar_pedidos():
         aprobaciones = data.get('aprobaciones', [])
 
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         if not simulacion:
             return jsonify({'success': False, 'message': 'No hay simulación activa'}), 404
 
@@ -1056,6 +889,10 @@ def api_ventas_aprobar_pedidos():
                 }), 400
 
         # Reemplazar decisión del día para mantener una sola versión activa.
+        AprobacionVentaDiaria.query.filter_by(
+            empresa_id=empresa.id,
+            dia_simulacion=dia,
+        ).delete(synchronize_session=False)
         Decision.query.filter_by(
             empresa_id=empresa.id,
             tipo_decision='ventas_aprobacion_diaria',
@@ -1073,7 +910,23 @@ def api_ventas_aprobar_pedidos():
             }
         )
         db.session.add(decision)
+        db.session.flush()
+
+        # Una fila por producto-región (si llega repetida, prevalece la última)
+        filas_aprobacion = {}
+        for item in validado:
+            filas_aprobacion[(item['producto_id'], item['region'])] = AprobacionVentaDiaria(
+                empresa_id=empresa.id,
+                dia_simulacion=dia,
+                producto_id=item['producto_id'],
+                region=item['region'],
+                cantidad_solicitada=item['cantidad_solicitada'],
+                cantidad_aprobada=max(0, item['cantidad_aprobada']),
+                decision_id=decision.id,
+            )
+        db.session.bulk_save_objects(list(filas_aprobacion.values()))
         db.session.commit()
+        contexto_solicitud().invalidar_aprobaciones(empresa.id)
 
         return jsonify({
             'success': True,
@@ -1087,11 +940,12 @@ def api_ventas_aprobar_pedidos():
 @bp.route('/api/ventas/dashboard')
 @login_required
 @estudiante_required
+@respuesta_cacheada_por_dia
 def api_ventas_dashboard():
     """API para m�tricas del dashboard"""
     try:
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         # Ventas del d�a actual
         ventas_hoy = Venta.query.filter_by(
@@ -1149,23 +1003,27 @@ def api_ventas_matriz_precios():
     """API para obtener matriz de precios actual"""
     try:
         empresa = current_user.empresa
+        simulacion = contexto_solicitud().simulacion
         productos = Producto.query.filter_by(activo=True).all()
         
         regiones = REGIONES_CANONICAS
         
+        # Precios actuales por región: libro de precios de la empresa y,
+        # si no ha fijado uno, la última venta (una sola consulta cada uno)
+        precios_empresa = obtener_mapa_precios_empresa(simulacion, empresa.id) if simulacion else {}
+        ultimos_precios = obtener_ultimos_precios_region(
+            empresa.id, {region: variantes_region(region) for region in regiones}
+        )
+        
         productos_data = []
         for producto in productos:
-            precios = {}
-            
-            # Obtener precios actuales por regi�n (�ltimas ventas)
-            for region in regiones:
-                ultima_venta = Venta.query.filter(
-                    Venta.empresa_id == empresa.id,
-                    Venta.producto_id == producto.id,
-                    Venta.region.in_(variantes_region(region))
-                ).order_by(Venta.semana_simulacion.desc()).first()
-                
-                precios[region] = ultima_venta.precio_unitario if ultima_venta else producto.precio_actual
+            precios = {
+                region: precio_vigente(
+                    precios_empresa, producto, region,
+                    ultimos_precios.get((producto.id, region), producto.precio_actual)
+                )
+                for region in regiones
+            }
             
             productos_data.append({
                 'id': producto.id,
@@ -1195,7 +1053,17 @@ def api_ventas_actualizar_precios():
             return jsonify({'success': False, 'message': 'No hay cambios para aplicar'}), 400
         
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
+        
+        productos = {
+            producto.id: producto
+            for producto in Producto.query.filter(
+                Producto.id.in_({cambio['producto_id'] for cambio in cambios})
+            ).all()
+        }
+        faltantes = {cambio['producto_id'] for cambio in cambios} - set(productos)
+        if faltantes:
+            return jsonify({'success': False, 'message': f'Producto no encontrado: {sorted(faltantes)[0]}'}), 400
         
         actualizados = 0
         
@@ -1205,7 +1073,7 @@ def api_ventas_actualizar_precios():
             region = cambio['region']
             precio = cambio['precio']
             
-            producto = Producto.query.get(producto_id)
+            producto = productos[producto_id]
             
             # Registrar decisi�n de cambio de precio
             decision = Decision(
@@ -1224,6 +1092,14 @@ def api_ventas_actualizar_precios():
             db.session.add(decision)
             actualizados += 1
         
+        # Libro de precios de la empresa, en un solo lote
+        registrar_precios(
+            simulacion,
+            empresa.id,
+            [(cambio['producto_id'], cambio['region'], cambio['precio']) for cambio in cambios],
+            current_user.id
+        )
+        
         db.session.commit()
         
         return jsonify({
@@ -1239,11 +1115,12 @@ def api_ventas_actualizar_precios():
 @bp.route('/api/ventas/analisis-regiones')
 @login_required
 @estudiante_required
+@respuesta_cacheada_por_dia
 def api_ventas_analisis_regiones():
     """API para an�lisis detallado por regi�n"""
     try:
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         regiones = REGIONES_CANONICAS
         regiones_data = []
@@ -1291,32 +1168,28 @@ def api_ventas_competitividad():
     """API para obtener informaci�n de competitividad de precios vs mercado"""
     try:
         empresa = current_user.empresa
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         if not simulacion:
             return jsonify({'success': False, 'message': 'No hay simulaci�n activa'}), 404
         
         productos = Producto.query.filter_by(activo=True).all()
-        empresas_competencia = Empresa.query.filter_by(simulacion_id=simulacion.id).all()
+        producto_ids = [producto.id for producto in productos]
+        empresas_con_stock = obtener_empresas_con_stock(simulacion.id, producto_ids)
+        stock_empresa = obtener_stock_empresa(empresa.id, producto_ids)
+        precios = cargar_precios_simulacion(simulacion.id, simulacion.dia_actual)
         
         competitividad_data = []
         
         for producto in productos:
-            # Calcular precio promedio del mercado
-            precios_mercado = []
-            for emp in empresas_competencia:
-                # Por ahora asumimos que todas las empresas usan el mismo precio_actual del producto
-                # En el futuro esto podr�a ser por empresa
-                inventario = Inventario.query.filter_by(
-                    empresa_id=emp.id,
-                    producto_id=producto.id
-                ).first()
-                
-                if inventario and inventario.cantidad_actual > 0:
-                    precios_mercado.append(producto.precio_actual)
+            # Calcular precio promedio del mercado (precio general de cada empresa con stock)
+            precios_mercado = [
+                precio_vigente(precios.get(empresa_id, {}), producto)
+                for empresa_id in sorted(empresas_con_stock.get(producto.id, ()))
+            ]
             
-            precio_promedio_mercado = sum(precios_mercado) / len(precios_mercado) if precios_mercado else producto.precio_actual
-            precio_empresa = producto.precio_actual
+            precio_empresa = precio_vigente(precios.get(empresa.id, {}), producto)
+            precio_promedio_mercado = sum(precios_mercado) / len(precios_mercado) if precios_mercado else precio_empresa
             
             # Calcular ratio y clasificaci�n
             ratio = precio_empresa / precio_promedio_mercado if precio_promedio_mercado > 0 else 1.0
@@ -1343,12 +1216,7 @@ def api_ventas_competitividad():
                 expectativa_ventas = 'Medias (posible desconfianza)'
             
             # Obtener stock actual
-            inventario_empresa = Inventario.query.filter_by(
-                empresa_id=empresa.id,
-                producto_id=producto.id
-            ).first()
-            
-            stock_actual = inventario_empresa.cantidad_actual if inventario_empresa else 0
+            stock_actual = stock_empresa.get(producto.id, 0)
             
             competitividad_data.append({
                 'producto': producto.nombre,
@@ -1396,13 +1264,13 @@ def ajustar_precio():
             return redirect(url_for('estudiante.dashboard_ventas'))
         
         # Registrar el precio anterior
-        precio_anterior = producto.precio_actual
+        simulacion = contexto_solicitud().simulacion
+        precio_anterior = precio_vigente(obtener_mapa_precios_empresa(simulacion, current_user.empresa_id), producto)
         
-        # Actualizar precio
-        producto.precio_actual = nuevo_precio
+        # Actualizar precio (libro de precios de la empresa, todas las regiones)
+        registrar_precios(simulacion, current_user.empresa_id, [(producto.id, None, nuevo_precio)], current_user.id)
         
         # Registrar la decisi�n
-        simulacion = Simulacion.query.filter_by(activa=True).first()
         decision = Decision(
             usuario_id=current_user.id,
             empresa_id=current_user.empresa_id,
@@ -1449,7 +1317,7 @@ def api_ventas_historico_region():
     if current_user.rol != 'ventas':
         return jsonify({'error': 'No autorizado'}), 403
     
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa_id = current_user.empresa_id
     dias = int(request.args.get('dias', 14))
     
@@ -1499,7 +1367,7 @@ def api_precio_demanda(producto_id):
     
     empresa_id = current_user.empresa_id
     dias = int(request.args.get('dias', 14))
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     ventas = Venta.query.filter_by(
         empresa_id=empresa_id,
@@ -1531,6 +1399,7 @@ def api_precio_demanda(producto_id):
 @bp.route('/api/ventas/por-producto')
 @login_required
 @estudiante_required
+@respuesta_cacheada_por_dia
 def api_ventas_por_producto():
     """API: Ventas totales por producto"""
     if current_user.rol != 'ventas':
@@ -1538,7 +1407,7 @@ def api_ventas_por_producto():
     
     empresa_id = current_user.empresa_id
     dias = int(request.args.get('dias', 7))
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     productos = Producto.query.filter_by(activo=True).all()
     
@@ -1577,7 +1446,7 @@ def api_ventas_por_producto():
 def api_ventas_demanda_mercado():
     """API: Demanda total del mercado vs asignacion vs ventas reales por dia"""
     empresa_id = current_user.empresa_id
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     if not simulacion:
         return jsonify({'error': 'No hay simulacion activa'}), 404
 
@@ -1601,12 +1470,14 @@ def api_ventas_demanda_mercado():
         DemandaMercadoDiaria.dia_simulacion <= dia_hasta,
     ).group_by(DemandaMercadoDiaria.dia_simulacion).all()
 
-    decisiones_rango = Decision.query.filter(
-        Decision.empresa_id == empresa_id,
-        Decision.tipo_decision == 'ventas_aprobacion_diaria',
-        Decision.semana_simulacion >= desde,
-        Decision.semana_simulacion <= dia_hasta,
-    ).order_by(Decision.semana_simulacion.asc(), Decision.created_at.asc()).all()
+    aprobado_rango = db.session.query(
+        AprobacionVentaDiaria.dia_simulacion,
+        func.sum(AprobacionVentaDiaria.cantidad_aprobada).label('total_aprobado')
+    ).filter(
+        AprobacionVentaDiaria.empresa_id == empresa_id,
+        AprobacionVentaDiaria.dia_simulacion >= desde,
+        AprobacionVentaDiaria.dia_simulacion <= dia_hasta,
+    ).group_by(AprobacionVentaDiaria.dia_simulacion).all()
 
     demanda_por_dia = {d: 0 for d in dias_list}
     asignada_por_dia = {d: 0 for d in dias_list}
@@ -1615,17 +1486,8 @@ def api_ventas_demanda_mercado():
     for row in demanda_rango:
         demanda_por_dia[int(row.dia_simulacion)] = int(round(row.total_demanda or 0))
 
-    ultima_decision_dia = {}
-    for dec in decisiones_rango:
-        ultima_decision_dia[dec.semana_simulacion] = dec
-
-    for dia, dec in ultima_decision_dia.items():
-        if not dec.datos_decision:
-            continue
-        asignada_por_dia[dia] = int(sum(
-            int(item.get('cantidad_aprobada', 0) or 0)
-            for item in dec.datos_decision.get('aprobaciones', [])
-        ))
+    for row in aprobado_rango:
+        asignada_por_dia[int(row.dia_simulacion)] = int(row.total_aprobado or 0)
 
     for v in ventas_rango:
         d = int(v.semana_simulacion)
@@ -1690,7 +1552,7 @@ def guardar_pronostico():
         import json
         datos_historicos = json.loads(datos_historicos_str)
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         # Crear pron�stico
         pronostico = Pronostico(
@@ -1759,7 +1621,7 @@ def crear_requerimiento():
         notas = request.form.get('notas', '')
         pronostico_id = request.form.get('pronostico_id')
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         # Calcular cantidad sugerida
         calculo = calcular_cantidad_pedir(
@@ -1821,6 +1683,7 @@ def crear_requerimiento():
 @bp.route('/api/planeacion/historico-producto/<int:producto_id>')
 @login_required
 @estudiante_required
+@respuesta_cacheada_por_dia
 def api_historico_producto(producto_id):
     """API: Datos hist�ricos de demanda de un producto"""
     if not _role_allowed(current_user.rol, ['planeacion', 'compras', ROL_PLANEACION_COMPRAS]):
@@ -1828,7 +1691,7 @@ def api_historico_producto(producto_id):
     
     empresa_id = current_user.empresa_id
     
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     if not simulacion:
         return jsonify({'error': 'No hay simulación activa'}), 404
 
@@ -1906,7 +1769,7 @@ def api_historico_producto(producto_id):
 def dashboard_compras():
     """Dashboard espec�fico para el rol de Compras"""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     # Obtener productos
@@ -1922,10 +1785,7 @@ def dashboard_compras():
         .limit(15).all()
     
     # �rdenes en tr�nsito
-    ordenes_transito = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).order_by(Compra.semana_entrega.asc()).all()
+    ordenes_transito = obtener_pipeline_transito(empresa.id, simulacion.dia_actual)['compras'] if simulacion else []
 
     # Capital en Compras: se muestra el capital actual real de la empresa.
     # Las órdenes en tránsito se informan, pero no descuentan nuevamente en este panel.
@@ -1933,6 +1793,23 @@ def dashboard_compras():
     capital_libre = float(empresa.capital_actual or 0)
 
     disrupcion_retraso_activa = _disrupcion_retraso_proveedor_activa(simulacion, empresa.id)
+
+    # Pronóstico precalculado al cierre del día anterior
+    from utils.snapshots_pronostico import obtener_snapshots_pronostico
+    snapshots_pronostico = obtener_snapshots_pronostico(simulacion, empresa.id)
+
+    # Cobertura y prioridad de compra de todo el catálogo (análisis vectorizado)
+    from utils.inventario_vectorizado import analizar_salud_inventarios
+    analisis_inventario = {}
+    if simulacion:
+        analisis = analizar_salud_inventarios(
+            [empresa.id],
+            max(1, simulacion.dia_actual - 1),
+            float(current_app.config.get('COSTO_PEDIDO_COMPRA', 50000.0)),
+            float(current_app.config.get('TASA_MANTENIMIENTO_INVENTARIO_ANUAL', 0.20)),
+            {p.id: _calcular_lead_time_compra(p, 'ACTUAL', disrupcion_retraso_activa) for p in productos},
+        )
+        analisis_inventario = {fila['producto_id']: fila for fila in analisis['filas']}
     
     return render_template('estudiante/compras/dashboard.html',
                          simulacion=simulacion,
@@ -1943,7 +1820,9 @@ def dashboard_compras():
                          ordenes_transito=ordenes_transito,
                          capital_comprometido=capital_comprometido,
                          capital_libre=capital_libre,
-                         disrupcion_retraso_activa=disrupcion_retraso_activa)
+                         disrupcion_retraso_activa=disrupcion_retraso_activa,
+                         snapshots_pronostico=snapshots_pronostico,
+                         analisis_inventario=analisis_inventario)
 
 
 @bp.route('/compras/exportar-ventas-csv')
@@ -1952,7 +1831,7 @@ def dashboard_compras():
 def exportar_ventas_csv():
     """Exporta demanda base + operación de la empresa para análisis diario."""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     if not simulacion:
         flash('No hay simulación activa para exportar datos.', 'warning')
         return redirect(url_for('estudiante.dashboard_general'))
@@ -2035,7 +1914,7 @@ def exportar_ventas_csv():
 def ver_requerimientos():
     """Vista de requerimientos para Planeación y Compras."""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     # Obtener todos los requerimientos
@@ -2076,7 +1955,7 @@ def crear_orden_desde_requerimiento(requerimiento_id):
         proveedor = _normalizar_proveedor(request.form.get('proveedor', 'A'))
         notas_compras = request.form.get('notas_compras', '')
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         producto = Producto.query.get(requerimiento.producto_id)
         
         condiciones = _calcular_condiciones_compra(
@@ -2179,7 +2058,7 @@ def crear_orden_manual():
         cantidad = float(request.form.get('cantidad'))
         proveedor = _normalizar_proveedor(request.form.get('proveedor', 'A'))
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         producto = Producto.query.get(producto_id)
         
         if not producto:
@@ -2273,7 +2152,7 @@ def crear_orden_manual():
 def crear_pedido_general():
     """Crear múltiples órdenes de compra en una sola operación."""
     try:
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         empresa = current_user.empresa
 
         productos_activos = {
@@ -2501,68 +2380,6 @@ def recibir_orden_compra_compras(compra_id):
     return redirect(url_for('estudiante.vista_recepcion'))
 
 
-def _procesar_recepcion_compra_individual(compra, usuario_id, empresa_id):
-    """Procesa una compra individual y retorna (éxito, mensaje)."""
-    if compra.estado != 'en_transito':
-        return False, 'Esta orden ya fue recibida o no está en tránsito'
-
-    simulacion = Simulacion.query.filter_by(activa=True).first()
-    if not simulacion:
-        return False, 'No existe una simulación activa'
-
-    if simulacion.dia_actual < compra.semana_entrega:
-        return False, f'Esta orden llega el día {compra.semana_entrega}. Aún no puede ser recibida.'
-
-    inventario = Inventario.query.filter_by(
-        empresa_id=empresa_id,
-        producto_id=compra.producto_id
-    ).first()
-
-    if not inventario:
-        inventario = Inventario(
-            empresa_id=empresa_id,
-            producto_id=compra.producto_id,
-            cantidad_actual=0,
-            costo_promedio=compra.costo_unitario
-        )
-        db.session.add(inventario)
-
-    resultado = procesar_recepcion_compra(compra, inventario)
-    compra.estado = 'entregado'
-
-    movimiento = MovimientoInventario(
-        empresa_id=empresa_id,
-        producto_id=compra.producto_id,
-        usuario_id=usuario_id,
-        semana_simulacion=simulacion.dia_actual,
-        tipo_movimiento='entrada_compra',
-        cantidad=compra.cantidad,
-        saldo_anterior=resultado['cantidad_anterior'],
-        saldo_nuevo=resultado['cantidad_nueva'],
-        compra_id=compra.id,
-        observaciones=f"Recepción de compra. Costo unitario: ${compra.costo_unitario:,.0f}"
-    )
-
-    decision = Decision(
-        usuario_id=usuario_id,
-        empresa_id=empresa_id,
-        semana_simulacion=simulacion.dia_actual,
-        tipo_decision='recepcion_compra',
-        datos_decision={
-            'compra_id': compra.id,
-            'producto_id': compra.producto_id,
-            'cantidad': compra.cantidad
-        },
-        resultado=resultado
-    )
-
-    db.session.add(movimiento)
-    db.session.add(decision)
-    db.session.commit()
-
-    return True, f'Orden recibida: {compra.cantidad:.0f} unidades de {compra.producto.nombre}. Nuevo stock: {resultado["cantidad_nueva"]:.0f}'
-
-
 @bp.route('/compras/recibir-todas-ordenes', methods=['POST'])
 @login_required
 @estudiante_required
@@ -2627,32 +2444,23 @@ def api_inventario_status():
 def dashboard_logistica():
     """Dashboard espec�fico para el rol de Log�stica"""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     # Obtener inventarios
     inventarios = Inventario.query.filter_by(empresa_id=empresa.id).all()
     productos = Producto.query.filter_by(activo=True).all()
     
-    # �rdenes de compra en tr�nsito (pendientes de recibir)
-    ordenes_transito = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).order_by(Compra.semana_entrega).all()
+    # �rdenes de compra y despachos en tr�nsito
+    pipeline = obtener_pipeline_transito(empresa.id, simulacion.dia_actual)
+    ordenes_transito = pipeline['compras']
     
     # �rdenes que llegan hoy
-    ordenes_hoy = [o for o in ordenes_transito if o.semana_entrega == simulacion.dia_actual]
+    ordenes_hoy = pipeline['por_dia'].get(simulacion.dia_actual, {}).get('compras', [])
     
     # Despachos regionales pendientes y en tr�nsito
-    despachos_pendientes = DespachoRegional.query.filter_by(
-        empresa_id=empresa.id,
-        estado='pendiente'
-    ).count()
-    
-    despachos_transito = DespachoRegional.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).count()
+    despachos_pendientes = pipeline['despachos_pendientes']
+    despachos_transito = len(pipeline['despachos'])
     
     # An�lisis de inventario por regi�n
     regiones = REGIONES_CANONICAS
@@ -2702,14 +2510,11 @@ def dashboard_logistica():
 def vista_recepcion():
     """Vista de recepci�n de �rdenes de compra"""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     # �rdenes en tr�nsito
-    ordenes_transito = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).order_by(Compra.semana_entrega).all()
+    ordenes_transito = obtener_pipeline_transito(empresa.id, simulacion.dia_actual)['compras']
     
     # �rdenes recibidas (entregadas)
     ordenes_recibidas = Compra.query.filter_by(
@@ -2742,7 +2547,7 @@ def recibir_orden_compra(compra_id):
             flash('Esta orden ya fue recibida o no est� en tr�nsito', 'warning')
             return redirect(url_for('estudiante.vista_recepcion'))
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         # Verificar que sea el d�a de entrega o posterior
         if simulacion.dia_actual < compra.semana_entrega:
@@ -2822,7 +2627,7 @@ def recibir_orden_compra(compra_id):
 def recibir_todas_ordenes_logistica():
     """Recibe todas las compras en tránsito que ya están listas para entrega."""
     try:
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         compras_listas = Compra.query.filter_by(
             empresa_id=current_user.empresa_id,
             estado='en_transito'
@@ -2832,13 +2637,12 @@ def recibir_todas_ordenes_logistica():
             flash('No hay órdenes listas para recibir.', 'info')
             return redirect(url_for('estudiante.vista_recepcion'))
 
-        recibidas = 0
-        for compra in compras_listas:
-            ok, _mensaje = _procesar_recepcion_compra_individual(compra, current_user.id, current_user.empresa_id)
-            if ok:
-                recibidas += 1
+        resultados = recibir_compras_lote(
+            compras_listas, current_user.empresa_id, current_user.id, simulacion.dia_actual
+        )
+        db.session.commit()
 
-        flash(f'Se recibieron {recibidas} órdenes de compra de forma masiva.', 'success')
+        flash(f'Se recibieron {len(resultados)} órdenes de compra de forma masiva.', 'success')
         return redirect(url_for('estudiante.vista_recepcion'))
     except Exception as e:
         db.session.rollback()
@@ -2852,7 +2656,7 @@ def recibir_todas_ordenes_logistica():
 def vista_despacho():
     """Vista de despacho a regiones"""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
     # Inventarios disponibles
@@ -2933,7 +2737,7 @@ def crear_despacho_regional():
         region = request.form.get('region')
         cantidad = float(request.form.get('cantidad'))
         
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         
         # Obtener inventario
         inventario = Inventario.query.filter_by(
@@ -3054,12 +2858,7 @@ def crear_despacho_regional():
                 )
                 db.session.rollback()
                 return redirect(url_for('estudiante.vista_despacho'))
-            uso = DisponibilidadVehiculo(
-                empresa_id=current_user.empresa_id,
-                vehiculo_id=codigo_vehiculo,
-                dia_disponible_retorno=dia_retorno,
-            )
-            db.session.add(uso)
+            registrar_uso_vehiculos(current_user.empresa_id, [(codigo_vehiculo, dia_retorno)])
 
         # Restar costo de transporte del capital
         empresa = current_user.empresa
@@ -3096,28 +2895,45 @@ def crear_despacho_regional():
         return redirect(url_for('estudiante.vista_despacho'))
 
 
+def _filtros_movimientos():
+    """Filtros del libro de movimientos desde la query string (ValueError si no son válidos)."""
+    filtros = {}
+    tipo_movimiento = request.args.get('tipo_movimiento', '')
+    if tipo_movimiento:
+        filtros['tipo_movimiento'] = tipo_movimiento
+    for campo in ('producto_id', 'dia_desde', 'dia_hasta'):
+        valor = request.args.get(campo, '')
+        if valor != '':
+            try:
+                filtros[campo] = int(valor)
+            except ValueError:
+                raise ValueError(f'Filtro {campo} inválido: {valor}')
+    return filtros
+
+
 @bp.route('/logistica/movimientos')
 @login_required
 @estudiante_required
 def vista_movimientos():
     """Vista de movimientos de inventario"""
     # Acceso permitido para todos los roles - Panel unificado
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     empresa = current_user.empresa
     
-    # Obtener movimientos
+    # Obtener movimientos (primera página; las siguientes se piden a la API con el cursor)
     tipo_filtro = request.args.get('tipo_movimiento', '')
     producto_filtro = request.args.get('producto_id', '')
+    dia_desde_filtro = request.args.get('dia_desde', '')
+    dia_hasta_filtro = request.args.get('dia_hasta', '')
     
-    query = MovimientoInventario.query.filter_by(empresa_id=empresa.id)
-    
-    if tipo_filtro and tipo_filtro != '':
-        query = query.filter_by(tipo_movimiento=tipo_filtro)
-    
-    if producto_filtro and producto_filtro != '':
-        query = query.filter_by(producto_id=int(producto_filtro))
+    try:
+        filtros = _filtros_movimientos()
+    except ValueError:
+        flash('Filtros de movimientos inválidos', 'warning')
+        filtros = {}
     
-    movimientos = query.order_by(MovimientoInventario.created_at.desc()).limit(100).all()
+    pagina = pagina_movimientos(empresa.id, limite=100, **filtros)
+    movimientos = [movimiento for movimiento, _ in pagina['movimientos']]
     
     # Productos para filtro
     productos = Producto.query.filter_by(activo=True).all()
@@ -3152,7 +2968,52 @@ def vista_movimientos():
                          productos=productos,
                          estadisticas=estadisticas,
                          tipo_filtro=tipo_filtro,
-                         producto_filtro=producto_filtro)
+                         producto_filtro=producto_filtro,
+                         dia_desde_filtro=dia_desde_filtro,
+                         dia_hasta_filtro=dia_hasta_filtro,
+                         siguiente_cursor=pagina['siguiente_cursor'])
+
+
+@bp.route('/api/logistica/movimientos')
+@login_required
+@estudiante_required
+def api_logistica_movimientos():
+    """API: Libro de movimientos de inventario paginado por cursor"""
+    try:
+        filtros = _filtros_movimientos()
+        pagina = pagina_movimientos(
+            current_user.empresa_id,
+            cursor=request.args.get('cursor') or None,
+            limite=request.args.get('limite', LIMITE_PAGINA_DEFECTO),
+            **filtros
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'movimientos': [serializar_movimiento(mov, nombre) for mov, nombre in pagina['movimientos']],
+        'siguiente_cursor': pagina['siguiente_cursor']
+    })
+
+
+@bp.route('/logistica/movimientos/exportar-csv')
+@login_required
+@estudiante_required
+def exportar_movimientos_csv_empresa():
+    """Exporta el libro completo de movimientos de la empresa (con los filtros aplicados)"""
+    try:
+        filtros = _filtros_movimientos()
+    except ValueError:
+        flash('Filtros de movimientos inválidos', 'warning')
+        return redirect(url_for('estudiante.vista_movimientos'))
+    
+    empresa_id = current_user.empresa_id
+    return Response(
+        stream_with_context(exportar_movimientos_csv(empresa_id, **filtros)),
+        mimetype='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename=movimientos_empresa_{empresa_id}.csv'},
+    )
 
 
 @bp.route('/logistica/actualizar-inventario', methods=['POST'])
@@ -3175,7 +3036,7 @@ def actualizar_parametros_inventario():
     inventario.stock_seguridad = stock_seguridad
     
     # Registrar decisi�n
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     decision = Decision(
         usuario_id=current_user.id,
         empresa_id=current_user.empresa_id,
@@ -3342,7 +3203,7 @@ def api_guardar_pronostico():
     mad = data.get('mad', 0)
     
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     # Guardar cada pron�stico
     for i, valor in enumerate(pronosticos):
@@ -3372,118 +3233,53 @@ def api_guardar_pronostico():
 def api_calcular_mrp():
     """API: Calcular MRP (Material Requirements Planning) para todos los productos"""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
-    
-    productos = Producto.query.filter_by(activo=True).all()
-    
-    resultados = []
-    criticos = 0
-    advertencia = 0
-    optimos = 0
-    capital_total = 0
-    
-    for producto in productos:
-        # Stock actual
-        inventario = Inventario.query.filter_by(
-            empresa_id=empresa.id,
-            producto_id=producto.id
-        ).first()
-        
-        stock_actual = inventario.cantidad_actual if inventario else 0
-        
-        # Pedidos en tr�nsito
-        compras_transito = Compra.query.filter_by(
-            empresa_id=empresa.id,
-            producto_id=producto.id,
-            estado='en_transito'
-        ).all()
-        
-        en_transito = sum([c.cantidad for c in compras_transito])
-        
-        # Pron�stico pr�ximos 7 d�as
-        pronosticos = Pronostico.query.filter_by(
-            empresa_id=empresa.id,
-            producto_id=producto.id
-        ).filter(
-            Pronostico.semana_pronostico > simulacion.dia_actual,
-            Pronostico.semana_pronostico <= simulacion.dia_actual + 7
-        ).all()
-        
-        if pronosticos:
-            pronostico_total = sum([p.demanda_pronosticada for p in pronosticos])
-        else:
-            # Si no hay pron�stico, usar promedio hist�rico
-            ventas = Venta.query.filter_by(
-                empresa_id=empresa.id,
-                producto_id=producto.id
-            ).all()
-            
-            if ventas:
-                demanda_promedio = sum([v.cantidad_vendida + v.cantidad_perdida for v in ventas]) / len(ventas)
-                pronostico_total = demanda_promedio * 7
-            else:
-                pronostico_total = 0
-        
-        # C�lculo de cobertura
-        stock_disponible = stock_actual + en_transito
-        dias_cobertura = (stock_disponible / (pronostico_total / 7)) if pronostico_total > 0 else 999
-        
-        # Determinar status y recomendaci�n
-        if dias_cobertura < 3:
-            status_class = 'status-critico'
-            status_text = 'CR�TICO'
-            criticos += 1
-            # Recomendar para 10 d�as
-            cantidad_recomendada = max(0, int((pronostico_total / 7) * 10 - stock_disponible))
-            justificacion = f'Stock bajo ({dias_cobertura:.1f} d�as)'
-        elif dias_cobertura < 7:
-            status_class = 'status-bajo'
-            status_text = 'ADVERTENCIA'
-            advertencia += 1
-            cantidad_recomendada = max(0, int((pronostico_total / 7) * 10 - stock_disponible))
-            justificacion = f'Stock justo ({dias_cobertura:.1f} d�as)'
-        else:
-            status_class = 'status-optimo'
-            status_text = '�PTIMO'
-            optimos += 1
-            cantidad_recomendada = 0
-            justificacion = f'Stock suficiente ({dias_cobertura:.1f} d�as)'
-        
-        capital_total += cantidad_recomendada * producto.costo_unitario
-        
-        resultados.append({
-            'id': producto.id,
-            'stock_actual': stock_actual,
-            'en_transito': en_transito,
-            'pronostico_proximos_dias': int(pronostico_total),
-            'dias_cobertura': dias_cobertura,
-            'status_class': status_class,
-            'status_text': status_text,
-            'cantidad_recomendada': cantidad_recomendada,
-            'justificacion': justificacion
-        })
-    
-    return jsonify({
-        'productos': resultados,
-        'resumen': {
-            'criticos': criticos,
-            'advertencia': advertencia,
-            'optimos': optimos,
-            'capital_requerido': capital_total
-        }
-    })
-
-
-@bp.route('/api/producto/<int:producto_id>/precio')
-@login_required
-@estudiante_required
-def api_producto_precio(producto_id):
-    """API: Obtener precio de un producto"""
-    producto = Producto.query.get_or_404(producto_id)
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    from utils.mrp import calcular_mrp_empresa
+    return jsonify(calcular_mrp_empresa(empresa.id, simulacion))
+
+
+@bp.route('/api/plan-mrp')
+@login_required
+@estudiante_required
+def api_plan_mrp():
+    """API: Plan MRP por periodos (día a día) para todo el catálogo hasta el fin de la simulación"""
+    empresa = current_user.empresa
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    from utils.mrp import calcular_plan_mrp
+    proveedor = _normalizar_proveedor(request.args.get('proveedor'))
+    dis_retraso_activa = _disrupcion_retraso_proveedor_activa(simulacion, empresa.id)
+
+    productos = Producto.query.filter_by(activo=True).order_by(Producto.id).all()
+    lead_times = {
+        p.id: _calcular_lead_time_compra(p, proveedor, dis_retraso_activa)
+        for p in productos
+    }
+    multiplos = {p.id: _multiplo_pedido(p) for p in productos}
+
+    plan = calcular_plan_mrp(empresa.id, simulacion, lead_times, multiplos, productos)
+    plan['success'] = True
+    plan['proveedor'] = proveedor
+    return jsonify(plan)
+
+
+@bp.route('/api/producto/<int:producto_id>/precio')
+@login_required
+@estudiante_required
+def api_producto_precio(producto_id):
+    """API: Obtener precio de un producto"""
+    producto = Producto.query.get_or_404(producto_id)
+    simulacion = contexto_solicitud().simulacion
+    precios_empresa = obtener_mapa_precios_empresa(simulacion, current_user.empresa_id) if simulacion else {}
     
     return jsonify({
         'precio_compra': producto.costo_unitario,
-        'precio_venta': producto.precio_actual
+        'precio_venta': precio_vigente(precios_empresa, producto)
     })
 
 
@@ -3497,7 +3293,7 @@ def api_generar_requerimiento():
     cantidad = data.get('cantidad')
     
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     producto = Producto.query.get(producto_id)
     
     if not producto:
@@ -3555,27 +3351,22 @@ def api_generar_requerimiento():
 def api_generar_todas_ordenes():
     """API: Generar requerimientos para todos los productos con recomendaciones"""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
-    
-    # Calcular MRP primero
-    response = api_calcular_mrp()
-    data = response.get_json()
-    
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    # Calcular MRP primero (el resultado ya trae stock e inventario por producto)
+    from utils.mrp import calcular_mrp_empresa
+    productos = Producto.query.filter_by(activo=True).order_by(Producto.id).all()
+    productos_map = {p.id: p for p in productos}
+    data = calcular_mrp_empresa(empresa.id, simulacion, productos)
+
     ordenes_generadas = 0
-    
+
     for prod in data['productos']:
         if prod['cantidad_recomendada'] > 0:
-            producto = Producto.query.get(prod['id'])
-            
-            # Obtener inventario actual
-            inventario = Inventario.query.filter_by(
-                empresa_id=empresa.id,
-                producto_id=prod['id']
-            ).first()
-            
-            stock_actual = inventario.cantidad_actual if inventario else 0
-            stock_seguridad = inventario.stock_seguridad if inventario else 0
-            
+            producto = productos_map[prod['id']]
+
             requerimiento = RequerimientoCompra(
                 empresa_id=empresa.id,
                 producto_id=prod['id'],
@@ -3583,17 +3374,17 @@ def api_generar_todas_ordenes():
                 semana_generacion=simulacion.dia_actual,
                 semana_necesidad=simulacion.dia_actual + producto.tiempo_entrega,
                 demanda_pronosticada=prod['pronostico_proximos_dias'] / 7,
-                stock_actual=stock_actual,
-                stock_seguridad=stock_seguridad,
+                stock_actual=prod['stock_actual'],
+                stock_seguridad=prod['stock_seguridad'],
                 lead_time=producto.tiempo_entrega,
                 cantidad_sugerida=prod['cantidad_recomendada'],
                 estado='pendiente',
                 notas_planeacion=prod['justificacion']
             )
-            
+
             db.session.add(requerimiento)
-            
-            # Registrar decisi�n
+
+            # Registrar decisión
             decision = Decision(
                 usuario_id=current_user.id,
                 empresa_id=empresa.id,
@@ -3604,15 +3395,15 @@ def api_generar_todas_ordenes():
                     'cantidad': prod['cantidad_recomendada'],
                     'automatico': True,
                     'justificacion': prod['justificacion'],
-                    'descripcion': f'Requerimiento autom�tico de {prod["cantidad_recomendada"]} unidades de {producto.nombre}'
+                    'descripcion': f'Requerimiento automático de {prod["cantidad_recomendada"]} unidades de {producto.nombre}'
                 }
             )
             db.session.add(decision)
-            
+
             ordenes_generadas += 1
-    
+
     db.session.commit()
-    
+
     return jsonify({'success': True, 'ordenes_generadas': ordenes_generadas})
 
 
@@ -3624,7 +3415,7 @@ def api_generar_todas_ordenes():
 def api_logistica_stock():
     """Obtener stock disponible para despachos"""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     
     inventarios = Inventario.query.filter_by(empresa_id=empresa.id).all()
     
@@ -3715,7 +3506,7 @@ def api_logistica_stock():
 def api_logistica_pedidos_dia():
     """Retorna pedidos del día agrupados por región según aprobaciones de Ventas."""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
 
     if not simulacion:
         return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
@@ -3765,13 +3556,316 @@ def api_logistica_pedidos_dia():
     })
 
 
+@bp.route('/api/logistica/sugerir-asignacion')
+@login_required
+@estudiante_required
+@rol_required('logistica')
+def api_logistica_sugerir_asignacion():
+    """Sugiere la asignación de vehículos de costo mínimo para todos los pedidos del día."""
+    import time
+
+    empresa = current_user.empresa
+    simulacion = contexto_solicitud().simulacion
+
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    aprobaciones = _obtener_aprobaciones_ventas_dia(empresa.id, simulacion.dia_actual)
+    demanda_por_region = {}
+    for (_producto_id, region), cantidad_aprobada in aprobaciones.items():
+        cantidad = int(round(cantidad_aprobada or 0))
+        if cantidad > 0:
+            demanda_por_region[region] = demanda_por_region.get(region, 0) + cantidad
+
+    if not demanda_por_region:
+        return jsonify({'success': False, 'message': 'No hay aprobaciones de Ventas para el día actual.'}), 400
+
+    # Mismo orden de regiones que pedidos-dia
+    demanda_por_region = {
+        region: demanda_por_region[region]
+        for region in list(REGIONES_CANONICAS) + sorted(demanda_por_region.keys())
+        if region in demanda_por_region
+    }
+
+    codigos_disponibles = _codigos_propios_disponibles(simulacion, empresa.id)
+    opcion_falla_flota = _opcion_falla_flota(simulacion, empresa.id)
+    permitir_externo = opcion_falla_flota != 'B'
+
+    inicio = time.perf_counter()
+    plan = optimizar_asignacion_flota(demanda_por_region, codigos_disponibles, permitir_externo)
+    tiempo_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    from utils.procesamiento_dias import obtener_efecto_logistico_empresa
+    efecto_flota = obtener_efecto_logistico_empresa(simulacion.id, empresa.id)
+    mult = efecto_flota.get('costo_multiplicador', 1.0) if efecto_flota else 1.0
+
+    asignaciones = []
+    detalle = []
+    for item in plan['asignaciones']:
+        vehiculos = list(item['vehiculos'])
+        if item['unidades_externo'] > 0:
+            vehiculos.append('EXTERNO')
+        # Formato directo para /api/logistica/despachar-multiple
+        asignaciones.append({
+            'region': item['region'],
+            'vehiculos': vehiculos,
+            'unidades_solicitadas': item['cantidad'],
+            'unidades_enviar': item['cantidad'],
+        })
+        detalle.append({
+            **item,
+            'ciclo_dias': obtener_ciclo_region(item['region']),
+            'costo_total': round(item['costo_total'] * mult),
+        })
+
+    return jsonify({
+        'success': True,
+        'dia_actual': simulacion.dia_actual,
+        'factible': plan['factible'],
+        'message': None if plan['factible'] else (
+            'La flota propia disponible no alcanza para todos los pedidos y la opción B '
+            'de falla de flota no permite transporte externo.'
+        ),
+        'asignaciones': asignaciones,
+        'detalle': detalle,
+        'costo_total': round(plan['costo_total'] * mult),
+        'costo_multiplicador': mult,
+        'unidades_externo': plan['unidades_externo'],
+        'vehiculos_usados': plan['vehiculos_usados'],
+        'vehiculos_disponibles': len(codigos_disponibles),
+        'tiempo_ms': tiempo_ms,
+    })
+
+
+@bp.route('/api/logistica/plan-flota')
+@login_required
+@estudiante_required
+@rol_required('logistica')
+def api_logistica_plan_flota():
+    """Plan de flota para los próximos días considerando los ciclos de retorno por región."""
+    empresa = current_user.empresa
+    simulacion = contexto_solicitud().simulacion
+
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    try:
+        horizonte = int(request.args.get('dias', 5))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'El horizonte debe ser un número de días'}), 400
+    if horizonte < 1 or horizonte > 7:
+        return jsonify({'success': False, 'message': 'El horizonte debe estar entre 1 y 7 días'}), 400
+
+    plan = _plan_flota_empresa(simulacion, empresa.id, horizonte)
+
+    from utils.procesamiento_dias import obtener_efecto_logistico_empresa
+    efecto_flota = obtener_efecto_logistico_empresa(simulacion.id, empresa.id)
+    mult = efecto_flota.get('costo_multiplicador', 1.0) if efecto_flota else 1.0
+
+    dias = []
+    for dia_plan in plan['dias']:
+        dias.append({
+            'dia': dia_plan['dia'],
+            'asignaciones': [
+                {
+                    'region': item['region'],
+                    'vehiculos': list(item['vehiculos']) + (['EXTERNO'] if item['unidades_externo'] > 0 else []),
+                    'unidades_solicitadas': item['cantidad'],
+                    'unidades_enviar': item['cantidad'],
+                    'ciclo_dias': obtener_ciclo_region(item['region']),
+                    'costo_total': round(item['costo_total'] * mult),
+                }
+                for item in dia_plan['asignaciones']
+            ],
+            'costo_total': round(dia_plan['costo_total'] * mult),
+            'unidades_externo': dia_plan['unidades_externo'],
+            'factible': dia_plan['factible'],
+        })
+
+    return jsonify({
+        'success': True,
+        'dia_actual': simulacion.dia_actual,
+        'horizonte': plan['horizonte'],
+        'pronostico_region': plan['pronostico_region'],
+        'asignaciones_hoy': dias[0]['asignaciones'] if dias else [],
+        'dias': dias,
+        'costo_horizonte': round(plan['costo_horizonte'] * mult),
+        'costo_miope': round(plan['costo_miope'] * mult),
+        'ahorro_vs_miope': round((plan['costo_miope'] - plan['costo_horizonte']) * mult),
+        'dias_infactibles': plan['dias_infactibles'],
+    })
+
+
+def _matrices_redistribucion(simulacion, empresa_id, productos, dias=7):
+    """Stock central, stock en ruta y demanda diaria aprobada (producto x región) con consultas agrupadas."""
+    fila_producto = {producto.id: i for i, producto in enumerate(productos)}
+    columna_region = {
+        alias: j
+        for j, region in enumerate(REGIONES_CANONICAS)
+        for alias in variantes_region(region)
+    }
+    forma = (len(productos), len(REGIONES_CANONICAS))
+
+    def _acumular(matriz, filas):
+        for producto_id, region, total in filas:
+            i = fila_producto.get(producto_id)
+            j = columna_region.get(region)
+            if i is not None and j is not None:
+                matriz[i, j] += float(total or 0)
+        return matriz
+
+    stock_central = np.zeros(len(productos))
+    for producto_id, actual, reservada in db.session.query(
+        Inventario.producto_id, Inventario.cantidad_actual, Inventario.cantidad_reservada
+    ).filter(Inventario.empresa_id == empresa_id).all():
+        i = fila_producto.get(producto_id)
+        if i is not None:
+            stock_central[i] = max(0, int(round((actual or 0) - (reservada or 0))))
+
+    # Lo despachado que aún no llega ya cubre demanda de su región
+    en_ruta = _acumular(np.zeros(forma), db.session.query(
+        DespachoRegional.producto_id, DespachoRegional.region, func.sum(DespachoRegional.cantidad)
+    ).filter(
+        DespachoRegional.empresa_id == empresa_id,
+        DespachoRegional.estado.in_(['pendiente', 'en_transito']),
+    ).group_by(DespachoRegional.producto_id, DespachoRegional.region).all())
+
+    filtros = [
+        AprobacionVentaDiaria.empresa_id == empresa_id,
+        AprobacionVentaDiaria.dia_simulacion >= simulacion.dia_actual - dias,
+        AprobacionVentaDiaria.dia_simulacion < simulacion.dia_actual,
+    ]
+    if simulacion.fecha_inicio:
+        filtros.append(AprobacionVentaDiaria.created_at >= simulacion.fecha_inicio)
+    dias_con_aprobacion = db.session.query(
+        func.count(func.distinct(AprobacionVentaDiaria.dia_simulacion))
+    ).filter(*filtros).scalar() or 0
+
+    demanda_diaria = np.zeros(forma)
+    if dias_con_aprobacion:
+        _acumular(demanda_diaria, db.session.query(
+            AprobacionVentaDiaria.producto_id,
+            AprobacionVentaDiaria.region,
+            func.sum(AprobacionVentaDiaria.cantidad_aprobada),
+        ).filter(*filtros).group_by(
+            AprobacionVentaDiaria.producto_id, AprobacionVentaDiaria.region
+        ).all())
+        demanda_diaria /= dias_con_aprobacion
+    else:
+        # Sin historial todavía: se usa lo aprobado hoy como referencia
+        _acumular(demanda_diaria, [
+            (producto_id, region, cantidad)
+            for (producto_id, region), cantidad in _obtener_aprobaciones_ventas_dia(
+                empresa_id, simulacion.dia_actual
+            ).items()
+        ])
+
+    return stock_central, en_ruta, demanda_diaria
+
+
+@bp.route('/api/logistica/plan-redistribucion')
+@login_required
+@estudiante_required
+@rol_required('logistica')
+def api_logistica_plan_redistribucion():
+    """Plan de distribución regional de costo mínimo para todo el catálogo en una sola llamada."""
+    import time
+
+    empresa = current_user.empresa
+    simulacion = contexto_solicitud().simulacion
+
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    try:
+        dias_objetivo = int(request.args.get('dias_objetivo', 7))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'La cobertura objetivo debe ser un número de días'}), 400
+    if dias_objetivo < 1 or dias_objetivo > 30:
+        return jsonify({'success': False, 'message': 'La cobertura objetivo debe estar entre 1 y 30 días'}), 400
+
+    productos = Producto.query.filter_by(activo=True).order_by(Producto.id).all()
+    stock_central, en_ruta, demanda_diaria = _matrices_redistribucion(simulacion, empresa.id, productos)
+
+    from utils.procesamiento_dias import obtener_efecto_logistico_empresa
+    efecto_flota = obtener_efecto_logistico_empresa(simulacion.id, empresa.id)
+    mult = efecto_flota.get('costo_multiplicador', 1.0) if efecto_flota else 1.0
+
+    inicio = time.perf_counter()
+    # Las regiones no guardan stock propio y lo que va en ruta no se puede
+    # redirigir: todo el rebalanceo sale de la bodega central.
+    plan = planificar_redistribucion(
+        en_ruta, demanda_diaria,
+        [tarifa_transporte_region(region) * mult for region in REGIONES_CANONICAS],
+        stock_central=stock_central,
+        dias_objetivo=dias_objetivo,
+        transferir_entre_regiones=False,
+    )
+    movimientos = movimientos_redistribucion(plan, REGIONES_CANONICAS)
+    tiempo_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    def _dias(valor):
+        return round(float(valor), 1) if np.isfinite(valor) else None
+
+    detalle = []
+    for i, producto in enumerate(productos):
+        regiones = []
+        for j, region in enumerate(REGIONES_CANONICAS):
+            regiones.append({
+                'region': region,
+                'demanda_diaria': round(float(demanda_diaria[i, j]), 2),
+                'en_ruta': int(en_ruta[i, j]),
+                'necesidad': int(plan['necesidad'][i, j]),
+                'asignado': int(plan['asignado'][i, j]),
+                'faltante': int(plan['faltante'][i, j]),
+                'dias_cobertura': _dias(plan['dias_cobertura'][i, j]),
+                'dias_cobertura_final': _dias(plan['dias_cobertura_final'][i, j]),
+                'estado': str(ESTADOS_COBERTURA[plan['estado_idx'][i, j]]),
+                'estado_final': str(ESTADOS_COBERTURA[plan['estado_final_idx'][i, j]]),
+            })
+        detalle.append({
+            'producto_id': producto.id,
+            'producto_nombre': producto.nombre,
+            'stock_central': int(stock_central[i]),
+            'asignado': int(plan['asignado'][i].sum()),
+            'faltante': int(plan['faltante'][i].sum()),
+            'costo_transporte': round(float(plan['costo_transporte'][i])),
+            'regiones': regiones,
+        })
+
+    return jsonify({
+        'success': True,
+        'dia_actual': simulacion.dia_actual,
+        'dias_objetivo': dias_objetivo,
+        'regiones': list(REGIONES_CANONICAS),
+        'productos': detalle,
+        'movimientos': [
+            {
+                'producto_id': productos[m['fila']].id,
+                'producto_nombre': productos[m['fila']].nombre,
+                'origen': m['origen'] or 'Bodega central',
+                'destino': m['destino'],
+                'cantidad': int(m['cantidad']),
+                'costo_transporte': round(m['costo_transporte']),
+                'ciclo_dias': m['tiempo_transito'],
+            }
+            for m in movimientos
+        ],
+        'unidades_asignadas': int(plan['asignado'].sum()),
+        'unidades_faltantes': int(plan['faltante'].sum()),
+        'costo_total': round(float(plan['costo_transporte'].sum())),
+        'costo_multiplicador': mult,
+        'tiempo_ms': tiempo_ms,
+    })
+
+
 @bp.route('/api/logistica/despachar', methods=['POST'])
 @login_required
 @estudiante_required
 def api_logistica_despachar():
     """Crear un nuevo despacho regional"""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     data = request.get_json()
     
     producto_id = data.get('producto_id')
@@ -3921,12 +4015,7 @@ def api_logistica_despachar():
                     f'Disponible desde el día {int(ocupacion_vigente) + 1}.'
                 )
             }), 400
-        uso = DisponibilidadVehiculo(
-            empresa_id=empresa.id,
-            vehiculo_id=codigo_vehiculo,
-            dia_disponible_retorno=dia_retorno,
-        )
-        db.session.add(uso)
+        registrar_uso_vehiculos(empresa.id, [(codigo_vehiculo, dia_retorno)])
     db.session.add(despacho)
     db.session.add(movimiento)
     db.session.add(decision)
@@ -3961,427 +4050,35 @@ def api_logistica_despachar_multiple():
                 'message': 'No tienes una empresa asignada'
             }), 400
 
-        simulacion = Simulacion.query.filter_by(activa=True).first()
+        simulacion = contexto_solicitud().simulacion
         if not simulacion:
             return jsonify({
                 'success': False,
                 'message': 'No hay simulaci�n activa'
             }), 400
 
-        decision_existente = Decision.query.filter_by(
-            empresa_id=empresa.id,
-            tipo_decision='logistica_asignacion_vehiculos',
-            semana_simulacion=simulacion.dia_actual,
-        ).first()
-        if decision_existente:
-            return jsonify({
-                'success': False,
-                'message': 'Las asignaciones logísticas de este día ya fueron registradas.'
-            }), 400
-
         aprobaciones = _obtener_aprobaciones_ventas_dia(empresa.id, simulacion.dia_actual)
-        demanda_por_region = {}
-        demanda_por_producto_region = {}
-        for (producto_id, region), cantidad_aprobada in aprobaciones.items():
-            cantidad = int(round(cantidad_aprobada or 0))
-            if cantidad <= 0:
-                continue
-            demanda_por_region[region] = demanda_por_region.get(region, 0) + cantidad
-            demanda_por_producto_region[(producto_id, region)] = cantidad
+        contexto = cargar_contexto_despacho(simulacion, empresa.id, aprobaciones)
 
-        if not demanda_por_region:
+        error, asignaciones_validas = validar_asignaciones_despacho(contexto, asignaciones)
+        if error:
             return jsonify({
                 'success': False,
-                'message': 'No hay aprobaciones de Ventas para el día actual.'
+                'message': error
             }), 400
 
-        vehiculos_catalogo = _obtener_capacidades_vehiculos(simulacion, empresa.id)
-        from utils.procesamiento_dias import obtener_efecto_logistico_empresa
-        efecto_flota = obtener_efecto_logistico_empresa(simulacion.id, empresa.id)
-        opcion_falla_flota = _opcion_falla_flota(simulacion, empresa.id)
-        uso_por_vehiculo = {codigo: 0 for codigo in vehiculos_catalogo.keys()}
-        vehiculos_usados = set()
-        regiones_enviadas = set()
-        total_por_producto = {}
-
-        for item in asignaciones:
-            region = item.get('region')
-            # Soportar array de vehículos o vehículo singular (compatibilidad hacia atrás)
-            vehiculos_item = item.get('vehiculos', [])
-            if isinstance(vehiculos_item, str):
-                vehiculos_item = [vehiculos_item]
-            if not vehiculos_item and item.get('vehiculo'):
-                vehiculos_item = [item.get('vehiculo')]
-            vehiculos_item = [v.strip().upper() for v in vehiculos_item if v]
-            
-            solicitadas = int(item.get('unidades_solicitadas', 0))
-            enviar = int(item.get('unidades_enviar', 0))
-
-            if region not in demanda_por_region:
-                return jsonify({
-                    'success': False,
-                    'message': f'Asignación inválida para región {region}.'
-                }), 400
-
-            demanda_real = demanda_por_region[region]
-            if solicitadas <= 0:
-                return jsonify({
-                    'success': False,
-                    'message': f'Debes definir una cantidad mayor a cero para {region}.'
-                }), 400
-
-            if solicitadas != demanda_real:
-                return jsonify({
-                    'success': False,
-                    'message': (
-                        f'La asignación de {region} debe coincidir con Ventas '
-                        f'({demanda_real} unidades aprobadas).'
-                    )
-                }), 400
-
-            if enviar != demanda_real:
-                return jsonify({
-                    'success': False,
-                    'message': (
-                        f'El despacho de {region} debe ser exactamente {demanda_real} '
-                        'unidades aprobadas por Ventas.'
-                    )
-                }), 400
-
-            # Validar que se hayan asignado vehículos
-            if not vehiculos_item:
-                return jsonify({
-                    'success': False,
-                    'message': f'Debes asignar al menos un vehículo para {region}.'
-                }), 400
-
-            # Validar cada vehículo
-            capacidad_total = 0
-            usa_externo = False
-            for vehiculo in vehiculos_item:
-                if vehiculo not in vehiculos_catalogo:
-                    return jsonify({
-                        'success': False,
-                        'message': f'Vehículo {vehiculo} no válido.'
-                    }), 400
-
-                if vehiculo == 'EXTERNO':
-                    usa_externo = True
-                    continue
-
-                if vehiculo in vehiculos_usados:
-                    return jsonify({
-                        'success': False,
-                        'message': f'El vehículo {vehiculo} ya fue asignado a otra región.'
-                    }), 400
-
-                if opcion_falla_flota == 'B' and usa_externo:
-                    return jsonify({
-                        'success': False,
-                        'message': 'Con la opción B de falla de flota, no se permite usar vehículo externo.'
-                    }), 400
-
-                conf_vehiculo = vehiculos_catalogo[vehiculo]
-                if not conf_vehiculo['disponible']:
-                    dia_retorno = conf_vehiculo.get('dia_retorno')
-                    if dia_retorno:
-                        return jsonify({
-                            'success': False,
-                            'message': f'El {conf_vehiculo["nombre"]} está ocupado por ciclo de transporte. Disponible a partir del día {dia_retorno}.'
-                        }), 400
-                    else:
-                        return jsonify({
-                            'success': False,
-                            'message': f'El {conf_vehiculo["nombre"]} está fuera de operación por disrupción activa.'
-                        }), 400
-
-                # Validación dura en BD: si está ocupado por ciclo hoy, no se puede reasignar.
-                ocupacion_vigente = db.session.query(
-                    db.func.max(DisponibilidadVehiculo.dia_disponible_retorno)
-                ).filter(
-                    DisponibilidadVehiculo.empresa_id == empresa.id,
-                    DisponibilidadVehiculo.vehiculo_id == vehiculo,
-                    DisponibilidadVehiculo.dia_disponible_retorno >= simulacion.dia_actual,
-                ).scalar()
-                if ocupacion_vigente:
-                    return jsonify({
-                        'success': False,
-                        'message': (
-                            f'El vehículo {vehiculo} está fuera de servicio por ciclo de transporte. '
-                            f'Disponible desde el día {int(ocupacion_vigente) + 1}.'
-                        )
-                    }), 400
-                
-                vehiculos_usados.add(vehiculo)
-                capacidad_total += int(conf_vehiculo.get('capacidad') or 0)
-
-            regiones_enviadas.add(region)
-
-        faltantes = [
-            region for region in demanda_por_region.keys()
-            if region not in regiones_enviadas
-        ]
-        if faltantes:
-            return jsonify({
-                'success': False,
-                'message': 'Debes asignar vehículo y envío para todos los pedidos del día.'
-            }), 400
-
-        # Validación por producto: el stock debe alcanzar para cumplir todo el día.
-        inventarios = Inventario.query.filter_by(empresa_id=empresa.id).all()
-        inventario_map = {inv.producto_id: inv for inv in inventarios}
-        productos = Producto.query.filter(Producto.id.in_([pid for (pid, _r) in demanda_por_producto_region.keys()])).all()
-        productos_map = {p.id: p for p in productos}
-
-        for (producto_id, region), cantidad in demanda_por_producto_region.items():
-            inventario = inventario_map.get(producto_id)
-            if not inventario or int(round(inventario.cantidad_actual or 0)) < cantidad:
-                producto = Producto.query.get(producto_id)
-                nombre = producto.nombre if producto else f'Producto {producto_id}'
-                return jsonify({
-                    'success': False,
-                    'message': f'Stock insuficiente para {nombre} en {region}.'
-                }), 400
-
-        # Una asignación por región puede contener varias referencias. Se registran internamente.
-        detalle_despachos = []
-        movimientos_por_producto = {}
-        vehiculos_bloqueados_dia = set()
-        costo_total_logistica = 0.0  # Acumular costos de transporte para restar del capital
-
-        for item in asignaciones:
-            region = item.get('region')
-            # Soportar array de vehículos o vehículo singular (compatibilidad hacia atrás)
-            vehiculos_item = item.get('vehiculos', [])
-            if isinstance(vehiculos_item, str):
-                vehiculos_item = [vehiculos_item]
-            if not vehiculos_item and item.get('vehiculo'):
-                vehiculos_item = [item.get('vehiculo')]
-            vehiculos_item = [v.strip().upper() for v in vehiculos_item if v]
-            
-            cantidad_total_region = int(item.get('unidades_enviar', 0))
-            solicitadas = int(item.get('unidades_solicitadas', 0))
-
-            if region not in demanda_por_region:
-                continue
-
-            demandas_region = [
-                {
-                    'producto_id': pid,
-                    'cantidad': cant,
-                }
-                for (pid, reg), cant in demanda_por_producto_region.items()
-                if reg == region and int(round(cant or 0)) > 0
-            ]
-            dias_entrega_region = calcular_tiempo_entrega_region(region)
-            vehiculos_propios_region = []
-            cargas_por_vehiculo = {}
-            capacidad_total_propios = 0
-            unidades_externo_region = 0
-
-            # Procesar múltiples vehículos seleccionados para esta región
-            for vehiculo in vehiculos_item:
-                if vehiculo == 'EXTERNO':
-                    unidades_externo_region = cantidad_total_region
-                else:
-                    if vehiculo in vehiculos_bloqueados_dia:
-                        return jsonify({
-                            'success': False,
-                            'message': f'El vehículo {vehiculo} ya fue consumido en otra asignación del día.'
-                        }), 400
-
-                    vehiculos_propios_region.append(vehiculo)
-                    vehiculos_bloqueados_dia.add(vehiculo)
-                    capacidad_vehiculo = int((vehiculos_catalogo.get(vehiculo, {}) or {}).get('capacidad') or 0)
-                    capacidad_total_propios += capacidad_vehiculo
-
-            # Calcular cuánto transporta cada tipo de vehículo
-            if vehiculos_propios_region:
-                unidades_principal_region = min(cantidad_total_region, capacidad_total_propios)
-                unidades_externo_region = max(0, cantidad_total_region - unidades_principal_region)
-            else:
-                unidades_principal_region = 0
-                unidades_externo_region = cantidad_total_region
-
-            restante_por_asignar = unidades_principal_region
-            for codigo_prop in vehiculos_propios_region:
-                capacidad_prop = int((vehiculos_catalogo.get(codigo_prop, {}) or {}).get('capacidad') or 0)
-                if capacidad_prop <= 0 or restante_por_asignar <= 0:
-                    cargas_por_vehiculo[codigo_prop] = 0
-                    continue
-                carga = min(capacidad_prop, restante_por_asignar)
-                cargas_por_vehiculo[codigo_prop] = carga
-                uso_por_vehiculo[codigo_prop] = uso_por_vehiculo.get(codigo_prop, 0) + carga
-                restante_por_asignar -= carga
-
-            costo_base_vehiculo_region = 0.0
-            for codigo_prop in vehiculos_propios_region:
-                costo_base_vehiculo_region += float(FLOTA_VEHICULOS.get(codigo_prop, {}).get('costo', 0))
-
-            if opcion_falla_flota == 'B' and unidades_externo_region > 0:
-                return jsonify({
-                    'success': False,
-                    'message': (
-                        f'La región {region} excede la capacidad interna del vehículo asignado. '
-                        'Con opción B no se permite transporte externo.'
-                    )
-                }), 400
-
-            delay_f = 0
-            mult = 1.0
-            if efecto_flota:
-                mult = efecto_flota.get('costo_multiplicador', 1.0)
-                delay_f = efecto_flota.get('delay_semanas', 0)
-
-            dias_entrega_efectivos = max(1, dias_entrega_region + delay_f)
-            dia_llegada = simulacion.dia_actual + dias_entrega_efectivos
-
-            # Bloquear vehículos propios usados hasta su retorno según ciclo de región.
-            for codigo_prop in vehiculos_propios_region:
-                uso_vehiculo = DisponibilidadVehiculo(
-                    empresa_id=empresa.id,
-                    vehiculo_id=codigo_prop,
-                    dia_disponible_retorno=simulacion.dia_actual + obtener_ciclo_region(region),
-                )
-                db.session.add(uso_vehiculo)
-
-            restante_externo = unidades_externo_region
-            restante_principal = unidades_principal_region
-            restante_costo_fijo_region = costo_base_vehiculo_region
-            restante_costo_externo_region = float(unidades_externo_region * 3000)
-
-            for idx, demanda in enumerate(demandas_region):
-                cantidad = int(round(demanda.get('cantidad') or 0))
-                if cantidad <= 0:
-                    continue
-                producto_id = int(demanda.get('producto_id'))
-                producto = productos_map.get(producto_id)
-
-                if cantidad_total_region > 0:
-                    if idx == len(demandas_region) - 1:
-                        cantidad_externa = restante_externo
-                        cantidad_principal = cantidad - cantidad_externa
-                    else:
-                        cantidad_externa = int(round(cantidad * (unidades_externo_region / cantidad_total_region))) if unidades_externo_region > 0 else 0
-                        cantidad_externa = min(cantidad_externa, restante_externo)
-                        cantidad_principal = cantidad - cantidad_externa
-                        cantidad_principal = min(cantidad_principal, restante_principal)
-                        cantidad_externa = cantidad - cantidad_principal
-                    restante_externo -= cantidad_externa
-                    restante_principal -= cantidad_principal
-                else:
-                    cantidad_principal = cantidad
-                    cantidad_externa = 0
-
-                if unidades_externo_region > 0 and cantidad_principal <= 0:
-                    costo_t = round(cantidad * 3000 * mult)
-                else:
-                    if idx == len(demandas_region) - 1:
-                        costo_fijo_item = restante_costo_fijo_region
-                        costo_externo_item = restante_costo_externo_region
-                    else:
-                        proporcion = (cantidad / cantidad_total_region) if cantidad_total_region > 0 else 0
-                        costo_fijo_item = round(costo_base_vehiculo_region * proporcion, 2)
-                        costo_externo_item = round((unidades_externo_region * 3000) * proporcion, 2)
-                        costo_fijo_item = min(costo_fijo_item, restante_costo_fijo_region)
-                        costo_externo_item = min(costo_externo_item, restante_costo_externo_region)
-
-                    restante_costo_fijo_region -= costo_fijo_item
-                    restante_costo_externo_region -= costo_externo_item
-                    costo_t = round((costo_fijo_item + costo_externo_item) * mult)
-
-                despacho = DespachoRegional(
-                    empresa_id=empresa.id,
-                    producto_id=producto_id,
-                    region=region,
-                    cantidad=cantidad,
-                    semana_despacho=simulacion.dia_actual,
-                    semana_entrega_estimado=dia_llegada,
-                    costo_transporte=costo_t,
-                    vehiculos_asignados=(vehiculos_propios_region + (['V_EXTERNO'] if unidades_externo_region > 0 else [])),
-                    estado='en_transito',
-                    usuario_logistica_id=current_user.id,
-                    ventas_asociadas={
-                        'vehiculos': vehiculos_propios_region,
-                        'vehiculos_propios': vehiculos_propios_region,
-                        'cargas_por_vehiculo': cargas_por_vehiculo,
-                        'vehiculo_externo': 'EXTERNO' if cantidad_externa > 0 else None,
-                        'region_total': cantidad_total_region,
-                        'cantidad_principal': cantidad_principal,
-                        'cantidad_externa': cantidad_externa,
-                        'unidades_solicitadas': solicitadas,
-                    },
-                    observaciones=f'Asignación logística día {simulacion.dia_actual}. Región: {region}. Vehículos: {", ".join(vehiculos_propios_region)}.'
-                )
-                if cantidad_externa > 0:
-                    despacho.costo_unitario_externo = 3000.0
-                db.session.add(despacho)
-                
-                # Acumular costo de transporte
-                costo_total_logistica += costo_t
-
-                detalle_despachos.append({
-                    'producto_id': producto_id,
-                    'producto_nombre': producto.nombre if producto else f'Producto {producto_id}',
-                    'region': region,
-                    'vehiculos': vehiculos_propios_region,
-                    'vehiculo_externo': 'EXTERNO' if cantidad_externa > 0 else None,
-                    'cantidad': cantidad,
-                    'cantidad_principal': cantidad_principal,
-                    'cantidad_externa': cantidad_externa,
-                    'dia_llegada': dia_llegada,
-                })
-
-                movimientos_por_producto[producto_id] = movimientos_por_producto.get(producto_id, 0) + cantidad
-
-        for producto_id, total_cantidad in movimientos_por_producto.items():
-            inventario = inventario_map.get(producto_id)
-            saldo_anterior = int(round(inventario.cantidad_actual or 0))
-            inventario.cantidad_actual = max(0, saldo_anterior - total_cantidad)
-            saldo_nuevo = int(round(inventario.cantidad_actual or 0))
-
-            movimiento = MovimientoInventario(
-                empresa_id=empresa.id,
-                producto_id=producto_id,
-                tipo_movimiento='salida_despacho',
-                cantidad=total_cantidad,
-                saldo_anterior=saldo_anterior,
-                saldo_nuevo=saldo_nuevo,
-                semana_simulacion=simulacion.dia_actual,
-                observaciones='Despacho diario por asignación de vehículos',
-                usuario_id=current_user.id
-            )
-            db.session.add(movimiento)
-
-        cantidad_total = sum(d['cantidad'] for d in detalle_despachos)
-        
-        # Restar costo total de transporte del capital de la empresa
-        empresa.capital_actual = max(0, float(empresa.capital_actual or 0) - costo_total_logistica)
-
-        decision = Decision(
-            usuario_id=current_user.id,
-            empresa_id=empresa.id,
-            tipo_decision='logistica_asignacion_vehiculos',
-            semana_simulacion=simulacion.dia_actual,
-            datos_decision={
-                'cantidad_total': cantidad_total,
-                'costo_total_transporte': round(costo_total_logistica, 2),
-                'despachos': detalle_despachos,
-                'uso_vehiculos': uso_por_vehiculo,
-                'descripcion': f'Asignación logística diaria: {len(detalle_despachos)} envíos, {cantidad_total} unidades, costo transporte ${costo_total_logistica:,.0f}'
-            }
-        )
-
-        db.session.add(decision)
+        resultado = calcular_despachos(contexto, asignaciones_validas)
+        detalle_despachos = registrar_despachos(contexto, resultado, empresa, current_user.id)
         db.session.commit()
 
+        cantidad_total = sum(d['cantidad'] for d in detalle_despachos)
         return jsonify({
             'success': True,
             'message': f'Asignación guardada: {len(detalle_despachos)} despachos creados.',
             'despachos_creados': len(detalle_despachos),
             'cantidad_total': cantidad_total,
             'despachos': detalle_despachos,
-            'uso_vehiculos': uso_por_vehiculo,
+            'uso_vehiculos': resultado['uso_vehiculos'],
         })
 
     except Exception as e:
@@ -4392,6 +4089,42 @@ def api_logistica_despachar_multiple():
         }), 500
 
 
+@bp.route('/api/logistica/simular-despacho', methods=['POST'])
+@login_required
+@estudiante_required
+@rol_required('logistica')
+def api_logistica_simular_despacho():
+    """Simula una asignación de vehículos sin guardarla: costo, capacidad, externos y reglas incumplidas."""
+    data = request.get_json(silent=True) or {}
+    asignaciones = data.get('asignaciones', [])
+
+    empresa = current_user.empresa
+    if not empresa:
+        return jsonify({'success': False, 'message': 'No tienes una empresa asignada'}), 400
+
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion:
+        return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
+
+    try:
+        aprobaciones = _obtener_aprobaciones_ventas_dia(empresa.id, simulacion.dia_actual)
+        contexto = cargar_contexto_despacho(simulacion, empresa.id, aprobaciones)
+        violaciones, asignaciones_normalizadas = revisar_asignaciones_despacho(contexto, asignaciones)
+        resultado = calcular_despachos(contexto, asignaciones_normalizadas)
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'success': False, 'message': 'Formato de asignaciones inválido.'}), 400
+
+    return jsonify({
+        'success': True,
+        'dia_actual': simulacion.dia_actual,
+        'valido': not violaciones,
+        'violaciones': violaciones,
+        'demanda_por_region': dict(contexto.demanda_por_region),
+        'costo_multiplicador': contexto.costo_multiplicador,
+        **resumir_simulacion_despacho(contexto, asignaciones_normalizadas, resultado),
+    })
+
+
 @bp.route('/api/logistica/transito')
 @login_required
 @estudiante_required
@@ -4399,18 +4132,15 @@ def api_logistica_despachar_multiple():
 def api_logistica_transito():
     """Obtener compras y despachos en tr�nsito"""
     empresa = current_user.empresa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     if not simulacion:
         return jsonify({'success': False, 'message': 'No hay simulación activa'}), 400
     
-    # Compras en tr�nsito
-    compras = Compra.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).order_by(Compra.semana_entrega).all()
+    pipeline = obtener_pipeline_transito(empresa.id, simulacion.dia_actual)
     
+    # Compras en tr�nsito
     compras_data = []
-    for compra in compras:
+    for compra in pipeline['compras']:
         compras_data.append({
             'id': compra.id,
             'producto_id': compra.producto_id,
@@ -4422,17 +4152,8 @@ def api_logistica_transito():
         })
     
     # Despachos en tr�nsito
-    despachos = DespachoRegional.query.filter_by(
-        empresa_id=empresa.id,
-        estado='en_transito'
-    ).order_by(DespachoRegional.semana_entrega_estimado).all()
-    
     despachos_data = []
-    for despacho in despachos:
-        vehiculo = 'N/A'
-        if isinstance(despacho.ventas_asociadas, dict):
-            vehiculo = despacho.ventas_asociadas.get('vehiculo', vehiculo)
-
+    for despacho in pipeline['despachos']:
         despachos_data.append({
             'id': despacho.id,
             'producto_id': despacho.producto_id,
@@ -4441,7 +4162,7 @@ def api_logistica_transito():
             'region_destino': despacho.region,
             'dia_llegada': despacho.semana_entrega_estimado,
             'semana_llegada': despacho.semana_entrega_estimado,
-            'vehiculo': vehiculo,
+            'vehiculo': despacho.vehiculo,
         })
     
     return jsonify({
@@ -4455,10 +4176,11 @@ def api_logistica_transito():
 @login_required
 @estudiante_required
 @rol_required('logistica')
+@respuesta_cacheada_por_dia
 def api_logistica_fill_rate_region():
     """API: Fill rate (nivel de servicio) acumulado desde el día 1 por región"""
     empresa_id = current_user.empresa_id
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = contexto_solicitud().simulacion
     if not simulacion:
         return jsonify({'error': 'No hay simulación activa'}), 404
 
@@ -4489,3 +4211,36 @@ def api_logistica_fill_rate_region():
         'ventas_totales': ventas_totales,
         'ventas_perdidas': ventas_perdidas
     })
+
+
+@bp.route('/api/eventos')
+@login_required
+@estudiante_required
+def api_eventos():
+    """API: Canal SSE con avances de día, disrupciones y llegadas de compras de la empresa"""
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion or not current_user.empresa_id:
+        return jsonify({'error': 'No hay simulación activa'}), 404
+
+    flujo = flujo_eventos(simulacion.id, current_user.empresa_id)
+    if flujo is None:
+        # Cupo de conexiones del proceso lleno: el cliente pasa a sondear /api/eventos/estado
+        return jsonify({'error': 'Demasiadas conexiones de eventos abiertas'}), 503, {'Retry-After': '60'}
+
+    return Response(
+        flujo,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@bp.route('/api/eventos/estado')
+@login_required
+@estudiante_required
+def api_eventos_estado():
+    """API: Día actual de la simulación, para sondear cuando no hay canal SSE disponible"""
+    simulacion = contexto_solicitud().simulacion
+    if not simulacion:
+        return jsonify({'error': 'No hay simulación activa'}), 404
+
+    return jsonify({'simulacion_id': simulacion.id, 'dia_actual': simulacion.dia_actual})
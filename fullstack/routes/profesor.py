@@ -2,13 +2,14 @@
 Rutas para el rol Profesor (Administrador)
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, current_app
 from flask_login import login_required, current_user
 from functools import wraps
 from sqlalchemy import func
 from models import (Usuario, Empresa, Simulacion, Inventario, Venta, Compra, Decision,
                     Metrica, Producto, MovimientoInventario, DespachoRegional,
-                    RequerimientoCompra, Pronostico, DisrupcionEmpresa)
+                    RequerimientoCompra, Pronostico, DisrupcionEmpresa, AprobacionVentaDiaria,
+                    DashboardSnapshot, PrecioEmpresaProducto)
 from extensions import db
 from datetime import datetime
 import random
@@ -18,6 +19,8 @@ from utils.procesamiento_dias import (
     asegurar_metricas_base_dia_uno
 )
 from utils.reinicio_simulacion import reiniciar_simulacion
+from utils.simulacion_activa import obtener_simulacion_activa
+from utils.perf_consultas import obtener_estadisticas_consultas, reiniciar_estadisticas_consultas
 from utils.demanda_central import exportar_demanda_csv, importar_demanda_csv, generar_base_demanda_simulacion
 from utils.parametros_iniciales import (
     CAPITAL_INICIAL_EMPRESA_DEFAULT,
@@ -62,7 +65,7 @@ def super_admin_required(f):
 def dashboard():
     """Dashboard principal del profesor"""
     # Obtener la simulación activa
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     
     if not simulacion:
         # Crear simulación por defecto si no existe ninguna activa
@@ -101,6 +104,15 @@ def dashboard():
         simulacion_id=simulacion.id
     ).order_by(DisrupcionEmpresa.empresa_id, DisrupcionEmpresa.semana_inicio).all()
 
+    # Salud de inventarios de todas las empresas (análisis vectorizado)
+    from utils.inventario_vectorizado import analizar_salud_inventarios
+    salud_inventarios = analizar_salud_inventarios(
+        ids_empresas,
+        dia_reporte,
+        float(current_app.config.get('COSTO_PEDIDO_COMPRA', 50000.0)),
+        float(current_app.config.get('TASA_MANTENIMIENTO_INVENTARIO_ANUAL', 0.20)),
+    )['por_empresa'] if ids_empresas else {}
+
     return render_template('profesor/dashboard.html',
                          simulacion=simulacion,
                          dia_reporte=dia_reporte,
@@ -108,6 +120,7 @@ def dashboard():
                          total_estudiantes=total_estudiantes,
                          metricas_dia=metricas_dia,
                          disrupciones_sim=disrupciones_sim,
+                         salud_inventarios=salud_inventarios,
                          capital_inicial_default=CAPITAL_INICIAL_EMPRESA_DEFAULT,
                          inv_750_default=INVENTARIO_INICIAL_750_DEFAULT,
                          inv_1l_default=INVENTARIO_INICIAL_1L_DEFAULT,
@@ -212,7 +225,7 @@ def reiniciar_simulacion_endpoint():
 @admin_required
 def descargar_demanda_csv():
     """Descarga la base central de demanda diaria de la simulación activa."""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     if not simulacion:
         flash('No hay simulación activa para descargar demanda.', 'warning')
         return redirect(url_for('profesor.dashboard'))
@@ -234,7 +247,7 @@ def descargar_demanda_csv():
 @admin_required
 def cargar_demanda_csv():
     """Carga y valida una base de demanda diaria en CSV para la simulación activa."""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     if not simulacion:
         flash('No hay simulación activa para cargar demanda.', 'warning')
         return redirect(url_for('profesor.dashboard'))
@@ -467,7 +480,8 @@ def eliminar_empresa(id):
         # 5. Métricas
         Metrica.query.filter_by(empresa_id=id).delete()
         
-        # 6. Decisiones
+        # 6. Decisiones (y las aprobaciones de Ventas que las referencian)
+        AprobacionVentaDiaria.query.filter_by(empresa_id=id).delete()
         Decision.query.filter_by(empresa_id=id).delete()
         
         # 7. Compras
@@ -482,7 +496,13 @@ def eliminar_empresa(id):
         # 10. Disrupciones
         DisrupcionEmpresa.query.filter_by(empresa_id=id).delete()
 
-        # 11. Finalmente eliminar la empresa
+        # 11. Snapshots del dashboard general
+        DashboardSnapshot.query.filter_by(empresa_id=id).delete()
+
+        # 12. Libro de precios de la empresa
+        PrecioEmpresaProducto.query.filter_by(empresa_id=id).delete()
+
+        # 13. Finalmente eliminar la empresa
         db.session.delete(empresa)
         db.session.commit()
         
@@ -586,6 +606,10 @@ def reportes_empresa(id):
         empresa_id=id, estado='en_transito'
     ).order_by(Compra.semana_entrega.asc()).all()
 
+    # Precisión realizada de pronósticos (acumulada al cierre de cada día)
+    from utils.precision_pronosticos import obtener_precision_empresa
+    precision_pronosticos = obtener_precision_empresa(empresa.simulacion, id)
+
     return render_template('profesor/reportes_empresa.html',
                          empresa=empresa,
                          estudiantes=estudiantes,
@@ -601,7 +625,8 @@ def reportes_empresa(id):
                          total_costos=total_costos,
                          total_utilidad=total_utilidad,
                          nivel_servicio_promedio=nivel_servicio_promedio,
-                         compras_activas=compras_activas)
+                         compras_activas=compras_activas,
+                         precision_pronosticos=precision_pronosticos)
 
 
 @bp.route('/reportes')
@@ -639,7 +664,7 @@ def api_metricas_empresa(empresa_id):
 @admin_required
 def resumen_simulacion():
     """Obtiene el resumen actual de la simulación"""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     
     if not simulacion:
         return jsonify({
@@ -834,7 +859,7 @@ def desasignar_estudiante(id):
 @admin_required
 def home():
     """Página de inicio del docente con resumen de empresas"""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     
     # Filtrar empresas según si es super admin o profesor regular
     if current_user.es_super_admin:
@@ -1047,7 +1072,7 @@ def eliminar_profesor(id):
 @admin_required
 def api_market_share():
     """API: Cuota de mercado por empresa (para el administrador/profesor)"""
-    simulacion = Simulacion.query.filter_by(activa=True).first()
+    simulacion = obtener_simulacion_activa()
     if not simulacion:
         return jsonify({'error': 'No hay simulación activa'}), 404
 
@@ -1142,3 +1167,25 @@ def api_market_share():
         'evolucion': evolucion
     })
 
+
+@bp.route('/perf')
+@login_required
+@super_admin_required
+def perf_consultas():
+    """Consultas SQL por endpoint, sentencias repetidas (N+1) y presupuestos"""
+    presupuestos = current_app.config.get('PERF_PRESUPUESTOS_CONSULTAS', {})
+    return render_template('profesor/perf.html',
+                         estadisticas=obtener_estadisticas_consultas(presupuestos),
+                         umbral_repeticiones=current_app.config.get('PERF_UMBRAL_REPETICIONES', 5),
+                         monitor_activo=current_app.config.get('PERF_CONSULTAS_ACTIVO', True))
+
+
+@bp.route('/perf/reiniciar', methods=['POST'])
+@login_required
+@super_admin_required
+def reiniciar_perf_consultas():
+    """Descarta las estadísticas de consultas acumuladas"""
+    reiniciar_estadisticas_consultas()
+    flash('Estadísticas de consultas reiniciadas', 'success')
+    return redirect(url_for('profesor.perf_consultas'))
+
@@ -0,0 +1,154 @@
+"""
+Caché de respuestas de solo lectura por día de simulación
+Guarda el cuerpo de APIs agregadas por (endpoint, argumentos, rol, empresa,
+simulación, día, versión de escritura de la empresa) en un LRU acotado, y
+responde con ETag fuerte para que los sondeos repetidos reciban 304
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional
+from flask import current_app, request, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Empresa
+from utils.simulacion_activa import obtener_simulacion_activa
+
+
+MAXIMO_RESPUESTAS_CACHE = 512
+_CLAVE_SESION = 'empresas_escritas'
+_TODAS = None
+
+_RESPUESTAS_CACHE = OrderedDict()
+# Workers gthread: lectura, reordenamiento y desalojo del LRU bajo el mismo lock
+_lock = threading.Lock()
+
+
+def _ruta_version(empresa_id: Optional[int]) -> str:
+    nombre = 'global' if empresa_id is _TODAS else f'empresa_{int(empresa_id)}'
+    return os.path.join(current_app.config['RESPUESTAS_VERSION_DIR'], f'{nombre}.version')
+
+
+def _leer_version(empresa_id: Optional[int]):
+    """Versión de escritura compartida entre procesos (una llamada a stat)."""
+    try:
+        estado = os.stat(_ruta_version(empresa_id))
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns)
+
+
+def version_escritura_empresa(empresa_id: int):
+    """Versión de escritura de la empresa y la global, para cachés derivados en otros módulos."""
+    return (_leer_version(empresa_id), _leer_version(_TODAS))
+
+
+def renovar_version_empresa(empresa_id: Optional[int] = _TODAS):
+    """Renueva la versión de escritura de una empresa (o la global, que afecta a todas)."""
+    ruta = _ruta_version(empresa_id)
+    temporal = f'{ruta}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(temporal, 'w') as archivo:
+            archivo.write(f'{time.time_ns()}\n')
+        os.replace(temporal, ruta)
+    except OSError:
+        current_app.logger.warning('No se pudo renovar la versión de respuestas en %s', ruta)
+        with _lock:
+            _RESPUESTAS_CACHE.clear()
+
+
+def marcar_empresa_modificada(empresa_id: Optional[int] = _TODAS, session=None):
+    """
+    Marca la versión de una empresa para renovarse al confirmar la transacción
+
+    Las escrituras por la unidad de trabajo del ORM se detectan solas; esto es
+    para inserciones en lote (bulk_save_objects) que no pasan por el flush.
+    """
+    session = session or db.session
+    session.info.setdefault(_CLAVE_SESION, set()).add(empresa_id)
+
+
+def respuesta_cacheada_por_dia(vista):
+    """
+    Decorador para APIs JSON de solo lectura de la empresa del usuario
+
+    Debe ir después de los decoradores de autenticación y rol. Solo se
+    cachean respuestas 200; los errores se recalculan en cada solicitud.
+    """
+    @wraps(vista)
+    def decorated_function(*args, **kwargs):
+        empresa_id = current_user.empresa_id
+        simulacion = obtener_simulacion_activa()
+        if not empresa_id or not simulacion:
+            return vista(*args, **kwargs)
+
+        clave = (
+            request.endpoint,
+            tuple(sorted(request.args.items(multi=True))),
+            tuple(sorted((request.view_args or {}).items())),
+            current_user.rol,
+            empresa_id,
+            simulacion.id,
+            simulacion.dia_actual,
+            _leer_version(empresa_id),
+            _leer_version(_TODAS),
+        )
+        with _lock:
+            cacheada = _RESPUESTAS_CACHE.get(clave)
+            if cacheada is not None:
+                _RESPUESTAS_CACHE.move_to_end(clave)
+        if cacheada is not None:
+            cuerpo, mimetype, etag = cacheada
+            respuesta = current_app.response_class(cuerpo, status=200, mimetype=mimetype)
+        else:
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code != 200 or respuesta.direct_passthrough:
+                return respuesta
+            cuerpo = respuesta.get_data()
+            etag = hashlib.sha1(cuerpo).hexdigest()
+            with _lock:
+                _RESPUESTAS_CACHE[clave] = (cuerpo, respuesta.mimetype, etag)
+                while len(_RESPUESTAS_CACHE) > MAXIMO_RESPUESTAS_CACHE:
+                    _RESPUESTAS_CACHE.popitem(last=False)
+
+        respuesta.set_etag(etag)
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        return respuesta.make_conditional(request)
+    return decorated_function
+
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_escrituras_empresa(session, _flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Empresa):
+            marcar_empresa_modificada(obj.id, session)
+        elif getattr(obj, 'empresa_id', None) is not None:
+            marcar_empresa_modificada(obj.empresa_id, session)
+        else:
+            # Catálogo, demanda de mercado y demás datos compartidos
+            marcar_empresa_modificada(_TODAS, session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _detectar_escrituras_masivas(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        marcar_empresa_modificada(_TODAS, orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _renovar_al_confirmar(session):
+    for empresa_id in session.info.pop(_CLAVE_SESION, ()):
+        renovar_version_empresa(empresa_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_marcas(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)
@@ -0,0 +1,122 @@
+"""
+Contexto de la solicitud HTTP en curso (flask.g)
+Carga una sola vez por solicitud la simulación activa, las aprobaciones de
+Ventas del día y las disrupciones activas de cada empresa
+"""
+
+from typing import Dict
+from flask import g, has_request_context
+from extensions import db
+from models import AprobacionVentaDiaria, DisrupcionEmpresa
+from utils.simulacion_activa import obtener_simulacion_activa
+
+
+class ContextoSolicitud:
+    """Memoria de lecturas repetidas dentro de una misma solicitud."""
+
+    _SIN_CARGAR = object()
+
+    def __init__(self):
+        self._simulacion = self._SIN_CARGAR
+        self._aprobaciones = {}
+        self._disrupciones = {}
+
+    @property
+    def simulacion(self):
+        """Simulación activa de solo lectura (None si no hay)."""
+        if self._simulacion is self._SIN_CARGAR:
+            self._simulacion = obtener_simulacion_activa()
+        return self._simulacion
+
+    def aprobaciones_ventas(self, empresa_id: int, dia_simulacion: int) -> Dict[tuple, int]:
+        """
+        Mapa {(producto_id, region): cantidad} aprobado por Ventas para el día
+
+        Args:
+            empresa_id: ID de la empresa
+            dia_simulacion: Día de simulación
+
+        Returns:
+            Copia del mapa de aprobaciones (vacío si Ventas no ha aprobado)
+        """
+        clave = (empresa_id, dia_simulacion)
+        if clave not in self._aprobaciones:
+            self._aprobaciones[clave] = self._cargar_aprobaciones(empresa_id, dia_simulacion)
+        return dict(self._aprobaciones[clave])
+
+    def _cargar_aprobaciones(self, empresa_id: int, dia_simulacion: int) -> Dict[tuple, int]:
+        simulacion = self.simulacion
+
+        query = db.session.query(
+            AprobacionVentaDiaria.producto_id,
+            AprobacionVentaDiaria.region,
+            AprobacionVentaDiaria.cantidad_aprobada,
+        ).filter(
+            AprobacionVentaDiaria.empresa_id == empresa_id,
+            AprobacionVentaDiaria.dia_simulacion == dia_simulacion,
+        )
+
+        # Aislar aprobaciones a la simulación activa (evita arrastre entre reinicios).
+        if simulacion and simulacion.fecha_inicio:
+            query = query.filter(AprobacionVentaDiaria.created_at >= simulacion.fecha_inicio)
+
+        return {
+            (producto_id, region): max(0, int(cantidad or 0))
+            for producto_id, region, cantidad in query.all()
+        }
+
+    def disrupciones_activas(self, simulacion, empresa_id: int) -> Dict[str, DisrupcionEmpresa]:
+        """
+        Disrupciones activas con opción elegida, por disrupcion_key
+
+        Args:
+            simulacion: Simulación activa
+            empresa_id: ID de la empresa
+
+        Returns:
+            Diccionario {disrupcion_key: DisrupcionEmpresa}
+        """
+        if not simulacion:
+            return {}
+
+        clave = (simulacion.id, empresa_id)
+        if clave not in self._disrupciones:
+            filas = DisrupcionEmpresa.query.filter(
+                DisrupcionEmpresa.empresa_id == empresa_id,
+                DisrupcionEmpresa.simulacion_id == simulacion.id,
+                DisrupcionEmpresa.activa == True,
+                DisrupcionEmpresa.opcion_elegida != None,
+            ).order_by(DisrupcionEmpresa.id).all()
+            activas = {}
+            for fila in filas:
+                activas.setdefault(fila.disrupcion_key, fila)
+            self._disrupciones[clave] = activas
+        return self._disrupciones[clave]
+
+    def invalidar_aprobaciones(self, empresa_id: int = None):
+        """Descarta aprobaciones memorizadas (todas o las de una empresa)."""
+        if empresa_id is None:
+            self._aprobaciones.clear()
+        else:
+            for clave in [k for k in self._aprobaciones if k[0] == empresa_id]:
+                del self._aprobaciones[clave]
+
+    def invalidar_disrupciones(self):
+        """Descarta las disrupciones memorizadas."""
+        self._disrupciones.clear()
+
+
+def contexto_solicitud() -> ContextoSolicitud:
+    """
+    Contexto de la solicitud en curso
+
+    Fuera de una solicitud HTTP (procesos del motor, scripts) retorna un
+    contexto nuevo que no se comparte, para no arrastrar lecturas viejas.
+    """
+    if not has_request_context():
+        return ContextoSolicitud()
+    contexto = getattr(g, '_contexto_solicitud', None)
+    if contexto is None:
+        contexto = ContextoSolicitud()
+        g._contexto_solicitud = contexto
+    return contexto
@@ -10,7 +10,7 @@ import os
 import random
 from typing import Dict, List, Tuple
 
-from models import DemandaMercadoDiaria, Producto, Empresa
+from models import DemandaMercadoDiaria, Producto, Empresa, DashboardSnapshot
 from utils.catalogo_disrupciones import CATALOGO_DISRUPCIONES
 from utils.parametros_iniciales import DURACION_SIMULACION_SEMANAS
 
@@ -494,6 +494,8 @@ def importar_demanda_csv(simulacion, file_storage, min_historico: int = 30) -> T
     from extensions import db
 
     DemandaMercadoDiaria.query.filter_by(simulacion_id=simulacion.id).delete()
+    # El histórico del dashboard general incluye la demanda base: rearmarlo al consultar
+    DashboardSnapshot.query.filter_by(simulacion_id=simulacion.id).delete()
     db.session.bulk_save_objects(rows)
     db.session.flush()
 
@@ -0,0 +1,236 @@
+"""
+Asignación competitiva de demanda vectorizada (por columnas)
+Contraparte de distribuir_demanda_competitiva para todas las empresas,
+productos y regiones a la vez: curva de market share por precio y
+elasticidad, normalización y redondeo por resto mayor con numpy
+"""
+
+from typing import Any, Dict, List
+import numpy as np
+from extensions import db
+from models import DemandaMercadoDiaria, Empresa, Inventario, Producto
+from utils.precios import cargar_precios_simulacion, precio_vigente
+
+
+FACTOR_SIN_STOCK = 0.3
+
+
+def calcular_market_share_vector(
+    precio: np.ndarray,
+    precio_promedio: np.ndarray,
+    stock_disponible: np.ndarray,
+    elasticidad: np.ndarray
+) -> np.ndarray:
+    """
+    Market share sin normalizar según el precio relativo al promedio del mercado
+
+    Los argumentos se combinan con las reglas de broadcasting de numpy.
+
+    Returns:
+        Arreglo con valores entre 0 y 1
+    """
+    precio = np.asarray(precio, dtype=float)
+    precio_promedio = np.asarray(precio_promedio, dtype=float)
+    con_referencia = precio_promedio > 0
+    ratio = precio / np.where(con_referencia, precio_promedio, 1.0)
+    # Productos premium (baja elasticidad) son menos sensibles al precio
+    factor_elasticidad = np.asarray(elasticidad, dtype=float) / 2.0
+
+    market_share = np.select(
+        [ratio > 1.5, ratio > 1.2, ratio > 0.9, ratio > 0.7],
+        [
+            0.0,                                             # Muy alto (>150% del promedio)
+            0.1 + (1.5 - ratio) * 0.3 * factor_elasticidad,  # Alto (120-150%)
+            0.5 + (1.2 - ratio) * 0.5,                       # Competitivo (90-120%)
+            0.6 + (0.9 - ratio) * 1.0,                       # Bajo (70-90%)
+        ],
+        default=0.4,  # Muy bajo (<70%): sospecha de calidad
+    )
+    # Sin referencia de precio: distribución neutra
+    market_share = np.where(con_referencia, market_share, 1.0)
+    # Sin stock se penaliza en lugar de bloquear: la demanda queda registrada como no atendida
+    market_share = np.where(np.asarray(stock_disponible, dtype=float) <= 0,
+                            market_share * FACTOR_SIN_STOCK, market_share)
+    return np.clip(market_share, 0.0, 1.0)
+
+
+def redondear_resto_mayor(cantidades: np.ndarray, totales: np.ndarray) -> np.ndarray:
+    """
+    Redondea cada fila (último eje) a enteros que suman exactamente su total
+
+    Toma la parte entera de cada valor y reparte las unidades faltantes a los
+    mayores restos; los empates favorecen la posición anterior.
+
+    Args:
+        cantidades: Arreglo (..., n) de cantidades fraccionarias
+        totales: Arreglo (...) con el total entero de cada fila
+
+    Returns:
+        Arreglo de enteros con la forma de cantidades
+    """
+    cantidades = np.asarray(cantidades, dtype=float)
+    base = np.floor(cantidades)
+    n = cantidades.shape[-1]
+    faltante = np.clip(np.asarray(totales, dtype=int) - base.sum(axis=-1).astype(int), 0, n)
+
+    orden = np.argsort(base - cantidades, axis=-1, kind='stable')
+    posicion = np.empty_like(orden)
+    np.put_along_axis(posicion, orden, np.broadcast_to(np.arange(n), orden.shape), axis=-1)
+    return (base + (posicion < faltante[..., None])).astype(int)
+
+
+def asignar_demanda_competitiva(
+    precios: np.ndarray,
+    stock_disponible: np.ndarray,
+    demanda: np.ndarray,
+    elasticidad: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Reparte la demanda del mercado entre empresas en una llamada
+
+    Args:
+        precios: Precio por (empresa, producto, región)
+        stock_disponible: Stock disponible por (empresa, producto, región)
+        demanda: Demanda total del mercado por (producto, región)
+        elasticidad: Elasticidad precio por producto
+
+    Returns:
+        Diccionario con 'precio_promedio' (producto, región), 'market_share'
+        normalizado y 'cantidad' asignada (empresa, producto, región)
+    """
+    precios = np.asarray(precios, dtype=float)
+    demanda = np.maximum(0, np.asarray(demanda, dtype=float)).astype(int)
+    if precios.shape[0] == 0:
+        vacio = np.zeros(precios.shape)
+        return {'precio_promedio': np.zeros(demanda.shape), 'market_share': vacio, 'cantidad': vacio.astype(int)}
+
+    # Promedio de todas las empresas, con o sin stock, para una referencia justa
+    precio_promedio = precios.mean(axis=0)
+    market_share = calcular_market_share_vector(
+        precios, precio_promedio, stock_disponible,
+        np.asarray(elasticidad, dtype=float)[:, None],
+    )
+
+    total = market_share.sum(axis=0)
+    normalizado = np.divide(market_share, total, out=np.zeros_like(market_share), where=total > 0)
+    con_mercado = (total > 0) & (precio_promedio > 0)
+    asignable = np.where(con_mercado, demanda, 0)
+
+    # El stock no limita la asignación: limita las ventas reales, y la demanda
+    # no atendida se registra como venta perdida
+    cantidad = redondear_resto_mayor(np.moveaxis(normalizado * asignable, 0, -1), asignable)
+
+    return {
+        'precio_promedio': precio_promedio,
+        'market_share': normalizado,
+        'cantidad': np.moveaxis(cantidad, -1, 0),
+    }
+
+
+def cargar_mercado(simulacion, dia: int, regiones: List[str], empresas: List = None,
+                   precios: Dict = None) -> Dict[str, Any]:
+    """
+    Carga precios, stock y demanda del día como arreglos con tres consultas
+
+    Args:
+        simulacion: Simulación activa
+        dia: Día de ventas
+        regiones: Regiones del mercado (orden del último eje)
+        empresas: Empresas que compiten (todas las de la simulación si es None)
+        precios: Libro de precios del día por empresa (se carga si es None)
+
+    Returns:
+        Diccionario con 'empresa_ids', 'productos', 'regiones' y los arreglos
+        'precios', 'stock', 'demanda' y 'elasticidad'
+    """
+    if empresas is None:
+        empresas = Empresa.query.filter_by(simulacion_id=simulacion.id).order_by(Empresa.id).all()
+    empresa_ids = [empresa.id for empresa in empresas]
+    productos = Producto.query.filter_by(activo=True).order_by(Producto.id).all()
+    if precios is None:
+        precios = cargar_precios_simulacion(simulacion.id, dia, empresa_ids)
+
+    indice_empresa = {empresa_id: i for i, empresa_id in enumerate(empresa_ids)}
+    indice_producto = {producto.id: j for j, producto in enumerate(productos)}
+    indice_region = {region: k for k, region in enumerate(regiones)}
+
+    stock_producto = np.zeros((len(empresa_ids), len(productos)))
+    vistos = set()
+    if empresa_ids and productos:
+        for empresa_id, producto_id, actual, reservada in db.session.query(
+            Inventario.empresa_id, Inventario.producto_id,
+            Inventario.cantidad_actual, Inventario.cantidad_reservada,
+        ).filter(
+            Inventario.empresa_id.in_(empresa_ids),
+            Inventario.producto_id.in_(list(indice_producto)),
+        ).order_by(Inventario.id).all():
+            # Primer registro de inventario por empresa y producto
+            if (empresa_id, producto_id) in vistos:
+                continue
+            vistos.add((empresa_id, producto_id))
+            stock_producto[indice_empresa[empresa_id], indice_producto[producto_id]] = max(
+                0, (actual or 0) - (reservada or 0)
+            )
+
+    demanda = np.zeros((len(productos), len(regiones)))
+    vistos = set()
+    for producto_id, region, demanda_base in db.session.query(
+        DemandaMercadoDiaria.producto_id, DemandaMercadoDiaria.region, DemandaMercadoDiaria.demanda_base,
+    ).filter(
+        DemandaMercadoDiaria.simulacion_id == simulacion.id,
+        DemandaMercadoDiaria.dia_simulacion == dia,
+    ).order_by(DemandaMercadoDiaria.id).all():
+        if producto_id not in indice_producto or region not in indice_region or (producto_id, region) in vistos:
+            continue
+        vistos.add((producto_id, region))
+        demanda[indice_producto[producto_id], indice_region[region]] = int(demanda_base or 0)
+
+    matriz_precios = np.array([
+        [
+            [precio_vigente(precios.get(empresa_id, {}), producto, region) for region in regiones]
+            for producto in productos
+        ]
+        for empresa_id in empresa_ids
+    ], dtype=float).reshape(len(empresa_ids), len(productos), len(regiones))
+
+    return {
+        'empresa_ids': empresa_ids,
+        'productos': productos,
+        'regiones': list(regiones),
+        'precios': matriz_precios,
+        'stock': np.repeat(stock_producto[:, :, None], len(regiones), axis=2),
+        'demanda': demanda,
+        'elasticidad': np.array([float(producto.elasticidad_precio or 0) for producto in productos]),
+    }
+
+
+def distribuir_demanda_mercado(simulacion, dia: int, regiones: List[str], empresas: List = None,
+                               precios: Dict = None) -> Dict[str, Any]:
+    """
+    Demanda competitiva del día para todas las empresas, productos y regiones
+
+    Args:
+        simulacion: Simulación activa
+        dia: Día de ventas
+        regiones: Regiones del mercado
+        empresas: Empresas que compiten (todas las de la simulación si es None)
+        precios: Libro de precios del día por empresa (se carga si es None)
+
+    Returns:
+        Diccionario con 'cantidades' {empresa_id: {(producto_id, región): unidades}}
+        y 'precio_promedio' {(producto_id, región): precio}
+    """
+    mercado = cargar_mercado(simulacion, dia, regiones, empresas, precios)
+    resultado = asignar_demanda_competitiva(
+        mercado['precios'], mercado['stock'], mercado['demanda'], mercado['elasticidad']
+    )
+
+    claves = [(producto.id, region) for producto in mercado['productos'] for region in mercado['regiones']]
+    cantidades = resultado['cantidad'].reshape(len(mercado['empresa_ids']), len(claves))
+    return {
+        'cantidades': {
+            empresa_id: dict(zip(claves, cantidades[i].tolist()))
+            for i, empresa_id in enumerate(mercado['empresa_ids'])
+        },
+        'precio_promedio': dict(zip(claves, resultado['precio_promedio'].ravel().tolist())),
+    }
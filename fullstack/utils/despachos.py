@@ -0,0 +1,575 @@
+"""
+Servicio de despacho diario de Logística
+Carga un contexto de validación con un número fijo de consultas, valida todas
+las asignaciones en memoria y registra los despachos en lote
+"""
+
+from types import MappingProxyType
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
+from extensions import db
+from models import Decision, DespachoRegional, Inventario, MovimientoInventario, Producto
+from utils.contexto_solicitud import contexto_solicitud
+from utils.flota import obtener_ocupacion_flota, registrar_uso_vehiculos
+from utils.transito import marcar_transito_modificado
+from utils.logistica import VEHICULOS_LOGISTICA, calcular_tiempo_entrega_region, obtener_ciclo_region
+from utils.parametros_iniciales import FLOTA_VEHICULOS
+
+
+COSTO_UNITARIO_EXTERNO = 3000.0
+
+
+class ContextoDespacho(NamedTuple):
+    """Fotografía de solo lectura de todo lo que se necesita para validar un despacho."""
+    simulacion_id: int
+    dia: int
+    empresa_id: int
+    ya_registrado: bool
+    demanda_por_region: Dict[str, int]
+    demanda_por_producto_region: Dict[tuple, int]
+    vehiculos: Dict[str, Dict[str, Any]]
+    opcion_falla_flota: Optional[str]
+    costo_multiplicador: float
+    delay_dias: int
+    inventario: Dict[int, int]
+    productos: Dict[int, str]
+
+
+def _normalizar_vehiculos(item: Dict[str, Any]) -> List[str]:
+    """Soporta array de vehículos o vehículo singular (compatibilidad hacia atrás)."""
+    vehiculos_item = item.get('vehiculos', [])
+    if isinstance(vehiculos_item, str):
+        vehiculos_item = [vehiculos_item]
+    if not vehiculos_item and item.get('vehiculo'):
+        vehiculos_item = [item.get('vehiculo')]
+    return [v.strip().upper() for v in vehiculos_item if v]
+
+
+def cargar_contexto_despacho(simulacion, empresa_id: int, aprobaciones: Dict[tuple, int]) -> ContextoDespacho:
+    """
+    Construye el contexto de validación del despacho diario
+
+    Usa un número fijo de consultas sin importar cuántas regiones, vehículos o
+    productos traiga la solicitud: decisión existente, ocupación de la flota,
+    disrupciones activas (compartidas con el contexto de la solicitud),
+    inventarios y productos.
+
+    Args:
+        simulacion: Simulación activa
+        empresa_id: ID de la empresa
+        aprobaciones: Mapa {(producto_id, region): cantidad} aprobado por Ventas para el día
+
+    Returns:
+        ContextoDespacho inmutable
+    """
+    dia = simulacion.dia_actual
+
+    ya_registrado = db.session.query(Decision.id).filter_by(
+        empresa_id=empresa_id,
+        tipo_decision='logistica_asignacion_vehiculos',
+        semana_simulacion=dia,
+    ).first() is not None
+
+    demanda_por_region = {}
+    demanda_por_producto_region = {}
+    for (producto_id, region), cantidad_aprobada in aprobaciones.items():
+        cantidad = int(round(cantidad_aprobada or 0))
+        if cantidad <= 0:
+            continue
+        demanda_por_region[region] = demanda_por_region.get(region, 0) + cantidad
+        demanda_por_producto_region[(producto_id, region)] = cantidad
+
+    # Ocupación de la flota por ciclo de transporte
+    ocupados = obtener_ocupacion_flota(empresa_id, dia)
+
+    falla_flota = contexto_solicitud().disrupciones_activas(simulacion, empresa_id).get('falla_flota')
+
+    vehiculos = {}
+    for codigo, conf in VEHICULOS_LOGISTICA.items():
+        vehiculo = {
+            'codigo': codigo,
+            'nombre': conf['nombre'],
+            'capacidad': conf['capacidad'],
+            'externo': conf['externo'],
+            'disponible': True,
+            'dia_retorno': None,
+        }
+        if codigo in ocupados:
+            vehiculo['disponible'] = False
+            vehiculo['dia_retorno'] = int(ocupados[codigo])
+        if falla_flota and not conf['externo'] and conf['capacidad'] == 500:
+            vehiculo['disponible'] = False
+            vehiculo['dia_retorno'] = None
+        vehiculos[codigo] = MappingProxyType(vehiculo)
+
+    efecto_flota = None
+    if falla_flota:
+        from utils.catalogo_disrupciones import get_disrupcion
+        catalogo = get_disrupcion('falla_flota')
+        opcion = catalogo['opciones'].get(falla_flota.opcion_elegida) if catalogo else None
+        efecto_flota = opcion['efectos'] if opcion else None
+
+    producto_ids = sorted({pid for (pid, _region) in demanda_por_producto_region.keys()})
+    inventario = {}
+    productos = {}
+    if producto_ids:
+        inventario = {
+            producto_id: int(round(cantidad or 0))
+            for producto_id, cantidad in db.session.query(
+                Inventario.producto_id, Inventario.cantidad_actual
+            ).filter(
+                Inventario.empresa_id == empresa_id,
+                Inventario.producto_id.in_(producto_ids),
+            ).all()
+        }
+        productos = dict(db.session.query(Producto.id, Producto.nombre).filter(Producto.id.in_(producto_ids)).all())
+
+    return ContextoDespacho(
+        simulacion_id=simulacion.id,
+        dia=dia,
+        empresa_id=empresa_id,
+        ya_registrado=ya_registrado,
+        demanda_por_region=MappingProxyType(demanda_por_region),
+        demanda_por_producto_region=MappingProxyType(demanda_por_producto_region),
+        vehiculos=MappingProxyType(vehiculos),
+        opcion_falla_flota=falla_flota.opcion_elegida if falla_flota else None,
+        costo_multiplicador=float(efecto_flota.get('costo_multiplicador', 1.0)) if efecto_flota else 1.0,
+        delay_dias=int(efecto_flota.get('delay_semanas', 0)) if efecto_flota else 0,
+        inventario=MappingProxyType(inventario),
+        productos=MappingProxyType(productos),
+    )
+
+
+def revisar_asignaciones_despacho(contexto: ContextoDespacho, asignaciones: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Revisa en memoria las asignaciones y reúne todas las reglas incumplidas
+
+    Las violaciones salen en el mismo orden en que las evalúa el despacho real,
+    así que la primera es el error que éste devolvería. Los vehículos que
+    incumplen una regla se dejan fuera de la asignación normalizada y cada
+    región se normaliza a las unidades aprobadas por Ventas.
+
+    Args:
+        contexto: Contexto de validación del día
+        asignaciones: Items {region, vehiculos, unidades_solicitadas, unidades_enviar}
+
+    Returns:
+        Tupla (lista de violaciones, asignaciones normalizadas por región)
+    """
+    if not asignaciones:
+        return ['No se recibieron asignaciones para procesar.'], []
+
+    violaciones = []
+    if contexto.ya_registrado:
+        violaciones.append('Las asignaciones logísticas de este día ya fueron registradas.')
+
+    if not contexto.demanda_por_region:
+        violaciones.append('No hay aprobaciones de Ventas para el día actual.')
+        return violaciones, []
+
+    vehiculos_usados = set()
+    regiones_enviadas = set()
+    normalizadas = []
+
+    for item in asignaciones:
+        region = item.get('region')
+        vehiculos_item = _normalizar_vehiculos(item)
+        solicitadas = int(item.get('unidades_solicitadas', 0))
+        enviar = int(item.get('unidades_enviar', 0))
+
+        if region not in contexto.demanda_por_region:
+            violaciones.append(f'Asignación inválida para región {region}.')
+            continue
+
+        demanda_real = contexto.demanda_por_region[region]
+        if solicitadas <= 0:
+            violaciones.append(f'Debes definir una cantidad mayor a cero para {region}.')
+        elif solicitadas != demanda_real:
+            violaciones.append(
+                f'La asignación de {region} debe coincidir con Ventas '
+                f'({demanda_real} unidades aprobadas).'
+            )
+
+        if enviar != demanda_real:
+            violaciones.append(
+                f'El despacho de {region} debe ser exactamente {demanda_real} '
+                'unidades aprobadas por Ventas.'
+            )
+
+        if not vehiculos_item:
+            violaciones.append(f'Debes asignar al menos un vehículo para {region}.')
+
+        usa_externo = False
+        propios = []
+        capacidad_propia = 0
+        for vehiculo in vehiculos_item:
+            if vehiculo not in contexto.vehiculos:
+                violaciones.append(f'Vehículo {vehiculo} no válido.')
+                continue
+
+            if vehiculo == 'EXTERNO':
+                usa_externo = True
+                continue
+
+            if vehiculo in vehiculos_usados:
+                violaciones.append(f'El vehículo {vehiculo} ya fue asignado a otra región.')
+                continue
+
+            if contexto.opcion_falla_flota == 'B' and usa_externo:
+                violaciones.append('Con la opción B de falla de flota, no se permite usar vehículo externo.')
+
+            conf_vehiculo = contexto.vehiculos[vehiculo]
+            if not conf_vehiculo['disponible']:
+                dia_retorno = conf_vehiculo.get('dia_retorno')
+                if dia_retorno:
+                    violaciones.append(
+                        f'El {conf_vehiculo["nombre"]} está ocupado por ciclo de transporte. '
+                        f'Disponible a partir del día {dia_retorno}.'
+                    )
+                else:
+                    violaciones.append(f'El {conf_vehiculo["nombre"]} está fuera de operación por disrupción activa.')
+                continue
+
+            vehiculos_usados.add(vehiculo)
+            propios.append(vehiculo)
+            capacidad_propia += int(conf_vehiculo.get('capacidad') or 0)
+
+        regiones_enviadas.add(region)
+        normalizadas.append({
+            'region': region,
+            'vehiculos_propios': propios,
+            'capacidad_propia': capacidad_propia,
+            'cantidad_total': demanda_real,
+            'unidades_solicitadas': solicitadas,
+        })
+
+    if any(region not in regiones_enviadas for region in contexto.demanda_por_region.keys()):
+        violaciones.append('Debes asignar vehículo y envío para todos los pedidos del día.')
+
+    # Validación por producto: el stock debe alcanzar para cumplir todo el día.
+    for (producto_id, region), cantidad in contexto.demanda_por_producto_region.items():
+        if contexto.inventario.get(producto_id, 0) < cantidad:
+            nombre = contexto.productos.get(producto_id) or f'Producto {producto_id}'
+            violaciones.append(f'Stock insuficiente para {nombre} en {region}.')
+
+    if contexto.opcion_falla_flota == 'B':
+        for asignacion in normalizadas:
+            if asignacion['cantidad_total'] > asignacion['capacidad_propia']:
+                violaciones.append(
+                    f'La región {asignacion["region"]} excede la capacidad interna del vehículo asignado. '
+                    'Con opción B no se permite transporte externo.'
+                )
+
+    return violaciones, normalizadas
+
+
+def validar_asignaciones_despacho(contexto: ContextoDespacho, asignaciones: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Valida en memoria las asignaciones de vehículos contra el contexto
+
+    Args:
+        contexto: Contexto de validación del día
+        asignaciones: Items {region, vehiculos, unidades_solicitadas, unidades_enviar}
+
+    Returns:
+        Tupla (mensaje de error o None, asignaciones normalizadas por región)
+    """
+    violaciones, normalizadas = revisar_asignaciones_despacho(contexto, asignaciones)
+    if violaciones:
+        return violaciones[0], []
+    return None, normalizadas
+
+
+def calcular_despachos(contexto: ContextoDespacho, asignaciones: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reparte cada región entre sus productos y calcula cargas, costos y llegadas
+
+    No consulta ni modifica la base de datos.
+
+    Args:
+        contexto: Contexto de validación del día
+        asignaciones: Asignaciones normalizadas por validar_asignaciones_despacho
+
+    Returns:
+        Diccionario con líneas de despacho, bloqueos de vehículos, salidas por
+        producto, uso de vehículos y costo total
+    """
+    mult = contexto.costo_multiplicador
+    uso_por_vehiculo = {codigo: 0 for codigo in contexto.vehiculos.keys()}
+    lineas = []
+    bloqueos = []
+    salidas_por_producto = {}
+    costo_total = 0.0
+
+    for asignacion in asignaciones:
+        region = asignacion['region']
+        cantidad_total_region = asignacion['cantidad_total']
+        vehiculos_propios_region = asignacion['vehiculos_propios']
+        capacidad_total_propios = asignacion['capacidad_propia']
+
+        demandas_region = [
+            (pid, cant)
+            for (pid, reg), cant in contexto.demanda_por_producto_region.items()
+            if reg == region and cant > 0
+        ]
+
+        # Calcular cuánto transporta cada tipo de vehículo
+        if vehiculos_propios_region:
+            unidades_principal_region = min(cantidad_total_region, capacidad_total_propios)
+            unidades_externo_region = max(0, cantidad_total_region - unidades_principal_region)
+        else:
+            unidades_principal_region = 0
+            unidades_externo_region = cantidad_total_region
+
+        cargas_por_vehiculo = {}
+        restante_por_asignar = unidades_principal_region
+        for codigo_prop in vehiculos_propios_region:
+            capacidad_prop = int(contexto.vehiculos[codigo_prop].get('capacidad') or 0)
+            if capacidad_prop <= 0 or restante_por_asignar <= 0:
+                cargas_por_vehiculo[codigo_prop] = 0
+                continue
+            carga = min(capacidad_prop, restante_por_asignar)
+            cargas_por_vehiculo[codigo_prop] = carga
+            uso_por_vehiculo[codigo_prop] = uso_por_vehiculo.get(codigo_prop, 0) + carga
+            restante_por_asignar -= carga
+
+        costo_base_vehiculo_region = sum(
+            float(FLOTA_VEHICULOS.get(codigo_prop, {}).get('costo', 0))
+            for codigo_prop in vehiculos_propios_region
+        )
+
+        dias_entrega_efectivos = max(1, calcular_tiempo_entrega_region(region) + contexto.delay_dias)
+        dia_llegada = contexto.dia + dias_entrega_efectivos
+
+        # Bloquear vehículos propios usados hasta su retorno según ciclo de región.
+        for codigo_prop in vehiculos_propios_region:
+            bloqueos.append((codigo_prop, contexto.dia + obtener_ciclo_region(region)))
+
+        restante_externo = unidades_externo_region
+        restante_principal = unidades_principal_region
+        restante_costo_fijo_region = costo_base_vehiculo_region
+        restante_costo_externo_region = float(unidades_externo_region * COSTO_UNITARIO_EXTERNO)
+
+        for idx, (producto_id, cantidad) in enumerate(demandas_region):
+            if cantidad_total_region > 0:
+                if idx == len(demandas_region) - 1:
+                    cantidad_externa = restante_externo
+                    cantidad_principal = cantidad - cantidad_externa
+                else:
+                    cantidad_externa = int(round(cantidad * (unidades_externo_region / cantidad_total_region))) if unidades_externo_region > 0 else 0
+                    cantidad_externa = min(cantidad_externa, restante_externo)
+                    cantidad_principal = cantidad - cantidad_externa
+                    cantidad_principal = min(cantidad_principal, restante_principal)
+                    cantidad_externa = cantidad - cantidad_principal
+                restante_externo -= cantidad_externa
+                restante_principal -= cantidad_principal
+            else:
+                cantidad_principal = cantidad
+                cantidad_externa = 0
+
+            if unidades_externo_region > 0 and cantidad_principal <= 0:
+                costo_t = round(cantidad * COSTO_UNITARIO_EXTERNO * mult)
+            else:
+                if idx == len(demandas_region) - 1:
+                    costo_fijo_item = restante_costo_fijo_region
+                    costo_externo_item = restante_costo_externo_region
+                else:
+                    proporcion = (cantidad / cantidad_total_region) if cantidad_total_region > 0 else 0
+                    costo_fijo_item = round(costo_base_vehiculo_region * proporcion, 2)
+                    costo_externo_item = round((unidades_externo_region * COSTO_UNITARIO_EXTERNO) * proporcion, 2)
+                    costo_fijo_item = min(costo_fijo_item, restante_costo_fijo_region)
+                    costo_externo_item = min(costo_externo_item, restante_costo_externo_region)
+
+                restante_costo_fijo_region -= costo_fijo_item
+                restante_costo_externo_region -= costo_externo_item
+                costo_t = round((costo_fijo_item + costo_externo_item) * mult)
+
+            costo_total += costo_t
+            salidas_por_producto[producto_id] = salidas_por_producto.get(producto_id, 0) + cantidad
+            lineas.append({
+                'producto_id': producto_id,
+                'producto_nombre': contexto.productos.get(producto_id) or f'Producto {producto_id}',
+                'region': region,
+                'vehiculos': vehiculos_propios_region,
+                'vehiculo_externo': 'EXTERNO' if cantidad_externa > 0 else None,
+                'cantidad': cantidad,
+                'cantidad_principal': cantidad_principal,
+                'cantidad_externa': cantidad_externa,
+                'dia_llegada': dia_llegada,
+                'costo_transporte': costo_t,
+                'usa_externo_region': unidades_externo_region > 0,
+                'cargas_por_vehiculo': cargas_por_vehiculo,
+                'region_total': cantidad_total_region,
+                'unidades_solicitadas': asignacion['unidades_solicitadas'],
+            })
+
+    return {
+        'lineas': lineas,
+        'bloqueos': bloqueos,
+        'salidas_por_producto': salidas_por_producto,
+        'uso_vehiculos': uso_por_vehiculo,
+        'costo_total': costo_total,
+    }
+
+
+def resumir_simulacion_despacho(contexto: ContextoDespacho, asignaciones: List[Dict[str, Any]],
+                                resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Costo, uso de capacidad y unidades externas por región de un despacho calculado
+
+    No consulta ni modifica la base de datos.
+
+    Args:
+        contexto: Contexto de validación del día
+        asignaciones: Asignaciones normalizadas
+        resultado: Resultado de calcular_despachos sobre esas asignaciones
+
+    Returns:
+        Diccionario con el detalle por región y los totales del día
+    """
+    por_region = {
+        asignacion['region']: {
+            'region': asignacion['region'],
+            'vehiculos': list(asignacion['vehiculos_propios']),
+            'unidades': asignacion['cantidad_total'],
+            'capacidad_propia': asignacion['capacidad_propia'],
+            'unidades_propias': 0,
+            'unidades_externo': 0,
+            'costo_transporte': 0.0,
+            'dia_llegada': None,
+            'dia_retorno_vehiculos': contexto.dia + obtener_ciclo_region(asignacion['region']),
+        }
+        for asignacion in asignaciones
+    }
+    for linea in resultado['lineas']:
+        region = por_region[linea['region']]
+        region['unidades_propias'] += linea['cantidad_principal']
+        region['unidades_externo'] += linea['cantidad_externa']
+        region['costo_transporte'] += linea['costo_transporte']
+        region['dia_llegada'] = linea['dia_llegada']
+
+    capacidad_total = 0
+    unidades_propias = 0
+    for region in por_region.values():
+        capacidad = region['capacidad_propia']
+        region['utilizacion'] = round(region['unidades_propias'] / capacidad, 4) if capacidad else None
+        capacidad_total += capacidad
+        unidades_propias += region['unidades_propias']
+
+    return {
+        'regiones': list(por_region.values()),
+        'costo_total': resultado['costo_total'],
+        'unidades_total': sum(r['unidades'] for r in por_region.values()),
+        'unidades_propias': unidades_propias,
+        'unidades_externo': sum(r['unidades_externo'] for r in por_region.values()),
+        'capacidad_propia': capacidad_total,
+        'utilizacion': round(unidades_propias / capacidad_total, 4) if capacidad_total else None,
+        'uso_vehiculos': {codigo: carga for codigo, carga in resultado['uso_vehiculos'].items() if carga},
+    }
+
+
+def registrar_despachos(contexto: ContextoDespacho, resultado: Dict[str, Any], empresa, usuario_id: int) -> List[Dict[str, Any]]:
+    """
+    Persiste en lote despachos, bloqueos de vehículos, movimientos y la decisión del día
+
+    No hace commit.
+
+    Args:
+        contexto: Contexto de validación del día
+        resultado: Resultado de calcular_despachos
+        empresa: Empresa que despacha (se descuenta el costo de su capital)
+        usuario_id: Usuario de Logística que registra
+
+    Returns:
+        Detalle de despachos creados (formato de respuesta de la API)
+    """
+    dia = contexto.dia
+    despachos = []
+    detalle_despachos = []
+    for linea in resultado['lineas']:
+        vehiculos_propios = linea['vehiculos']
+        despacho = DespachoRegional(
+            empresa_id=contexto.empresa_id,
+            producto_id=linea['producto_id'],
+            region=linea['region'],
+            cantidad=linea['cantidad'],
+            semana_despacho=dia,
+            semana_entrega_estimado=linea['dia_llegada'],
+            costo_transporte=linea['costo_transporte'],
+            vehiculos_asignados=(vehiculos_propios + (['V_EXTERNO'] if linea['usa_externo_region'] else [])),
+            estado='en_transito',
+            usuario_logistica_id=usuario_id,
+            ventas_asociadas={
+                'vehiculos': vehiculos_propios,
+                'vehiculos_propios': vehiculos_propios,
+                'cargas_por_vehiculo': linea['cargas_por_vehiculo'],
+                'vehiculo_externo': linea['vehiculo_externo'],
+                'region_total': linea['region_total'],
+                'cantidad_principal': linea['cantidad_principal'],
+                'cantidad_externa': linea['cantidad_externa'],
+                'unidades_solicitadas': linea['unidades_solicitadas'],
+            },
+            observaciones=f'Asignación logística día {dia}. Región: {linea["region"]}. Vehículos: {", ".join(vehiculos_propios)}.'
+        )
+        if linea['cantidad_externa'] > 0:
+            despacho.costo_unitario_externo = COSTO_UNITARIO_EXTERNO
+        despachos.append(despacho)
+
+        detalle_despachos.append({
+            'producto_id': linea['producto_id'],
+            'producto_nombre': linea['producto_nombre'],
+            'region': linea['region'],
+            'vehiculos': vehiculos_propios,
+            'vehiculo_externo': linea['vehiculo_externo'],
+            'cantidad': linea['cantidad'],
+            'cantidad_principal': linea['cantidad_principal'],
+            'cantidad_externa': linea['cantidad_externa'],
+            'dia_llegada': linea['dia_llegada'],
+        })
+
+    salidas = resultado['salidas_por_producto']
+    inventarios = Inventario.query.filter(
+        Inventario.empresa_id == contexto.empresa_id,
+        Inventario.producto_id.in_(list(salidas.keys())),
+    ).all() if salidas else []
+    movimientos = []
+    for inventario in inventarios:
+        total_cantidad = salidas[inventario.producto_id]
+        saldo_anterior = int(round(inventario.cantidad_actual or 0))
+        inventario.cantidad_actual = max(0, saldo_anterior - total_cantidad)
+        movimientos.append(MovimientoInventario(
+            empresa_id=contexto.empresa_id,
+            producto_id=inventario.producto_id,
+            tipo_movimiento='salida_despacho',
+            cantidad=total_cantidad,
+            saldo_anterior=saldo_anterior,
+            saldo_nuevo=int(round(inventario.cantidad_actual or 0)),
+            semana_simulacion=dia,
+            observaciones='Despacho diario por asignación de vehículos',
+            usuario_id=usuario_id
+        ))
+
+    db.session.bulk_save_objects(despachos)
+    marcar_transito_modificado(contexto.empresa_id)
+    registrar_uso_vehiculos(contexto.empresa_id, resultado['bloqueos'])
+    db.session.bulk_save_objects(movimientos)
+
+    costo_total_logistica = resultado['costo_total']
+    cantidad_total = sum(d['cantidad'] for d in detalle_despachos)
+
+    # Restar costo total de transporte del capital de la empresa
+    empresa.capital_actual = max(0, float(empresa.capital_actual or 0) - costo_total_logistica)
+
+    db.session.add(Decision(
+        usuario_id=usuario_id,
+        empresa_id=contexto.empresa_id,
+        tipo_decision='logistica_asignacion_vehiculos',
+        semana_simulacion=dia,
+        datos_decision={
+            'cantidad_total': cantidad_total,
+            'costo_total_transporte': round(costo_total_logistica, 2),
+            'despachos': detalle_despachos,
+            'uso_vehiculos': resultado['uso_vehiculos'],
+            'descripcion': f'Asignación logística diaria: {len(detalle_despachos)} envíos, {cantidad_total} unidades, costo transporte ${costo_total_logistica:,.0f}'
+        }
+    ))
+    return detalle_despachos
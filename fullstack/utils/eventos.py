@@ -0,0 +1,236 @@
+"""
+Eventos de la simulación para los tableros de estudiantes (Server-Sent Events)
+Publicación/suscripción en memoria del proceso por canal (simulación, empresa),
+con un broker Redis opcional para que varios workers de gunicorn compartan los
+eventos. Los eventos se publican al confirmar la transacción que los produjo.
+
+Cada conexión abierta ocupa un hilo del worker gthread durante hasta
+SEGUNDOS_MAXIMOS_CONEXION, por eso las conexiones por proceso están acotadas
+(EVENTOS_MAXIMO_CONEXIONES) y el resto de clientes sondea el estado. Con más
+de un worker (WEB_CONCURRENCY > 1) se necesita EVENTOS_REDIS_URL: sin Redis,
+un evento solo llega a las conexiones del worker que lo publicó.
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+
+try:
+    import redis
+except ImportError:  # Broker opcional: sin redis los eventos quedan en el proceso
+    redis = None
+
+
+EVENTO_DIA_AVANZADO = 'dia_avanzado'
+EVENTO_DISRUPCION_ACTIVADA = 'disrupcion_activada'
+EVENTO_DISRUPCION_EXPIRADA = 'disrupcion_expirada'
+EVENTO_COMPRA_LLEGADA = 'compra_llegada'
+
+SEGUNDOS_LATIDO = 15
+SEGUNDOS_MAXIMOS_CONEXION = 300
+MAXIMO_CONEXIONES_DEFECTO = 8
+MAXIMO_EVENTOS_PENDIENTES = 100
+_CLAVE_SESION = 'eventos_pendientes'
+_TODAS = '*'
+_PREFIJO_REDIS = 'supply_chain:eventos:'
+
+
+def _canal(simulacion_id: int, empresa_id) -> str:
+    return f'{simulacion_id}:{empresa_id}'
+
+
+class _BrokerLocal:
+    """Suscriptores de este proceso: una cola acotada por conexión SSE."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+
+    def suscribir(self, canales) -> queue.Queue:
+        cola = queue.Queue(maxsize=MAXIMO_EVENTOS_PENDIENTES)
+        with self._lock:
+            for canal in canales:
+                self._suscriptores.setdefault(canal, set()).add(cola)
+        return cola
+
+    def cancelar(self, canales, cola: queue.Queue):
+        with self._lock:
+            for canal in canales:
+                colas = self._suscriptores.get(canal)
+                if colas is not None:
+                    colas.discard(cola)
+                    if not colas:
+                        del self._suscriptores[canal]
+
+    def publicar(self, canal: str, mensaje: Dict[str, Any]):
+        with self._lock:
+            colas = list(self._suscriptores.get(canal, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:
+                # Cliente lento: el evento se descarta, el siguiente lo hará refrescar igual
+                pass
+
+
+class _BrokerRedis:
+    """Reenvía los eventos entre workers por Redis pub/sub hacia el broker local."""
+
+    def __init__(self, url: str, local: _BrokerLocal):
+        self._cliente = redis.Redis.from_url(url)
+        self._local = local
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar_escucha(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            pubsub = self._cliente.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(f'{_PREFIJO_REDIS}*')
+            self._hilo = threading.Thread(target=self._escuchar, args=(pubsub,), daemon=True)
+            self._hilo.start()
+
+    def _escuchar(self, pubsub):
+        for mensaje in pubsub.listen():
+            canal = mensaje['channel'].decode()[len(_PREFIJO_REDIS):]
+            self._local.publicar(canal, json.loads(mensaje['data']))
+
+    def publicar(self, canal: str, mensaje: Dict[str, Any]):
+        self._cliente.publish(f'{_PREFIJO_REDIS}{canal}', json.dumps(mensaje, default=str))
+
+
+class _FlujoEventos:
+    """Iterable de la respuesta SSE que libera su cupo al cerrarse, aunque no se haya iniciado."""
+
+    def __init__(self, generador: Iterator[str]):
+        self._generador = generador
+        self._liberado = False
+
+    def __iter__(self):
+        return self._generador
+
+    def close(self):
+        try:
+            self._generador.close()
+        finally:
+            if not self._liberado:
+                self._liberado = True
+                _liberar_conexion()
+
+
+_broker_local = _BrokerLocal()
+_broker_redis = {'url': None, 'broker': None}
+_conexiones = {'abiertas': 0}
+_lock_conexiones = threading.Lock()
+
+
+def _reservar_conexion() -> bool:
+    maximo = current_app.config.get('EVENTOS_MAXIMO_CONEXIONES', MAXIMO_CONEXIONES_DEFECTO)
+    with _lock_conexiones:
+        if _conexiones['abiertas'] >= maximo:
+            return False
+        _conexiones['abiertas'] += 1
+        return True
+
+
+def _liberar_conexion():
+    with _lock_conexiones:
+        _conexiones['abiertas'] = max(0, _conexiones['abiertas'] - 1)
+
+
+def _obtener_broker_redis() -> Optional[_BrokerRedis]:
+    url = current_app.config.get('EVENTOS_REDIS_URL')
+    if not url:
+        return None
+    if redis is None:
+        current_app.logger.warning('EVENTOS_REDIS_URL configurado pero el paquete redis no está instalado')
+        return None
+    if _broker_redis['url'] != url:
+        _broker_redis['broker'] = _BrokerRedis(url, _broker_local)
+        _broker_redis['url'] = url
+    return _broker_redis['broker']
+
+
+def publicar_evento(tipo: str, simulacion_id: int, empresa_id: Optional[int] = None,
+                    datos: Optional[Dict[str, Any]] = None):
+    """
+    Publica un evento de inmediato
+
+    Args:
+        tipo: Uno de los EVENTO_* del módulo
+        simulacion_id: ID de la simulación
+        empresa_id: Empresa destinataria (None para todas las empresas de la simulación)
+        datos: Carga útil serializable a JSON
+    """
+    canal = _canal(simulacion_id, _TODAS if empresa_id is None else empresa_id)
+    mensaje = {'tipo': tipo, 'datos': datos or {}, 'publicado_en': time.time()}
+    broker = _obtener_broker_redis()
+    if broker is not None:
+        try:
+            broker.publicar(canal, mensaje)
+            return
+        except redis.RedisError:
+            current_app.logger.warning('No se pudo publicar el evento %s en Redis; se entrega solo en este proceso', tipo)
+    _broker_local.publicar(canal, mensaje)
+
+
+def publicar_al_confirmar(tipo: str, simulacion_id: int, empresa_id: Optional[int] = None,
+                          datos: Optional[Dict[str, Any]] = None, session=None):
+    """Encola un evento para publicarse solo si la transacción actual se confirma."""
+    session = session or db.session
+    session.info.setdefault(_CLAVE_SESION, []).append((tipo, simulacion_id, empresa_id, datos))
+
+
+def flujo_eventos(simulacion_id: int, empresa_id: int) -> Optional[Iterator[str]]:
+    """
+    Generador de texto SSE para una conexión de la empresa
+
+    Envía un latido cada SEGUNDOS_LATIDO y cierra la conexión tras
+    SEGUNDOS_MAXIMOS_CONEXION; EventSource se reconecta solo.
+
+    Returns:
+        Iterable de la respuesta, o None si el proceso ya tiene
+        EVENTOS_MAXIMO_CONEXIONES abiertas (el cliente debe sondear)
+    """
+    if not _reservar_conexion():
+        return None
+
+    canales = (_canal(simulacion_id, empresa_id), _canal(simulacion_id, _TODAS))
+    broker = _obtener_broker_redis()
+    if broker is not None:
+        broker.iniciar_escucha()
+
+    def generar():
+        limite = time.monotonic() + SEGUNDOS_MAXIMOS_CONEXION
+        cola = _broker_local.suscribir(canales)
+        try:
+            yield 'retry: 5000\n\n'
+            while time.monotonic() < limite:
+                try:
+                    mensaje = cola.get(timeout=SEGUNDOS_LATIDO)
+                except queue.Empty:
+                    yield ': latido\n\n'
+                    continue
+                yield f"event: {mensaje['tipo']}\ndata: {json.dumps(mensaje['datos'], default=str)}\n\n"
+        finally:
+            _broker_local.cancelar(canales, cola)
+
+    return _FlujoEventos(generar())
+
+
+@event.listens_for(Session, 'after_commit')
+def _publicar_al_confirmar(session):
+    for tipo, simulacion_id, empresa_id, datos in session.info.pop(_CLAVE_SESION, ()):
+        publicar_evento(tipo, simulacion_id, empresa_id, datos)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_eventos(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)
@@ -0,0 +1,101 @@
+"""
+Estado actual de la flota propia por empresa
+Una fila por (empresa, vehículo) con el día de retorno vigente; la tabla
+DisponibilidadVehiculo se conserva como historial de viajes
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.util import identity_key
+from extensions import db
+from models import DisponibilidadVehiculo, EstadoVehiculo
+from utils.cache_respuestas import marcar_empresa_modificada
+
+
+def obtener_ocupacion_flota(empresa_id: int, dia: int) -> Dict[str, int]:
+    """
+    Vehículos ocupados por ciclo de transporte en un día
+
+    Args:
+        empresa_id: ID de la empresa
+        dia: Día de simulación a consultar
+
+    Returns:
+        Diccionario {vehiculo_id: día de retorno} de los vehículos ocupados
+    """
+    return dict(db.session.query(
+        EstadoVehiculo.vehiculo_id,
+        EstadoVehiculo.dia_disponible_retorno,
+    ).filter(
+        EstadoVehiculo.empresa_id == empresa_id,
+        EstadoVehiculo.dia_disponible_retorno >= dia,
+    ).all())
+
+
+def dia_retorno_vehiculo(empresa_id: int, vehiculo_id: str, dia: int) -> Optional[int]:
+    """Retorna el día de retorno si el vehículo está ocupado en el día dado, o None."""
+    estado = db.session.get(EstadoVehiculo, (empresa_id, vehiculo_id))
+    if estado and estado.dia_disponible_retorno >= dia:
+        return estado.dia_disponible_retorno
+    return None
+
+
+def registrar_uso_vehiculos(empresa_id: int, usos: List[Tuple[str, int]]) -> None:
+    """
+    Bloquea vehículos propios hasta su día de retorno
+
+    Agrega el viaje al historial y actualiza el estado vigente en la misma
+    transacción. No hace commit.
+
+    Args:
+        empresa_id: ID de la empresa
+        usos: Lista de (vehiculo_id, día de retorno)
+    """
+    if not usos:
+        return
+
+    db.session.bulk_save_objects([
+        DisponibilidadVehiculo(
+            empresa_id=empresa_id,
+            vehiculo_id=vehiculo_id,
+            dia_disponible_retorno=dia_retorno,
+        )
+        for vehiculo_id, dia_retorno in usos
+    ])
+
+    # Un solo día de retorno por vehículo: el mayor de los usos del lote
+    retornos = {}
+    for vehiculo_id, dia_retorno in usos:
+        retornos[vehiculo_id] = max(dia_retorno, retornos.get(vehiculo_id, dia_retorno))
+
+    # Upsert atómico: dos despachos simultáneos de un vehículo sin estado no
+    # chocan en la clave (empresa_id, vehiculo_id) y el retorno nunca retrocede
+    dialecto = db.session.get_bind().dialect.name
+    insertar = postgresql.insert if dialecto == 'postgresql' else sqlite.insert
+    sentencia = insertar(EstadoVehiculo).values([
+        {'empresa_id': empresa_id, 'vehiculo_id': vehiculo_id, 'dia_disponible_retorno': dia_retorno}
+        for vehiculo_id, dia_retorno in sorted(retornos.items())
+    ])
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[EstadoVehiculo.empresa_id, EstadoVehiculo.vehiculo_id],
+        set_={
+            'dia_disponible_retorno': case(
+                (sentencia.excluded.dia_disponible_retorno > EstadoVehiculo.dia_disponible_retorno,
+                 sentencia.excluded.dia_disponible_retorno),
+                else_=EstadoVehiculo.dia_disponible_retorno,
+            ),
+            # ON CONFLICT no aplica Column.onupdate
+            'updated_at': datetime.utcnow(),
+        },
+    )
+    db.session.execute(sentencia)
+
+    # El upsert no pasa por la unidad de trabajo: refrescar estados ya cargados
+    # y renovar la versión de respuestas de la empresa
+    for vehiculo_id in retornos:
+        estado = db.session.identity_map.get(identity_key(EstadoVehiculo, (empresa_id, vehiculo_id)))
+        if estado is not None:
+            db.session.expire(estado)
+    marcar_empresa_modificada(empresa_id)
@@ -0,0 +1,283 @@
+"""
+Analítica de inventario vectorizada (por columnas)
+Contraparte de utils/inventario para todas las empresas y productos a la vez:
+consumo, cobertura, EOQ/punto de reorden y prioridad de compra con numpy
+"""
+
+from typing import Dict, List, Any
+import numpy as np
+from sqlalchemy import func
+from extensions import db
+from models import Inventario, Producto, Venta
+
+
+DIAS_CONSUMO = 7
+COBERTURA_SIN_CONSUMO = 999
+ESTADOS_INVENTARIO = np.array(['critico', 'bajo', 'normal', 'alto'])
+ALERTAS_INVENTARIO = np.array([
+    'Inventario crítico - Ordenar urgentemente',
+    'Inventario bajo - Considerar ordenar',
+    'Nivel adecuado',
+    'Inventario alto - Evaluar sobrestock',
+])
+PRIORIDADES_COMPRA = np.array(['Alta', 'Media', 'Baja'])
+
+
+def calcular_consumo_diario_matriz(ventas: np.ndarray, dias: int = DIAS_CONSUMO) -> np.ndarray:
+    """
+    Consumo diario promedio por fila a partir de una matriz de ventas
+
+    Args:
+        ventas: Matriz (filas x días) con unidades vendidas por día
+        dias: Número de días (últimas columnas) a considerar
+
+    Returns:
+        Arreglo con el consumo promedio por día de cada fila
+    """
+    ventas = np.asarray(ventas, dtype=float)
+    if ventas.ndim != 2 or ventas.shape[1] == 0 or dias <= 0:
+        return np.zeros(ventas.shape[0] if ventas.ndim else 0)
+    return ventas[:, -dias:].sum(axis=1) / dias
+
+
+def calcular_dias_cobertura_vector(stock: np.ndarray, consumo_diario: np.ndarray) -> np.ndarray:
+    """Días de cobertura por fila; infinito cuando no hay consumo."""
+    stock = np.asarray(stock, dtype=float)
+    consumo_diario = np.asarray(consumo_diario, dtype=float)
+    con_consumo = consumo_diario > 0
+    return np.where(
+        con_consumo,
+        stock / np.where(con_consumo, consumo_diario, 1.0),
+        np.inf,
+    )
+
+
+def calcular_punto_reorden_economico_vector(
+    demanda_anual: np.ndarray,
+    costo_pedido: Any,
+    costo_almacenamiento: np.ndarray,
+    lead_time: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    EOQ y punto de reorden por fila (misma fórmula que calcular_punto_reorden_economico)
+
+    Args:
+        demanda_anual: Demanda anual por fila
+        costo_pedido: Costo de realizar un pedido (escalar o arreglo)
+        costo_almacenamiento: Costo anual de almacenar una unidad por fila
+        lead_time: Tiempo de entrega en días por fila
+
+    Returns:
+        Diccionario con arreglos 'eoq', 'punto_reorden' y 'demanda_diaria'
+    """
+    demanda_anual = np.asarray(demanda_anual, dtype=float)
+    costo_almacenamiento = np.asarray(costo_almacenamiento, dtype=float)
+    costo_almacenamiento = np.where(costo_almacenamiento <= 0, 1.0, costo_almacenamiento)
+
+    eoq = np.sqrt((2 * demanda_anual * np.asarray(costo_pedido, dtype=float)) / costo_almacenamiento)
+    demanda_diaria = demanda_anual / 365
+    punto_reorden = demanda_diaria * np.asarray(lead_time, dtype=float)
+
+    return {
+        'eoq': np.round(eoq, 2),
+        'punto_reorden': np.round(punto_reorden, 2),
+        'demanda_diaria': np.round(demanda_diaria, 2),
+    }
+
+
+def clasificar_estado_inventario(dias_cobertura: np.ndarray) -> np.ndarray:
+    """Índice de estado por fila: 0 crítico (<3), 1 bajo (<7), 2 normal (<14), 3 alto."""
+    return np.digitize(np.asarray(dias_cobertura, dtype=float), [3, 7, 14])
+
+
+def priorizar_compra_vector(dias_cobertura: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Prioridad de compra por fila y orden de atención (menor cobertura primero)
+
+    Returns:
+        Diccionario con 'prioridad_num' (1 Alta, 2 Media, 3 Baja) y 'orden' (índices)
+    """
+    dias_cobertura = np.asarray(dias_cobertura, dtype=float)
+    return {
+        'prioridad_num': np.digitize(dias_cobertura, [3, 7]) + 1,
+        'orden': np.argsort(dias_cobertura, kind='stable'),
+    }
+
+
+def analizar_inventarios(
+    stock: np.ndarray,
+    stock_reservado: np.ndarray,
+    punto_reorden: np.ndarray,
+    ventas: np.ndarray,
+    costo_unitario: np.ndarray,
+    lead_time: np.ndarray,
+    costo_pedido: float,
+    tasa_almacenamiento_anual: float,
+    dias: int = DIAS_CONSUMO
+) -> Dict[str, np.ndarray]:
+    """
+    Análisis completo de inventario para muchas filas (empresa x producto) en una llamada
+
+    Args:
+        stock: Cantidad actual por fila
+        stock_reservado: Cantidad reservada por fila
+        punto_reorden: Punto de reorden configurado por fila
+        ventas: Matriz (filas x días) de unidades vendidas
+        costo_unitario: Costo unitario por fila
+        lead_time: Lead time de compra en días por fila
+        costo_pedido: Costo de referencia por orden de compra
+        tasa_almacenamiento_anual: Tasa anual de mantenimiento sobre el costo
+        dias: Días de ventas usados para el consumo
+
+    Returns:
+        Diccionario de arreglos alineados a las filas de entrada
+    """
+    stock = np.asarray(stock, dtype=float)
+    consumo_diario = calcular_consumo_diario_matriz(ventas, dias)
+    dias_cobertura = calcular_dias_cobertura_vector(stock, consumo_diario)
+    estado = clasificar_estado_inventario(dias_cobertura)
+    prioridad = priorizar_compra_vector(dias_cobertura)
+    reorden = calcular_punto_reorden_economico_vector(
+        consumo_diario * 365,
+        costo_pedido,
+        np.asarray(costo_unitario, dtype=float) * tasa_almacenamiento_anual,
+        lead_time,
+    )
+    punto_reorden = np.asarray(punto_reorden, dtype=float)
+
+    return {
+        'consumo_diario': np.round(consumo_diario, 2),
+        'dias_cobertura': np.where(np.isinf(dias_cobertura), COBERTURA_SIN_CONSUMO, np.round(dias_cobertura, 1)),
+        'estado_idx': estado,
+        'requiere_pedido': stock < punto_reorden,
+        'cantidad_faltante': np.maximum(0, punto_reorden - stock),
+        'stock_disponible': stock - np.asarray(stock_reservado, dtype=float),
+        'eoq': reorden['eoq'],
+        'punto_reorden_economico': reorden['punto_reorden'],
+        'prioridad_num': prioridad['prioridad_num'],
+        'orden_prioridad': prioridad['orden'],
+    }
+
+
+def cargar_matriz_inventarios(empresa_ids: List[int], dia_actual: int,
+                              dias: int = DIAS_CONSUMO) -> Dict[str, Any]:
+    """
+    Carga inventarios y ventas recientes de varias empresas con dos consultas
+
+    Args:
+        empresa_ids: IDs de las empresas
+        dia_actual: Último día (inclusive) de la ventana de ventas
+        dias: Tamaño de la ventana de ventas
+
+    Returns:
+        Diccionario con arreglos por fila (empresa x producto) y la matriz de ventas
+    """
+    filas = db.session.query(Inventario, Producto).join(
+        Producto, Producto.id == Inventario.producto_id
+    ).filter(
+        Inventario.empresa_id.in_(empresa_ids),
+        Producto.activo == True,
+    ).order_by(Inventario.empresa_id, Producto.id).all()
+
+    indice = {(inv.empresa_id, prod.id): i for i, (inv, prod) in enumerate(filas)}
+    dia_inicio = dia_actual - dias + 1
+    ventas = np.zeros((len(filas), dias))
+
+    if filas:
+        ventas_rows = db.session.query(
+            Venta.empresa_id,
+            Venta.producto_id,
+            Venta.semana_simulacion,
+            func.sum(Venta.cantidad_vendida),
+        ).filter(
+            Venta.empresa_id.in_(empresa_ids),
+            Venta.semana_simulacion >= dia_inicio,
+            Venta.semana_simulacion <= dia_actual,
+        ).group_by(Venta.empresa_id, Venta.producto_id, Venta.semana_simulacion).all()
+
+        for empresa_id, producto_id, dia, total in ventas_rows:
+            i = indice.get((empresa_id, producto_id))
+            if i is not None:
+                ventas[i, int(dia) - dia_inicio] = float(total or 0)
+
+    return {
+        'empresa_id': np.array([inv.empresa_id for inv, _ in filas], dtype=int),
+        'producto_id': np.array([prod.id for _, prod in filas], dtype=int),
+        'productos': [prod for _, prod in filas],
+        'stock': np.array([float(inv.cantidad_actual or 0) for inv, _ in filas]),
+        'stock_reservado': np.array([float(inv.cantidad_reservada or 0) for inv, _ in filas]),
+        'punto_reorden': np.array([float(inv.punto_reorden or 0) for inv, _ in filas]),
+        'costo_unitario': np.array([
+            float(inv.costo_promedio or prod.costo_unitario or 0) for inv, prod in filas
+        ]),
+        'lead_time': np.array([int(prod.tiempo_entrega or 0) for _, prod in filas]),
+        'ventas': ventas,
+    }
+
+
+def analizar_salud_inventarios(empresa_ids: List[int], dia_actual: int,
+                               costo_pedido: float, tasa_almacenamiento_anual: float,
+                               lead_times: Dict[int, int] = None) -> Dict[str, Any]:
+    """
+    Análisis de inventario de todas las empresas y productos en una sola llamada
+
+    Args:
+        empresa_ids: IDs de las empresas
+        dia_actual: Último día con ventas a considerar
+        costo_pedido: Costo de referencia por orden de compra
+        tasa_almacenamiento_anual: Tasa anual de mantenimiento sobre el costo
+        lead_times: Lead time por producto_id (si es None usa Producto.tiempo_entrega)
+
+    Returns:
+        Diccionario con 'filas' (detalle empresa x producto, ordenado por prioridad)
+        y 'por_empresa' (conteo de estados y cobertura promedio)
+    """
+    datos = cargar_matriz_inventarios(empresa_ids, dia_actual)
+    lead_time = datos['lead_time']
+    if lead_times:
+        lead_time = np.array([
+            int(lead_times.get(pid, lt)) for pid, lt in zip(datos['producto_id'], lead_time)
+        ])
+
+    analisis = analizar_inventarios(
+        datos['stock'], datos['stock_reservado'], datos['punto_reorden'], datos['ventas'],
+        datos['costo_unitario'], lead_time, costo_pedido, tasa_almacenamiento_anual,
+    )
+
+    filas = []
+    for i in analisis['orden_prioridad']:
+        estado_idx = int(analisis['estado_idx'][i])
+        filas.append({
+            'empresa_id': int(datos['empresa_id'][i]),
+            'producto_id': int(datos['producto_id'][i]),
+            'producto_nombre': datos['productos'][i].nombre,
+            'stock_actual': float(datos['stock'][i]),
+            'stock_disponible': float(analisis['stock_disponible'][i]),
+            'consumo_diario': float(analisis['consumo_diario'][i]),
+            'dias_cobertura': float(analisis['dias_cobertura'][i]),
+            'estado': str(ESTADOS_INVENTARIO[estado_idx]),
+            'alerta': str(ALERTAS_INVENTARIO[estado_idx]),
+            'requiere_pedido': bool(analisis['requiere_pedido'][i]),
+            'cantidad_faltante': float(analisis['cantidad_faltante'][i]),
+            'eoq': float(analisis['eoq'][i]),
+            'punto_reorden_economico': float(analisis['punto_reorden_economico'][i]),
+            'prioridad': str(PRIORIDADES_COMPRA[int(analisis['prioridad_num'][i]) - 1]),
+            'prioridad_num': int(analisis['prioridad_num'][i]),
+        })
+
+    por_empresa = {}
+    for empresa_id in empresa_ids:
+        mascara = datos['empresa_id'] == empresa_id
+        conteo = np.bincount(analisis['estado_idx'][mascara], minlength=len(ESTADOS_INVENTARIO))
+        coberturas = analisis['dias_cobertura'][mascara]
+        coberturas = coberturas[coberturas < COBERTURA_SIN_CONSUMO]
+        por_empresa[empresa_id] = {
+            'critico': int(conteo[0]),
+            'bajo': int(conteo[1]),
+            'normal': int(conteo[2]),
+            'alto': int(conteo[3]),
+            'cobertura_promedio': round(float(coberturas.mean()), 1) if coberturas.size else None,
+            'requieren_pedido': int(analisis['requiere_pedido'][mascara].sum()),
+        }
+
+    return {'filas': filas, 'por_empresa': por_empresa}
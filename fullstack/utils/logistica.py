@@ -5,6 +5,41 @@ Funciones para gestión de recepciones, despachos y distribución regional
 
 from typing import Dict, List, Any
 from datetime import datetime
+import numpy as np
+
+
+def _catalogo_vehiculos_logistica() -> Dict[str, Dict[str, Any]]:
+    """Catálogo de vehículos que puede asignar Logística (flota propia + externo)."""
+    from utils.parametros_iniciales import FLOTA_VEHICULOS
+    catalogo = {
+        codigo: {
+            'nombre': f'Vehículo {codigo}',
+            'capacidad': conf.get('capacidad'),
+            'externo': bool(conf.get('por_unidad', False)),
+        }
+        for codigo, conf in FLOTA_VEHICULOS.items()
+        if codigo != 'V_EXTERNO'
+    }
+    catalogo['EXTERNO'] = {
+        'nombre': 'Vehículo externo',
+        'capacidad': None,
+        'externo': True,
+    }
+    return catalogo
+
+
+VEHICULOS_LOGISTICA = _catalogo_vehiculos_logistica()
+
+# Tarifa base de transporte por unidad según región (flota propia).
+TARIFA_TRANSPORTE_POR_REGION = {
+    'Andina': 500,
+    'Pacífica': 1000,
+    'Caribe': 1000,
+    'Orinoquía': 1500,
+    'Amazonía': 2000,
+}
+
+ESTADOS_COBERTURA = np.array(['critico', 'bajo', 'normal', 'alto'])
 
 
 def _qty_int(value) -> int:
@@ -17,6 +52,11 @@ def calcular_tiempo_entrega_region(region: str) -> int:
     from utils.parametros_iniciales import CICLOS_REGION
     return int(CICLOS_REGION.get(region, 2))
 
+def tarifa_transporte_region(region: str) -> float:
+    """Retorna la tarifa base por unidad para la región dada."""
+    return float(TARIFA_TRANSPORTE_POR_REGION.get(region, 1000))
+
+
 def obtener_ciclo_region(region: str) -> int:
     """
     Obtiene el ciclo de reutilización (días) para un vehículo según la región
@@ -82,6 +122,258 @@ def calcular_costo_transporte_vehiculo(codigo_vehiculo: str, cantidad: float = N
     }
 
 
+def _tipos_vehiculos_propios(vehiculos_disponibles: List[str] = None) -> List[Dict[str, Any]]:
+    """Agrupa los vehículos propios disponibles por tipo (capacidad, costo)."""
+    from utils.parametros_iniciales import FLOTA_VEHICULOS
+
+    tipos = {}
+    for codigo, conf in FLOTA_VEHICULOS.items():
+        if conf.get('por_unidad', False) or not conf.get('capacidad'):
+            continue
+        if vehiculos_disponibles is not None and codigo not in vehiculos_disponibles:
+            continue
+        clave = (int(conf['capacidad']), float(conf['costo']))
+        tipos.setdefault(clave, []).append(codigo)
+
+    return [
+        {'capacidad': capacidad, 'costo': costo, 'codigos': sorted(codigos)}
+        for (capacidad, costo), codigos in sorted(tipos.items(), key=lambda x: x[0][0], reverse=True)
+    ]
+
+
+def _combinaciones_region(demanda: int, tipos: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Enumera las combinaciones de vehículos que pueden ser óptimas para una región
+
+    Solo se consideran combinaciones mínimas: si al quitar el vehículo más
+    pequeño la capacidad sigue cubriendo la demanda, ese vehículo sobra y la
+    combinación nunca es óptima. Siempre se incluye la combinación vacía.
+    """
+    combinaciones = []
+    conteo = [0] * len(tipos)
+
+    def _recorrer(idx, capacidad, menor):
+        if idx == len(tipos):
+            if capacidad == 0 or capacidad - menor < demanda:
+                combinaciones.append(tuple(conteo))
+            return
+        _recorrer(idx + 1, capacidad, menor)
+        tipo = tipos[idx]
+        usados = 0
+        while usados < len(tipo['codigos']) and capacidad < demanda:
+            usados += 1
+            capacidad += tipo['capacidad']
+            menor = min(menor, tipo['capacidad'])
+            conteo[idx] = usados
+            _recorrer(idx + 1, capacidad, menor)
+        conteo[idx] = 0
+
+    _recorrer(0, 0, float('inf'))
+    return combinaciones
+
+
+def optimizar_asignacion_flota(demandas_por_region: Dict[str, int], vehiculos_disponibles: List[str] = None,
+                               permitir_externo: bool = True, costo_dia_bloqueo: float = 0.0) -> Dict[str, Any]:
+    """
+    Asignación de costo mínimo de la flota propia a todas las regiones del día
+
+    Programación dinámica exacta sobre las regiones: el estado es la cantidad
+    restante de vehículos de cada tipo (capacidad, costo). El costo de una
+    región es la suma de costos fijos de los vehículos propios más el costo por
+    unidad del transporte externo para lo que no alcancen a cubrir.
+
+    Args:
+        demandas_por_region: Unidades a despachar por región
+        vehiculos_disponibles: Códigos de vehículos propios disponibles (toda la flota si es None)
+        permitir_externo: False si el transporte externo está prohibido (falla de flota, opción B)
+        costo_dia_bloqueo: Penalización por cada día que un vehículo propio queda
+            bloqueado por el ciclo de la región (solo para decidir, no se reporta en los costos)
+
+    Returns:
+        Diccionario con la asignación por región, costos totales y si el plan es factible
+    """
+    from utils.parametros_iniciales import FLOTA_VEHICULOS
+
+    costo_unidad_externo = float(FLOTA_VEHICULOS.get('V_EXTERNO', {}).get('costo', 3000))
+    tipos = _tipos_vehiculos_propios(vehiculos_disponibles)
+    regiones = [
+        (region, _qty_int(cantidad))
+        for region, cantidad in demandas_por_region.items()
+        if _qty_int(cantidad) > 0
+    ]
+
+    # Estados codificados en base mixta: indice = sum(restantes[t] * peso[t])
+    dimensiones = [len(t['codigos']) + 1 for t in tipos]
+    pesos = [1] * len(tipos)
+    for t in range(len(tipos) - 2, -1, -1):
+        pesos[t] = pesos[t + 1] * dimensiones[t + 1]
+    total_estados = int(np.prod(dimensiones))
+    indices = np.arange(total_estados)
+    restantes = np.array(
+        [(indices // pesos[t]) % dimensiones[t] for t in range(len(tipos))]
+    ).reshape(len(tipos), total_estados)
+
+    capacidades = np.array([t['capacidad'] for t in tipos], dtype=float)
+    costos_fijos = np.array([t['costo'] for t in tipos], dtype=float)
+
+    capa = np.full(total_estados, np.inf)
+    capa[total_estados - 1] = 0.0  # Todos los vehículos disponibles al inicio
+    decisiones = []
+    candidatos_por_region = []
+
+    for region, demanda in regiones:
+        candidatos = _combinaciones_region(demanda, tipos)
+        conteos = np.array(candidatos, dtype=int).reshape(len(candidatos), len(tipos))
+        capacidad = conteos @ capacidades
+        faltante = np.maximum(0.0, demanda - capacidad)
+        costo = conteos @ costos_fijos + faltante * costo_unidad_externo
+        if costo_dia_bloqueo:
+            costo = costo + conteos.sum(axis=1) * costo_dia_bloqueo * obtener_ciclo_region(region)
+        if not permitir_externo:
+            costo = np.where(faltante > 0, np.inf, costo)
+
+        # Cada estado destino toma el mejor origen: destino + vehículos usados en la región
+        desplazamiento = conteos @ np.array(pesos, dtype=int)
+        validos = np.all(
+            restantes[None, :, :] + conteos[:, :, None] < np.array(dimensiones, dtype=int).reshape(1, -1, 1),
+            axis=1,
+        )
+        origen = np.where(validos, indices[None, :] + desplazamiento[:, None], 0)
+        valores = np.where(validos, capa[origen] + costo[:, None], np.inf)
+        eleccion = np.argmin(valores, axis=0)
+        siguiente = valores[eleccion, indices]
+
+        capa = siguiente
+        decisiones.append(eleccion)
+        candidatos_por_region.append(conteos)
+
+    estado = int(np.argmin(capa)) if regiones else total_estados - 1
+    factible = bool(np.isfinite(capa[estado])) if regiones else True
+    if not factible:
+        resultado = optimizar_asignacion_flota(
+            demandas_por_region, vehiculos_disponibles, permitir_externo=True, costo_dia_bloqueo=costo_dia_bloqueo
+        )
+        resultado['factible'] = False
+        return resultado
+
+    # Reconstruir la decisión de cada región desde el estado final
+    elegidos = [None] * len(regiones)
+    for r in range(len(regiones) - 1, -1, -1):
+        c = int(decisiones[r][estado])
+        elegidos[r] = candidatos_por_region[r][c]
+        estado += int(np.dot(elegidos[r], pesos))
+
+    siguientes_codigos = [list(t['codigos']) for t in tipos]
+    asignaciones = []
+    costo_fijo_total = 0.0
+    costo_externo_total = 0.0
+    unidades_externo_total = 0
+    for (region, demanda), conteo in zip(regiones, elegidos):
+        vehiculos = []
+        capacidad_propia = 0
+        costo_fijo = 0.0
+        for t, cantidad in enumerate(conteo):
+            for _ in range(int(cantidad)):
+                vehiculos.append(siguientes_codigos[t].pop(0))
+                capacidad_propia += tipos[t]['capacidad']
+                costo_fijo += tipos[t]['costo']
+        unidades_externo = max(0, demanda - capacidad_propia)
+        costo_externo = round(unidades_externo * costo_unidad_externo)
+        asignaciones.append({
+            'region': region,
+            'cantidad': demanda,
+            'vehiculos': vehiculos,
+            'capacidad_propia': capacidad_propia,
+            'unidades_propias': min(demanda, capacidad_propia),
+            'unidades_externo': unidades_externo,
+            'costo_fijo': costo_fijo,
+            'costo_externo': costo_externo,
+            'costo_total': costo_fijo + costo_externo,
+        })
+        costo_fijo_total += costo_fijo
+        costo_externo_total += costo_externo
+        unidades_externo_total += unidades_externo
+
+    return {
+        'asignaciones': asignaciones,
+        'costo_fijo_total': costo_fijo_total,
+        'costo_externo_total': costo_externo_total,
+        'costo_total': costo_fijo_total + costo_externo_total,
+        'unidades_externo': unidades_externo_total,
+        'vehiculos_usados': sum(len(a['vehiculos']) for a in asignaciones),
+        'factible': True,
+    }
+
+
+PENALIZACIONES_DIA_BLOQUEO = (0.0, 50000.0, 100000.0, 150000.0, 200000.0, 300000.0, 400000.0)
+
+
+def planificar_flota_horizonte(demandas_por_dia: List[Dict[str, int]], dia_inicio: int,
+                               vehiculos_libres: Dict[str, int], permitir_externo: bool = True,
+                               penalizaciones: tuple = PENALIZACIONES_DIA_BLOQUEO) -> Dict[str, Any]:
+    """
+    Plan de flota de horizonte rodante considerando los ciclos de retorno
+
+    Cada política de la familia resuelve cada día con optimizar_asignacion_flota,
+    cobrando una penalización por día de bloqueo del vehículo (CICLOS_REGION), y
+    actualiza el estado de la flota (día en que cada vehículo vuelve a estar
+    libre). Se elige la política de menor costo real en el horizonte; con
+    penalización 0 coincide con el plan miope, por lo que nunca es peor que él.
+
+    Args:
+        demandas_por_dia: Unidades por región para cada día del horizonte (el primero es hoy)
+        dia_inicio: Día de simulación del primer elemento de demandas_por_dia
+        vehiculos_libres: {codigo: primer día en que el vehículo propio está libre}
+            (los vehículos fuera de operación no se incluyen)
+        permitir_externo: False si el transporte externo está prohibido (falla de flota, opción B)
+        penalizaciones: Penalizaciones por día de bloqueo a evaluar
+
+    Returns:
+        Diccionario con el plan de cada día, el costo del horizonte y la penalización elegida
+    """
+    mejor = None
+    costo_miope = None
+
+    for penalizacion in penalizaciones:
+        libres = dict(vehiculos_libres)
+        dias = []
+        costo_horizonte = 0.0
+        dias_infactibles = 0
+
+        for offset, demandas in enumerate(demandas_por_dia):
+            dia = dia_inicio + offset
+            disponibles = [codigo for codigo, libre in libres.items() if libre <= dia]
+            plan = optimizar_asignacion_flota(demandas, disponibles, permitir_externo, costo_dia_bloqueo=penalizacion)
+            for asignacion in plan['asignaciones']:
+                for codigo in asignacion['vehiculos']:
+                    libres[codigo] = dia + obtener_ciclo_region(asignacion['region']) + 1
+            if not plan['factible']:
+                dias_infactibles += 1
+            costo_horizonte += plan['costo_total']
+            dias.append({'dia': dia, **plan})
+
+        if not penalizacion:
+            costo_miope = costo_horizonte
+
+        clave = (dias_infactibles, costo_horizonte)
+        if mejor is None or clave < mejor['_clave']:
+            mejor = {
+                '_clave': clave,
+                'dias': dias,
+                'costo_horizonte': costo_horizonte,
+                'penalizacion_dia_bloqueo': penalizacion,
+                'dias_infactibles': dias_infactibles,
+            }
+
+    if mejor is None:
+        return {'dias': [], 'costo_horizonte': 0.0, 'penalizacion_dia_bloqueo': 0.0, 'dias_infactibles': 0,
+                'costo_miope': 0.0}
+
+    mejor.pop('_clave')
+    mejor['costo_miope'] = costo_miope if costo_miope is not None else mejor['costo_horizonte']
+    return mejor
+
+
 def seleccionar_vehiculos_optimos(cantidad: float, region: str, vehiculos_disponibles: List[str] = None) -> Dict[str, Any]:
     """
     Sugiere qué vehículos usar para transportar una cantidad a una región
@@ -89,63 +381,35 @@ def seleccionar_vehiculos_optimos(cantidad: float, region: str, vehiculos_dispon
     Args:
         cantidad: Cantidad a transportar
         region: Región destino
+        vehiculos_disponibles: Códigos de vehículos propios disponibles (toda la flota si es None)
     
     Returns:
         Diccionario con lista de vehículos recomendados y costos
     """
-    from utils.parametros_iniciales import FLOTA_VEHICULOS
-
-    disponibles_set = set(vehiculos_disponibles or [])
-    
-    # Vehículos propios ordenados por capacidad descendente
-    vehiculos_propios = [
-        (cod, conf)
-        for cod, conf in sorted(FLOTA_VEHICULOS.items(), key=lambda x: x[1].get('capacidad', 0), reverse=True)
-        if conf.get('capacidad') is not None
-        and not conf.get('por_unidad', False)
-        and (not disponibles_set or cod in disponibles_set)
-    ]
-    
-    seleccion = []
-    cantidad_pendiente = cantidad
-    costo_total = 0
-    
-    # Intentar llenar con vehículos propios
-    for cod, conf in vehiculos_propios:
-        if cantidad_pendiente <= 0:
-            break
-        if cantidad_pendiente <= conf['capacidad']:
-            seleccion.append(cod)
-            costo_total += conf['costo']
-            cantidad_pendiente = 0
-            break
-        else:
-            seleccion.append(cod)
-            costo_total += conf['costo']
-            cantidad_pendiente -= conf['capacidad']
-    
-    # Si hay cantidad pendiente, usar vehículo externo
-    if cantidad_pendiente > 0:
-        externo_config = FLOTA_VEHICULOS.get('V_EXTERNO', {})
-        costo_externo = round(cantidad_pendiente * externo_config.get('costo', 3000))
-        seleccion.append('V_EXTERNO')
-        costo_total += costo_externo
+    plan = optimizar_asignacion_flota({region: cantidad}, vehiculos_disponibles)
+    asignacion = plan['asignaciones'][0] if plan['asignaciones'] else None
+    if not asignacion:
         return {
-            'vehiculos': seleccion,
-            'costo_total': costo_total,
-            'cantidad_vehiculos_propios': len([v for v in seleccion if v != 'V_EXTERNO']),
-            'cantidad_externo': cantidad_pendiente,
-            'costo_externo': costo_externo,
-            'usa_externo': True
+            'vehiculos': [],
+            'costo_total': 0,
+            'cantidad_vehiculos_propios': 0,
+            'cantidad_externo': 0,
+            'costo_externo': 0,
+            'usa_externo': False
         }
-    
+
+    seleccion = list(asignacion['vehiculos'])
+    usa_externo = asignacion['unidades_externo'] > 0
+    if usa_externo:
+        seleccion.append('V_EXTERNO')
+
     return {
         'vehiculos': seleccion,
-        'costo_total': costo_total,
-        'cantidad_vehiculos_propios': len(seleccion),
-        'cantidad_externo': 0,
-        'costo_externo': 0,
-        'usa_externo': False
+        'costo_total': asignacion['costo_total'],
+        'cantidad_vehiculos_propios': len(asignacion['vehiculos']),
+        'cantidad_externo': asignacion['unidades_externo'],
+        'costo_externo': asignacion['costo_externo'],
+        'usa_externo': usa_externo
     }
 
 
@@ -239,6 +503,196 @@ def validar_despacho_region(inventario, cantidad_solicitada: float,
     }
 
 
+def distribuir_stock_matriz(stock_disponible: np.ndarray, demandas: np.ndarray) -> np.ndarray:
+    """
+    Reparte el stock de cada producto entre regiones en proporción a su demanda
+
+    Args:
+        stock_disponible: Stock disponible por producto (P)
+        demandas: Matriz (productos x regiones) de demanda
+
+    Returns:
+        Matriz (productos x regiones) con la cantidad asignada; los productos
+        sin demanda se reparten en partes iguales
+    """
+    stock_disponible = np.asarray(stock_disponible, dtype=float)
+    demandas = np.asarray(demandas, dtype=float)
+    if demandas.ndim != 2 or demandas.shape[1] == 0:
+        return np.zeros_like(demandas)
+
+    total = demandas.sum(axis=1, keepdims=True)
+    proporcion = np.where(total > 0, demandas / np.where(total > 0, total, 1.0), 1.0 / demandas.shape[1])
+    return stock_disponible[:, None] * proporcion
+
+
+def analizar_cobertura_matriz(stock: np.ndarray, demanda_diaria: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Días de cobertura y estado para cada celda producto x región
+
+    Args:
+        stock: Matriz (productos x regiones) de stock
+        demanda_diaria: Matriz (productos x regiones) de demanda diaria
+
+    Returns:
+        Diccionario con 'dias_cobertura' (infinito sin demanda) y 'estado_idx'
+        (0 crítico <=3, 1 bajo <=7, 2 normal <=14, 3 alto; ver ESTADOS_COBERTURA)
+    """
+    stock = np.asarray(stock, dtype=float)
+    demanda_diaria = np.asarray(demanda_diaria, dtype=float)
+    con_demanda = demanda_diaria > 0
+    dias_cobertura = np.where(con_demanda, stock / np.where(con_demanda, demanda_diaria, 1.0), np.inf)
+    return {
+        'dias_cobertura': dias_cobertura,
+        'estado_idx': np.digitize(dias_cobertura, [3, 7, 14], right=True),
+    }
+
+
+def resolver_transporte(oferta: np.ndarray, demanda: np.ndarray, costo: np.ndarray) -> np.ndarray:
+    """
+    Problema de transporte para todos los productos en una sola pasada
+
+    Método de menor costo: recorre los arcos origen-destino de menor a mayor
+    costo y en cada uno mueve min(oferta, demanda) de todos los productos a la
+    vez. Con costos separables (costo[o, d] = a[o] + b[d], como las tarifas
+    que pasan por la bodega central) la solución es de costo mínimo.
+
+    Args:
+        oferta: Matriz (productos x orígenes) de unidades disponibles
+        demanda: Matriz (productos x destinos) de unidades requeridas
+        costo: Matriz (orígenes x destinos) de costo por unidad; np.inf marca arcos prohibidos
+
+    Returns:
+        Arreglo (productos x orígenes x destinos) con las unidades movidas
+    """
+    oferta = np.array(oferta, dtype=float)
+    demanda = np.array(demanda, dtype=float)
+    costo = np.asarray(costo, dtype=float)
+    flujos = np.zeros((oferta.shape[0],) + costo.shape)
+
+    for arco in np.argsort(costo, axis=None, kind='stable'):
+        origen, destino = divmod(int(arco), costo.shape[1])
+        if not np.isfinite(costo[origen, destino]):
+            break
+        mover = np.minimum(oferta[:, origen], demanda[:, destino])
+        if not mover.any():
+            continue
+        flujos[:, origen, destino] = mover
+        oferta[:, origen] -= mover
+        demanda[:, destino] -= mover
+
+    return flujos
+
+
+def planificar_redistribucion(stock_regional: np.ndarray, demanda_diaria: np.ndarray,
+                              tarifas: np.ndarray, stock_central: np.ndarray = None,
+                              dias_objetivo: float = 7, dias_retencion: float = 10,
+                              umbral_exceso: float = 14,
+                              transferir_entre_regiones: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Plan de rebalanceo de stock de todo el catálogo entre regiones
+
+    Las regiones bajo dias_objetivo de cobertura piden lo que les falta para
+    llegar a él. Se abastecen desde la bodega central (tarifa del destino) y,
+    si se permite, desde regiones sobre umbral_exceso que ceden lo que supere
+    dias_retencion de demanda (tarifa de retorno del origen + tarifa del destino).
+
+    Args:
+        stock_regional: Matriz (productos x regiones) de stock en cada región
+        demanda_diaria: Matriz (productos x regiones) de demanda diaria
+        tarifas: Tarifa por unidad de cada región (R)
+        stock_central: Stock disponible en bodega central por producto (P)
+        dias_objetivo: Cobertura mínima buscada en cada región
+        dias_retencion: Cobertura que conserva una región que cede stock
+        umbral_exceso: Cobertura a partir de la cual una región tiene excedente
+        transferir_entre_regiones: Si False solo se despacha desde la bodega central
+
+    Returns:
+        Diccionario de arreglos: 'flujos' (productos x orígenes x destinos, con
+        el origen 0 = bodega central y 1..R = regiones), 'costo_arco', 'necesidad',
+        'excedente', 'asignado', 'faltante', 'stock_final', 'dias_cobertura',
+        'dias_cobertura_final', 'estado_idx', 'estado_final_idx' y 'costo_transporte'
+        por producto
+    """
+    stock_regional = np.asarray(stock_regional, dtype=float)
+    demanda_diaria = np.asarray(demanda_diaria, dtype=float)
+    tarifas = np.asarray(tarifas, dtype=float)
+    productos, regiones = stock_regional.shape
+
+    cobertura = analizar_cobertura_matriz(stock_regional, demanda_diaria)
+    dias_cobertura = cobertura['dias_cobertura']
+
+    necesidad = np.where(
+        dias_cobertura < dias_objetivo,
+        np.ceil(np.maximum(0, dias_objetivo * demanda_diaria - stock_regional)),
+        0,
+    )
+    if transferir_entre_regiones:
+        excedente = np.where(
+            (dias_cobertura > umbral_exceso) & (stock_regional > 0),
+            np.floor(np.maximum(0, stock_regional - dias_retencion * demanda_diaria)),
+            0,
+        )
+    else:
+        excedente = np.zeros_like(stock_regional)
+
+    if stock_central is None:
+        central = np.zeros(productos)
+    else:
+        central = np.floor(np.maximum(0, np.asarray(stock_central, dtype=float)))
+
+    oferta = np.column_stack([central, excedente])
+    costo = np.vstack([tarifas, tarifas[:, None] + tarifas[None, :]])
+    costo[1:][np.eye(regiones, dtype=bool)] = np.inf
+
+    flujos = resolver_transporte(oferta, necesidad, costo)
+    asignado = flujos.sum(axis=1)
+    stock_final = stock_regional + asignado - flujos[:, 1:, :].sum(axis=2)
+    cobertura_final = analizar_cobertura_matriz(stock_final, demanda_diaria)
+
+    return {
+        'flujos': flujos,
+        'costo_arco': costo,
+        'necesidad': necesidad,
+        'excedente': excedente,
+        'asignado': asignado,
+        'faltante': necesidad - asignado,
+        'stock_final': stock_final,
+        'dias_cobertura': dias_cobertura,
+        'dias_cobertura_final': cobertura_final['dias_cobertura'],
+        'estado_idx': cobertura['estado_idx'],
+        'estado_final_idx': cobertura_final['estado_idx'],
+        'costo_transporte': (flujos * np.where(np.isfinite(costo), costo, 0)).sum(axis=(1, 2)),
+    }
+
+
+def movimientos_redistribucion(plan: Dict[str, np.ndarray], regiones: List[str]) -> List[Dict[str, Any]]:
+    """
+    Lista de movimientos (fila de producto, origen, destino) de un plan de redistribución
+
+    Args:
+        plan: Resultado de planificar_redistribucion
+        regiones: Nombres de las regiones en el orden de las columnas
+
+    Returns:
+        Lista de movimientos; origen es None cuando sale de la bodega central
+    """
+    flujos = plan['flujos']
+    movimientos = []
+    for fila, origen, destino in zip(*np.nonzero(flujos)):
+        cantidad = float(flujos[fila, origen, destino])
+        movimientos.append({
+            'fila': int(fila),
+            'origen': regiones[origen - 1] if origen > 0 else None,
+            'destino': regiones[destino],
+            'cantidad': cantidad,
+            'costo_transporte': cantidad * float(plan['costo_arco'][origen, destino]),
+            'cobertura_origen': float(plan['dias_cobertura'][fila, origen - 1]) if origen > 0 else None,
+            'cobertura_destino': float(plan['dias_cobertura'][fila, destino]),
+            'tiempo_transito': calcular_tiempo_entrega_region(regiones[destino]),
+        })
+    return movimientos
+
+
 def distribuir_stock_por_demanda(stock_disponible: float, demandas_regionales: Dict[str, float]) -> Dict[str, float]:
     """
     Distribuye stock disponible proporcionalmente a la demanda de cada región
@@ -250,21 +704,11 @@ def distribuir_stock_por_demanda(stock_disponible: float, demandas_regionales: D
     Returns:
         Dict con región -> cantidad asignada
     """
-    demanda_total = sum(demandas_regionales.values())
-    
-    if demanda_total == 0:
-        # Distribuir equitativamente
-        num_regiones = len(demandas_regionales)
-        cantidad_por_region = stock_disponible / num_regiones if num_regiones > 0 else 0
-        return {region: cantidad_por_region for region in demandas_regionales.keys()}
-    
-    # Distribuir proporcionalmente
-    distribucion = {}
-    for region, demanda in demandas_regionales.items():
-        proporcion = demanda / demanda_total
-        distribucion[region] = stock_disponible * proporcion
-    
-    return distribucion
+    regiones = list(demandas_regionales.keys())
+    distribucion = distribuir_stock_matriz(
+        [stock_disponible], [[demandas_regionales[region] for region in regiones]]
+    )
+    return {region: float(cantidad) for region, cantidad in zip(regiones, distribucion.reshape(-1))}
 
 
 def analizar_cobertura_regional(inventario_regional: Dict[str, float], 
@@ -279,47 +723,37 @@ def analizar_cobertura_regional(inventario_regional: Dict[str, float],
     Returns:
         Análisis de cobertura por región
     """
+    regiones = list(inventario_regional.keys())
+    stock = np.array([float(inventario_regional[region]) for region in regiones])
+    total_vendido = np.array([
+        float(sum(v.cantidad_vendida for v in ventas_regionales.get(region, []))) for region in regiones
+    ])
+    dias_historico = np.array([
+        len(set(v.semana_simulacion for v in ventas_regionales.get(region, []))) for region in regiones
+    ])
+    demanda_diaria = np.where(dias_historico > 0, total_vendido / np.maximum(dias_historico, 1), 0.0)
+    cobertura = analizar_cobertura_matriz(stock[None, :], demanda_diaria[None, :])
+
     analisis = {}
-    
-    for region, stock in inventario_regional.items():
-        ventas = ventas_regionales.get(region, [])
-        
-        if not ventas:
+    for i, region in enumerate(regiones):
+        if not ventas_regionales.get(region):
             analisis[region] = {
-                'stock': stock,
+                'stock': inventario_regional[region],
                 'demanda_diaria': 0,
                 'dias_cobertura': float('inf'),
                 'estado': 'sin_datos'
             }
             continue
-        
-        # Calcular demanda diaria promedio
-        total_vendido = sum(v.cantidad_vendida for v in ventas)
-        dias_historico = len(set(v.semana_simulacion for v in ventas))
-        demanda_diaria = total_vendido / dias_historico if dias_historico > 0 else 0
-        
-        # Calcular días de cobertura
-        dias_cobertura = stock / demanda_diaria if demanda_diaria > 0 else float('inf')
-        
-        # Determinar estado
-        if dias_cobertura <= 3:
-            estado = 'critico'
-        elif dias_cobertura <= 7:
-            estado = 'bajo'
-        elif dias_cobertura <= 14:
-            estado = 'normal'
-        else:
-            estado = 'alto'
-        
+
         analisis[region] = {
-            'stock': stock,
-            'demanda_diaria': demanda_diaria,
-            'dias_cobertura': dias_cobertura,
-            'estado': estado,
-            'total_vendido': total_vendido,
-            'dias_historico': dias_historico
+            'stock': inventario_regional[region],
+            'demanda_diaria': float(demanda_diaria[i]),
+            'dias_cobertura': float(cobertura['dias_cobertura'][0, i]),
+            'estado': str(ESTADOS_COBERTURA[cobertura['estado_idx'][0, i]]),
+            'total_vendido': float(total_vendido[i]),
+            'dias_historico': int(dias_historico[i])
         }
-    
+
     return analisis
 
 
@@ -453,43 +887,17 @@ def sugerir_redistribucion(inventarios_regionales: Dict[str, float],
         demandas_regionales: Dict con región -> demanda diaria
     
     Returns:
-        Lista de sugerencias de redistribución
+        Lista de sugerencias de redistribución (transferencias de costo mínimo)
     """
+    regiones = list(inventarios_regionales.keys())
+    plan = planificar_redistribucion(
+        [[inventarios_regionales[region] for region in regiones]],
+        [[demandas_regionales.get(region, 0) for region in regiones]],
+        [tarifa_transporte_region(region) for region in regiones],
+    )
+
     sugerencias = []
-    
-    # Calcular días de cobertura por región
-    coberturas = {}
-    for region, stock in inventarios_regionales.items():
-        demanda = demandas_regionales.get(region, 0)
-        cobertura = stock / demanda if demanda > 0 else float('inf')
-        coberturas[region] = {
-            'stock': stock,
-            'demanda': demanda,
-            'cobertura': cobertura
-        }
-    
-    # Identificar regiones con exceso y déficit
-    regiones_exceso = {r: c for r, c in coberturas.items() if c['cobertura'] > 14 and c['stock'] > 0}
-    regiones_deficit = {r: c for r, c in coberturas.items() if c['cobertura'] < 7}
-    
-    # Generar sugerencias
-    for region_deficit, datos_deficit in regiones_deficit.items():
-        for region_exceso, datos_exceso in regiones_exceso.items():
-            if region_deficit != region_exceso:
-                # Calcular cantidad a transferir
-                stock_exceso = datos_exceso['stock'] - (datos_exceso['demanda'] * 10)  # Mantener 10 días
-                cantidad_faltante = (7 * datos_deficit['demanda']) - datos_deficit['stock']  # Para llegar a 7 días
-                
-                cantidad_transferir = min(stock_exceso, cantidad_faltante)
-                
-                if cantidad_transferir > 0:
-                    sugerencias.append({
-                        'origen': region_exceso,
-                        'destino': region_deficit,
-                        'cantidad': cantidad_transferir,
-                        'cobertura_origen': datos_exceso['cobertura'],
-                        'cobertura_destino': datos_deficit['cobertura'],
-                        'tiempo_transito': calcular_tiempo_entrega_region(region_deficit)
-                    })
-    
+    for movimiento in movimientos_redistribucion(plan, regiones):
+        movimiento.pop('fila')
+        sugerencias.append(movimiento)
     return sugerencias
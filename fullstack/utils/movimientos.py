@@ -0,0 +1,175 @@
+"""
+Libro de movimientos de inventario por empresa
+Filtros por producto, tipo y día, paginación por cursor (created_at, id) que
+usa el índice compuesto de la tabla en lugar de OFFSET, y exportación CSV
+que lee la tabla por lotes con un cursor del servidor
+"""
+
+import base64
+import binascii
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+from sqlalchemy import tuple_
+from extensions import db
+from models import MovimientoInventario, Producto
+
+
+LIMITE_PAGINA_DEFECTO = 50
+LIMITE_PAGINA_MAXIMO = 500
+LOTE_EXPORTACION = 1000
+
+COLUMNAS_CSV = [
+    'id', 'dia_simulacion', 'tipo_movimiento', 'producto_id', 'producto',
+    'cantidad', 'saldo_anterior', 'saldo_nuevo', 'compra_id', 'venta_id',
+    'despacho_id', 'observaciones', 'created_at',
+]
+
+
+def codificar_cursor(created_at: datetime, movimiento_id: int) -> str:
+    """Cursor opaco para continuar después de un movimiento."""
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{movimiento_id}'.encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Posición (created_at, id) de un cursor de codificar_cursor
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        fecha, movimiento_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(movimiento_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Cursor de paginación inválido')
+
+
+def consultar_movimientos(empresa_id: int, producto_id: Optional[int] = None,
+                          tipo_movimiento: Optional[str] = None, dia_desde: Optional[int] = None,
+                          dia_hasta: Optional[int] = None):
+    """
+    Movimientos de la empresa con filtros, del más reciente al más antiguo
+
+    Args:
+        empresa_id: ID de la empresa
+        producto_id: Solo este producto
+        tipo_movimiento: Solo este tipo (entrada_compra, salida_venta, ...)
+        dia_desde: Primer día de simulación (inclusive)
+        dia_hasta: Último día de simulación (inclusive)
+
+    Returns:
+        Query de (MovimientoInventario, nombre del producto) ordenada por (created_at, id) descendente
+    """
+    consulta = db.session.query(MovimientoInventario, Producto.nombre).outerjoin(
+        Producto, Producto.id == MovimientoInventario.producto_id
+    ).filter(MovimientoInventario.empresa_id == empresa_id)
+
+    if producto_id is not None:
+        consulta = consulta.filter(MovimientoInventario.producto_id == producto_id)
+    if tipo_movimiento:
+        consulta = consulta.filter(MovimientoInventario.tipo_movimiento == tipo_movimiento)
+    if dia_desde is not None:
+        consulta = consulta.filter(MovimientoInventario.semana_simulacion >= dia_desde)
+    if dia_hasta is not None:
+        consulta = consulta.filter(MovimientoInventario.semana_simulacion <= dia_hasta)
+
+    return consulta.order_by(MovimientoInventario.created_at.desc(), MovimientoInventario.id.desc())
+
+
+def serializar_movimiento(movimiento: MovimientoInventario, producto_nombre: Optional[str]) -> Dict[str, Any]:
+    """Movimiento como diccionario JSON."""
+    return {
+        'id': movimiento.id,
+        'dia_simulacion': movimiento.semana_simulacion,
+        'tipo_movimiento': movimiento.tipo_movimiento,
+        'producto_id': movimiento.producto_id,
+        'producto': producto_nombre,
+        'cantidad': movimiento.cantidad,
+        'saldo_anterior': movimiento.saldo_anterior,
+        'saldo_nuevo': movimiento.saldo_nuevo,
+        'compra_id': movimiento.compra_id,
+        'venta_id': movimiento.venta_id,
+        'despacho_id': movimiento.despacho_id,
+        'observaciones': movimiento.observaciones,
+        'created_at': movimiento.created_at.isoformat() if movimiento.created_at else None,
+    }
+
+
+def pagina_movimientos(empresa_id: int, cursor: Optional[str] = None,
+                       limite: int = LIMITE_PAGINA_DEFECTO, **filtros) -> Dict[str, Any]:
+    """
+    Una página del libro de movimientos
+
+    Args:
+        empresa_id: ID de la empresa
+        cursor: Cursor devuelto por la página anterior (None para la primera)
+        limite: Movimientos por página (máximo LIMITE_PAGINA_MAXIMO)
+        **filtros: producto_id, tipo_movimiento, dia_desde, dia_hasta
+
+    Los movimientos sin created_at (filas antiguas) no tienen posición en el
+    cursor y se omiten; la exportación CSV sí los incluye.
+
+    Returns:
+        Diccionario con 'movimientos' (filas (movimiento, nombre del producto))
+        y 'siguiente_cursor' (None en la última página)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    limite = max(1, min(int(limite), LIMITE_PAGINA_MAXIMO))
+    consulta = consultar_movimientos(empresa_id, **filtros).filter(
+        MovimientoInventario.created_at.isnot(None)
+    )
+
+    if cursor:
+        fecha, movimiento_id = decodificar_cursor(cursor)
+        # Comparación de fila (created_at, id) < (fecha, id): un rango sobre el índice compuesto
+        consulta = consulta.filter(
+            tuple_(MovimientoInventario.created_at, MovimientoInventario.id) < (fecha, movimiento_id)
+        )
+
+    filas = consulta.limit(limite + 1).all()
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo = filas[-1][0]
+        siguiente_cursor = codificar_cursor(ultimo.created_at, ultimo.id)
+
+    return {'movimientos': filas, 'siguiente_cursor': siguiente_cursor}
+
+
+def exportar_movimientos_csv(empresa_id: int, **filtros) -> Iterator[str]:
+    """
+    Genera el CSV completo de movimientos de la empresa fila por fila
+
+    La consulta se lee por lotes de LOTE_EXPORTACION con un cursor del
+    servidor, sin cargar todo el historial en memoria.
+
+    Args:
+        empresa_id: ID de la empresa
+        **filtros: producto_id, tipo_movimiento, dia_desde, dia_hasta
+
+    Returns:
+        Iterador de fragmentos de texto CSV (encabezado primero)
+    """
+    salida = io.StringIO()
+    writer = csv.writer(salida)
+
+    def volcar() -> str:
+        texto = salida.getvalue()
+        salida.seek(0)
+        salida.truncate(0)
+        return texto
+
+    writer.writerow(COLUMNAS_CSV)
+    yield volcar()
+
+    consulta = consultar_movimientos(empresa_id, **filtros).yield_per(LOTE_EXPORTACION)
+    for numero, (movimiento, producto_nombre) in enumerate(consulta, 1):
+        datos = serializar_movimiento(movimiento, producto_nombre)
+        writer.writerow([datos[columna] for columna in COLUMNAS_CSV])
+        if numero % LOTE_EXPORTACION == 0:
+            yield volcar()
+    yield volcar()
@@ -0,0 +1,320 @@
+"""
+Utilidades para el MRP (Material Requirements Planning)
+Cálculo por conjuntos: consultas agrupadas por producto y operaciones vectorizadas
+"""
+
+from typing import Dict, List, Any
+import numpy as np
+from sqlalchemy import func
+from extensions import db
+from models import Producto, Inventario, Compra, Pronostico, Venta
+from utils.snapshots_pronostico import obtener_snapshots_pronostico
+
+
+HORIZONTE_PRONOSTICO_DIAS = 7
+DIAS_OBJETIVO_REPOSICION = 10
+UMBRAL_CRITICO_DIAS = 3
+UMBRAL_ADVERTENCIA_DIAS = 7
+COBERTURA_SIN_DEMANDA = 999
+
+
+def _mapa_agrupado(consulta) -> Dict[int, Any]:
+    """Convierte filas (producto_id, valor, ...) en un diccionario por producto."""
+    return {fila[0]: fila[1:] if len(fila) > 2 else fila[1] for fila in consulta}
+
+
+def cargar_datos_mrp(empresa_id: int, simulacion, productos: List = None) -> Dict[str, Any]:
+    """
+    Carga en bloque los insumos del MRP para todo el catálogo de una empresa
+
+    Se ejecuta una consulta agrupada por fuente (inventario, compras en tránsito,
+    pronósticos de la ventana y ventas históricas) en lugar de una por producto.
+    Sin pronóstico guardado se usa el snapshot del cierre anterior y, en su
+    defecto, el promedio histórico de ventas.
+
+    Args:
+        empresa_id: ID de la empresa
+        simulacion: Simulación activa
+        productos: Lista de productos activos (se consulta si es None)
+
+    Returns:
+        Diccionario con la lista de productos y arreglos numpy alineados a ella
+    """
+    if productos is None:
+        productos = Producto.query.filter_by(activo=True).order_by(Producto.id).all()
+    dia_actual = simulacion.dia_actual
+
+    inventarios = {
+        inv.producto_id: inv
+        for inv in Inventario.query.filter_by(empresa_id=empresa_id).all()
+    }
+
+    transito = _mapa_agrupado(
+        db.session.query(Compra.producto_id, func.sum(Compra.cantidad))
+        .filter(Compra.empresa_id == empresa_id, Compra.estado == 'en_transito')
+        .group_by(Compra.producto_id)
+        .all()
+    )
+
+    pronosticos = _mapa_agrupado(
+        db.session.query(
+            Pronostico.producto_id,
+            func.sum(Pronostico.demanda_pronosticada),
+            func.count(Pronostico.id),
+        )
+        .filter(
+            Pronostico.empresa_id == empresa_id,
+            Pronostico.semana_pronostico > dia_actual,
+            Pronostico.semana_pronostico <= dia_actual + HORIZONTE_PRONOSTICO_DIAS,
+        )
+        .group_by(Pronostico.producto_id)
+        .all()
+    )
+
+    ventas = _mapa_agrupado(
+        db.session.query(
+            Venta.producto_id,
+            func.sum(Venta.cantidad_vendida + Venta.cantidad_perdida),
+            func.count(Venta.id),
+        )
+        .filter(Venta.empresa_id == empresa_id)
+        .group_by(Venta.producto_id)
+        .all()
+    )
+
+    snapshots = obtener_snapshots_pronostico(simulacion, empresa_id)
+
+    n = len(productos)
+    stock = np.zeros(n)
+    stock_seguridad = np.zeros(n)
+    en_transito = np.zeros(n)
+    pronostico_ventana = np.zeros(n)
+    tiene_pronostico = np.zeros(n, dtype=bool)
+    demanda_historica = np.zeros(n)
+    registros_ventas = np.zeros(n)
+    demanda_snapshot = np.zeros(n)
+    tiene_snapshot = np.zeros(n, dtype=bool)
+
+    for i, producto in enumerate(productos):
+        inv = inventarios.get(producto.id)
+        if inv:
+            stock[i] = inv.cantidad_actual or 0
+            stock_seguridad[i] = inv.stock_seguridad or 0
+        en_transito[i] = transito.get(producto.id) or 0
+        suma_pron, cantidad_pron = pronosticos.get(producto.id, (0, 0))
+        pronostico_ventana[i] = suma_pron or 0
+        tiene_pronostico[i] = bool(cantidad_pron)
+        suma_ventas, cantidad_ventas = ventas.get(producto.id, (0, 0))
+        demanda_historica[i] = suma_ventas or 0
+        registros_ventas[i] = cantidad_ventas or 0
+        snapshot = snapshots.get(producto.id)
+        if snapshot and snapshot.proyeccion:
+            demanda_snapshot[i] = sum(snapshot.proyeccion) / len(snapshot.proyeccion)
+            tiene_snapshot[i] = True
+
+    # Sin pronóstico en la ventana se usa el snapshot o el promedio histórico de ventas
+    promedio_ventas = np.divide(
+        demanda_historica, registros_ventas,
+        out=np.zeros(n), where=registros_ventas > 0,
+    )
+    demanda_diaria_base = np.where(tiene_snapshot, demanda_snapshot, promedio_ventas)
+    pronostico_total = np.where(
+        tiene_pronostico, pronostico_ventana, demanda_diaria_base * HORIZONTE_PRONOSTICO_DIAS
+    )
+
+    return {
+        'productos': productos,
+        'stock': stock,
+        'stock_seguridad': stock_seguridad,
+        'en_transito': en_transito,
+        'pronostico_total': pronostico_total,
+        'demanda_diaria': pronostico_total / HORIZONTE_PRONOSTICO_DIAS,
+        'demanda_diaria_base': demanda_diaria_base,
+    }
+
+
+def calcular_mrp_empresa(empresa_id: int, simulacion, productos: List = None) -> Dict[str, Any]:
+    """
+    Calcula el MRP de cobertura para todos los productos de una empresa
+
+    Args:
+        empresa_id: ID de la empresa
+        simulacion: Simulación activa
+        productos: Lista de productos activos (se consulta si es None)
+
+    Returns:
+        Diccionario con 'productos' (detalle por producto) y 'resumen'
+    """
+    datos = cargar_datos_mrp(empresa_id, simulacion, productos)
+    productos = datos['productos']
+    demanda_diaria = datos['demanda_diaria']
+    stock_disponible = datos['stock'] + datos['en_transito']
+
+    con_demanda = datos['pronostico_total'] > 0
+    dias_cobertura = np.where(
+        con_demanda,
+        stock_disponible / np.where(con_demanda, demanda_diaria, 1.0),
+        COBERTURA_SIN_DEMANDA,
+    )
+    critico = dias_cobertura < UMBRAL_CRITICO_DIAS
+    advertencia = ~critico & (dias_cobertura < UMBRAL_ADVERTENCIA_DIAS)
+
+    # Reponer hasta cubrir DIAS_OBJETIVO_REPOSICION cuando la cobertura es baja
+    cantidad_recomendada = np.where(
+        critico | advertencia,
+        np.maximum(0, np.floor(demanda_diaria * DIAS_OBJETIVO_REPOSICION - stock_disponible)),
+        0,
+    ).astype(int)
+    costos = np.array([float(p.costo_unitario or 0) for p in productos])
+
+    resultados = []
+    for i, producto in enumerate(productos):
+        cobertura = float(dias_cobertura[i])
+        if critico[i]:
+            status_class, status_text = 'status-critico', 'CRÍTICO'
+            justificacion = f'Stock bajo ({cobertura:.1f} días)'
+        elif advertencia[i]:
+            status_class, status_text = 'status-bajo', 'ADVERTENCIA'
+            justificacion = f'Stock justo ({cobertura:.1f} días)'
+        else:
+            status_class, status_text = 'status-optimo', 'ÓPTIMO'
+            justificacion = f'Stock suficiente ({cobertura:.1f} días)'
+
+        resultados.append({
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'stock_actual': float(datos['stock'][i]),
+            'stock_seguridad': float(datos['stock_seguridad'][i]),
+            'en_transito': float(datos['en_transito'][i]),
+            'pronostico_proximos_dias': int(datos['pronostico_total'][i]),
+            'dias_cobertura': cobertura,
+            'status_class': status_class,
+            'status_text': status_text,
+            'cantidad_recomendada': int(cantidad_recomendada[i]),
+            'justificacion': justificacion,
+        })
+
+    return {
+        'productos': resultados,
+        'resumen': {
+            'criticos': int(critico.sum()),
+            'advertencia': int(advertencia.sum()),
+            'optimos': int(len(productos) - critico.sum() - advertencia.sum()),
+            'capital_requerido': float((cantidad_recomendada * costos).sum()),
+        },
+    }
+
+
+def calcular_plan_mrp(empresa_id: int, simulacion,
+                      lead_times: Dict[int, int], multiplos: Dict[int, int],
+                      productos: List = None) -> Dict[str, Any]:
+    """
+    Calcula el plan MRP por periodos (día a día) para todo el catálogo
+
+    Para cada producto y día del horizonte calcula necesidades brutas,
+    recepciones programadas (compras en tránsito por día de entrega),
+    inventario proyectado, necesidades netas frente al stock de seguridad,
+    recepciones planeadas redondeadas al múltiplo de pedido y su liberación
+    desplazada por el lead time. Las operaciones se hacen sobre matrices
+    producto x día, iterando solo sobre los días del horizonte.
+
+    Args:
+        empresa_id: ID de la empresa
+        simulacion: Simulación activa; el horizonte va del día actual al último día
+        lead_times: Lead time de compra en días por producto_id
+        multiplos: Múltiplo de pedido por producto_id
+        productos: Lista de productos activos (se consulta si es None)
+
+    Returns:
+        Diccionario con 'dias', 'productos' (series por producto) y 'resumen'
+    """
+    datos = cargar_datos_mrp(empresa_id, simulacion, productos)
+    productos = datos['productos']
+    dia_actual = simulacion.dia_actual
+    dia_final = int(simulacion.duracion_semanas or 0) * 7
+    dias = list(range(dia_actual, max(dia_actual, dia_final) + 1))
+    n, t_total = len(productos), len(dias)
+    indice_producto = {p.id: i for i, p in enumerate(productos)}
+
+    # Necesidades brutas: último pronóstico guardado por día o demanda diaria base
+    brutas = np.repeat(datos['demanda_diaria_base'][:, None], t_total, axis=1)
+    pronosticos = Pronostico.query.with_entities(
+        Pronostico.producto_id, Pronostico.semana_pronostico, Pronostico.demanda_pronosticada
+    ).filter(
+        Pronostico.empresa_id == empresa_id,
+        Pronostico.semana_pronostico >= dia_actual,
+        Pronostico.semana_pronostico <= dias[-1],
+    ).order_by(Pronostico.id).all()
+    for producto_id, dia, demanda in pronosticos:
+        i = indice_producto.get(producto_id)
+        if i is not None:
+            brutas[i, dia - dia_actual] = float(demanda or 0)
+
+    # Recepciones programadas: compras en tránsito; las atrasadas se cuentan hoy
+    programadas = np.zeros((n, t_total))
+    recepciones = db.session.query(
+        Compra.producto_id, Compra.semana_entrega, func.sum(Compra.cantidad)
+    ).filter(
+        Compra.empresa_id == empresa_id,
+        Compra.estado == 'en_transito',
+        Compra.semana_entrega <= dias[-1],
+    ).group_by(Compra.producto_id, Compra.semana_entrega).all()
+    for producto_id, dia, cantidad in recepciones:
+        i = indice_producto.get(producto_id)
+        if i is not None:
+            programadas[i, max(0, dia - dia_actual)] += float(cantidad or 0)
+
+    lead_time = np.array([int(lead_times.get(p.id, p.tiempo_entrega or 0)) for p in productos])
+    multiplo = np.array([max(1, int(multiplos.get(p.id, 1))) for p in productos])
+    stock_seguridad = datos['stock_seguridad']
+
+    proyectado = np.zeros((n, t_total))
+    netas = np.zeros((n, t_total))
+    planeadas = np.zeros((n, t_total), dtype=int)
+    liberaciones = np.zeros((n, t_total), dtype=int)
+    liberacion_vencida = np.zeros(n, dtype=int)
+    filas = np.arange(n)
+
+    disponible = datos['stock'].copy()
+    for t in range(t_total):
+        disponible = disponible + programadas[:, t] - brutas[:, t]
+        netas[:, t] = np.maximum(0.0, stock_seguridad - disponible)
+        planeadas[:, t] = (np.ceil(netas[:, t] / multiplo) * multiplo).astype(int)
+        disponible = disponible + planeadas[:, t]
+        proyectado[:, t] = disponible
+
+        # Liberación desplazada por lead time; si cae antes de hoy queda vencida
+        dia_liberacion = t - lead_time
+        vencida = dia_liberacion < 0
+        liberacion_vencida += np.where(vencida, planeadas[:, t], 0)
+        np.add.at(liberaciones, (filas, np.maximum(dia_liberacion, 0)), np.where(vencida, 0, planeadas[:, t]))
+
+    costos = np.array([float(p.costo_unitario or 0) for p in productos])
+    resultados = []
+    for i, producto in enumerate(productos):
+        resultados.append({
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'stock_actual': float(datos['stock'][i]),
+            'stock_seguridad': float(stock_seguridad[i]),
+            'lead_time': int(lead_time[i]),
+            'multiplo': int(multiplo[i]),
+            'necesidades_brutas': np.round(brutas[i], 1).tolist(),
+            'recepciones_programadas': np.round(programadas[i], 1).tolist(),
+            'inventario_proyectado': np.round(proyectado[i], 1).tolist(),
+            'necesidades_netas': np.round(netas[i], 1).tolist(),
+            'recepciones_planeadas': planeadas[i].tolist(),
+            'liberaciones_planeadas': liberaciones[i].tolist(),
+            'liberacion_vencida': int(liberacion_vencida[i]),
+        })
+
+    return {
+        'dias': dias,
+        'productos': resultados,
+        'resumen': {
+            'liberar_hoy': int(((liberaciones[:, 0] + liberacion_vencida) > 0).sum()) if t_total else 0,
+            'productos_con_vencidas': int((liberacion_vencida > 0).sum()),
+            'unidades_planeadas': int(planeadas.sum()),
+            'capital_requerido': float((planeadas.sum(axis=1) * costos).sum()),
+        },
+    }
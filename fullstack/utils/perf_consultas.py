@@ -0,0 +1,157 @@
+"""
+Monitor de consultas SQL por solicitud
+Cuenta sentencias y tiempo de base de datos de cada solicitud con eventos de
+SQLAlchemy, marca sentencias idénticas repetidas (patrón N+1), acumula
+estadísticas por endpoint y aplica presupuestos de consultas configurables
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+MAXIMO_SENTENCIAS_REPETIDAS = 5  # Por endpoint, las más repetidas
+_LISTA_PARAMETROS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una solicitud superó el presupuesto de consultas de su endpoint (modo estricto)."""
+
+
+_lock = threading.Lock()
+_estadisticas = {}
+
+
+def forma_sentencia(sentencia: str) -> str:
+    """Normaliza una sentencia SQL para agrupar repeticiones (listas IN colapsadas)."""
+    return _LISTA_PARAMETROS.sub('(?)', _ESPACIOS.sub(' ', sentencia).strip())
+
+
+def _antes_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    if has_request_context() and 'consultas_sql' in g:
+        conn.info.setdefault('inicio_consulta', []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    if not (has_request_context() and 'consultas_sql' in g):
+        return
+    inicios = conn.info.get('inicio_consulta')
+    if inicios:
+        g.tiempo_db += time.perf_counter() - inicios.pop()
+    g.consultas_sql[forma_sentencia(sentencia)] += 1
+
+
+def iniciar_monitor_consultas(app):
+    """
+    Registra el monitor en la aplicación (antes/después de cada solicitud)
+
+    Configuración:
+        PERF_CONSULTAS_ACTIVO: Activa el conteo
+        PERF_UMBRAL_REPETICIONES: Repeticiones de una misma sentencia que se marcan como N+1
+        PERF_PRESUPUESTOS_CONSULTAS: {endpoint: máximo de consultas por solicitud}
+        PERF_PRESUPUESTOS_ESTRICTOS: Lanzar PresupuestoConsultasExcedido al exceder (pruebas)
+    """
+    if not app.config.get('PERF_CONSULTAS_ACTIVO', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_ejecutar)
+
+    @app.before_request
+    def _iniciar_conteo():
+        g.consultas_sql = Counter()
+        g.tiempo_db = 0.0
+
+    @app.after_request
+    def _registrar_conteo(response):
+        if 'consultas_sql' not in g or request.endpoint in (None, 'static'):
+            return response
+
+        total = sum(g.consultas_sql.values())
+        umbral = app.config.get('PERF_UMBRAL_REPETICIONES', 5)
+        repetidas = [(forma, n) for forma, n in g.consultas_sql.most_common() if n >= umbral]
+        presupuesto = app.config.get('PERF_PRESUPUESTOS_CONSULTAS', {}).get(request.endpoint)
+        excedido = presupuesto is not None and total > presupuesto
+
+        _acumular(request.endpoint, total, g.tiempo_db, repetidas, excedido)
+        response.headers['Server-Timing'] = f'db;dur={g.tiempo_db * 1000:.1f};desc="{total} consultas"'
+
+        if repetidas:
+            app.logger.warning('Posible N+1 en %s: %s', request.endpoint,
+                               '; '.join(f'{n}x {forma[:120]}' for forma, n in repetidas[:3]))
+        if excedido:
+            mensaje = f'{request.endpoint} ejecutó {total} consultas (presupuesto: {presupuesto})'
+            if app.config.get('PERF_PRESUPUESTOS_ESTRICTOS', False):
+                raise PresupuestoConsultasExcedido(mensaje)
+            app.logger.warning(mensaje)
+        return response
+
+
+def _acumular(endpoint: str, total: int, tiempo_db: float, repetidas: List, excedido: bool):
+    with _lock:
+        stats = _estadisticas.setdefault(endpoint, {
+            'solicitudes': 0,
+            'consultas_total': 0,
+            'consultas_max': 0,
+            'tiempo_db_total': 0.0,
+            'tiempo_db_max': 0.0,
+            'solicitudes_n_mas_1': 0,
+            'presupuesto_excedido': 0,
+            'repetidas': Counter(),
+        })
+        stats['solicitudes'] += 1
+        stats['consultas_total'] += total
+        stats['consultas_max'] = max(stats['consultas_max'], total)
+        stats['tiempo_db_total'] += tiempo_db
+        stats['tiempo_db_max'] = max(stats['tiempo_db_max'], tiempo_db)
+        if repetidas:
+            stats['solicitudes_n_mas_1'] += 1
+            for forma, n in repetidas:
+                stats['repetidas'][forma] = max(stats['repetidas'][forma], n)
+            if len(stats['repetidas']) > MAXIMO_SENTENCIAS_REPETIDAS:
+                stats['repetidas'] = Counter(dict(stats['repetidas'].most_common(MAXIMO_SENTENCIAS_REPETIDAS)))
+        if excedido:
+            stats['presupuesto_excedido'] += 1
+
+
+def obtener_estadisticas_consultas(presupuestos: Dict[str, int] = None) -> List[Dict[str, Any]]:
+    """
+    Estadísticas acumuladas por endpoint en este proceso
+
+    Args:
+        presupuestos: Presupuestos configurados, para mostrarlos junto a cada endpoint
+
+    Returns:
+        Lista ordenada por consultas promedio (descendente)
+    """
+    presupuestos = presupuestos or {}
+    with _lock:
+        filas = [
+            {
+                'endpoint': endpoint,
+                'solicitudes': s['solicitudes'],
+                'consultas_promedio': round(s['consultas_total'] / s['solicitudes'], 1),
+                'consultas_max': s['consultas_max'],
+                'tiempo_db_promedio_ms': round(s['tiempo_db_total'] / s['solicitudes'] * 1000, 1),
+                'tiempo_db_max_ms': round(s['tiempo_db_max'] * 1000, 1),
+                'solicitudes_n_mas_1': s['solicitudes_n_mas_1'],
+                'presupuesto': presupuestos.get(endpoint),
+                'presupuesto_excedido': s['presupuesto_excedido'],
+                'repetidas': s['repetidas'].most_common(MAXIMO_SENTENCIAS_REPETIDAS),
+            }
+            for endpoint, s in _estadisticas.items()
+        ]
+    return sorted(filas, key=lambda f: f['consultas_promedio'], reverse=True)
+
+
+def reiniciar_estadisticas_consultas():
+    """Descarta las estadísticas acumuladas."""
+    with _lock:
+        _estadisticas.clear()
@@ -0,0 +1,262 @@
+"""
+Precios de venta por empresa
+Libro de precios por empresa (PrecioEmpresaProducto) con escrituras en lote y
+un mapa de precios vigentes cacheado por empresa, más los modelos de lectura
+de la pantalla de precios: último precio cobrado por (producto, región) y
+stock de la competencia, cada uno con una sola consulta
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Empresa, Inventario, PrecioEmpresaProducto, Venta
+from utils.cache_respuestas import version_escritura_empresa
+
+
+_CLAVE_SESION = 'precios_escritos'
+
+_PRECIOS_CACHE = {}
+
+
+def cargar_precios_simulacion(simulacion_id: int, dia: int,
+                              empresa_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[Tuple[int, Optional[str]], float]]:
+    """
+    Libro de precios vigente en un día para las empresas de la simulación
+
+    Una sola consulta. Gana el último cambio: un precio general (sin región)
+    reemplaza los precios regionales anteriores del mismo producto.
+
+    Args:
+        simulacion_id: ID de la simulación
+        dia: Día de ventas
+        empresa_ids: Limitar a estas empresas (todas si es None)
+
+    Returns:
+        Diccionario {empresa_id: {(producto_id, región o None): precio}}
+    """
+    consulta = db.session.query(
+        PrecioEmpresaProducto.empresa_id,
+        PrecioEmpresaProducto.producto_id,
+        PrecioEmpresaProducto.region,
+        PrecioEmpresaProducto.precio,
+    ).filter(
+        PrecioEmpresaProducto.simulacion_id == simulacion_id,
+        PrecioEmpresaProducto.dia_efectivo <= dia,
+    )
+    if empresa_ids is not None:
+        consulta = consulta.filter(PrecioEmpresaProducto.empresa_id.in_(list(empresa_ids)))
+
+    precios = {}
+    for empresa_id, producto_id, region, precio in consulta.order_by(
+        PrecioEmpresaProducto.dia_efectivo, PrecioEmpresaProducto.id
+    ).all():
+        mapa = precios.setdefault(empresa_id, {})
+        if region is None:
+            for clave in [clave for clave in mapa if clave[0] == producto_id]:
+                del mapa[clave]
+        mapa[(producto_id, region)] = precio
+    return precios
+
+
+def precio_vigente(precios: Dict[Tuple[int, Optional[str]], float], producto,
+                   region: Optional[str] = None, precio_defecto: Optional[float] = None) -> float:
+    """
+    Precio de venta de la empresa para un producto
+
+    Args:
+        precios: Mapa de la empresa (cargar_precios_simulacion / obtener_mapa_precios_empresa)
+        producto: Producto
+        region: Región de la venta (None para el precio general)
+        precio_defecto: Precio si la empresa no ha fijado uno (por defecto, el del catálogo)
+
+    Returns:
+        Precio regional, general o por defecto, en ese orden
+    """
+    precio = precios.get((producto.id, region)) if region is not None else None
+    if precio is None:
+        precio = precios.get((producto.id, None))
+    if precio is None:
+        precio = producto.precio_actual if precio_defecto is None else precio_defecto
+    return precio
+
+
+def obtener_mapa_precios_empresa(simulacion, empresa_id: int) -> Dict[Tuple[int, Optional[str]], float]:
+    """
+    Mapa de precios vigentes de la empresa para el día actual, cacheado
+
+    Se recalcula al cambiar de día o cuando cambia la versión de escritura
+    de la empresa (también entre procesos).
+
+    Args:
+        simulacion: Simulación activa
+        empresa_id: ID de la empresa
+
+    Returns:
+        Diccionario {(producto_id, región o None): precio}; no debe modificarse
+    """
+    clave = (simulacion.id, simulacion.dia_actual, version_escritura_empresa(empresa_id))
+    cacheado = _PRECIOS_CACHE.get(empresa_id)
+    if cacheado is not None and cacheado[0] == clave:
+        return cacheado[1]
+
+    mapa = cargar_precios_simulacion(simulacion.id, simulacion.dia_actual, [empresa_id]).get(empresa_id, {})
+    _PRECIOS_CACHE[empresa_id] = (clave, mapa)
+    return mapa
+
+
+def registrar_precios(simulacion, empresa_id: int, cambios: Iterable[Tuple[int, Optional[str], float]],
+                      usuario_id: Optional[int] = None) -> int:
+    """
+    Guarda en lote cambios de precio de la empresa, vigentes desde el día actual
+
+    El libro es de solo inserción: el último cambio registrado es el vigente.
+    No hace commit.
+
+    Args:
+        simulacion: Simulación activa
+        empresa_id: ID de la empresa
+        cambios: Tuplas (producto_id, región o None para todas, precio)
+        usuario_id: Usuario que hizo el cambio
+
+    Returns:
+        Número de precios registrados
+    """
+    filas = [
+        PrecioEmpresaProducto(
+            simulacion_id=simulacion.id,
+            empresa_id=empresa_id,
+            producto_id=int(producto_id),
+            region=region or None,
+            dia_efectivo=simulacion.dia_actual,
+            precio=float(precio),
+            usuario_id=usuario_id,
+        )
+        for producto_id, region, precio in cambios
+    ]
+    db.session.add_all(filas)
+    return len(filas)
+
+
+def obtener_ultimos_precios_region(empresa_id: int, region_variantes: Dict[str, List[str]]) -> Dict[Tuple[int, str], float]:
+    """
+    Último precio unitario vendido por producto y región
+
+    Una consulta con ROW_NUMBER() particionado por (producto, región canónica)
+    y ordenado por día descendente.
+
+    Args:
+        empresa_id: ID de la empresa
+        region_variantes: {región canónica: alias aceptados en Venta.region}
+
+    Returns:
+        Diccionario {(producto_id, región canónica): precio_unitario}
+    """
+    alias_canonico = {
+        alias: region
+        for region, alias_region in region_variantes.items()
+        for alias in alias_region
+    }
+    if not alias_canonico:
+        return {}
+
+    region_canonica = case(alias_canonico, value=Venta.region)
+    orden = func.row_number().over(
+        partition_by=(Venta.producto_id, region_canonica),
+        order_by=(Venta.semana_simulacion.desc(), Venta.id),
+    ).label('orden')
+
+    ranking = db.session.query(
+        Venta.producto_id,
+        region_canonica.label('region'),
+        Venta.precio_unitario,
+        orden,
+    ).filter(
+        Venta.empresa_id == empresa_id,
+        Venta.region.in_(list(alias_canonico)),
+    ).subquery()
+
+    filas = db.session.query(
+        ranking.c.producto_id, ranking.c.region, ranking.c.precio_unitario
+    ).filter(ranking.c.orden == 1).all()
+
+    return {(producto_id, region): precio for producto_id, region, precio in filas}
+
+
+def obtener_empresas_con_stock(simulacion_id: int, producto_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """
+    Empresas de la simulación con stock disponible de cada producto
+
+    Args:
+        simulacion_id: ID de la simulación
+        producto_ids: Productos a consultar
+
+    Returns:
+        Diccionario {producto_id: {empresa_id, ...}}
+    """
+    producto_ids = list(producto_ids)
+    if not producto_ids:
+        return {}
+
+    filas = db.session.query(
+        Inventario.producto_id, Inventario.empresa_id
+    ).join(
+        Empresa, Empresa.id == Inventario.empresa_id
+    ).filter(
+        Empresa.simulacion_id == simulacion_id,
+        Inventario.producto_id.in_(producto_ids),
+        Inventario.cantidad_actual > 0,
+    ).group_by(
+        Inventario.producto_id, Inventario.empresa_id
+    ).all()
+
+    empresas_con_stock = {}
+    for producto_id, empresa_id in filas:
+        empresas_con_stock.setdefault(producto_id, set()).add(empresa_id)
+    return empresas_con_stock
+
+
+def obtener_stock_empresa(empresa_id: int, producto_ids: Iterable[int]) -> Dict[int, float]:
+    """
+    Stock actual de la empresa por producto (primer registro de inventario de cada uno)
+
+    Args:
+        empresa_id: ID de la empresa
+        producto_ids: Productos a consultar
+
+    Returns:
+        Diccionario {producto_id: cantidad_actual}
+    """
+    producto_ids = list(producto_ids)
+    if not producto_ids:
+        return {}
+
+    filas = db.session.query(
+        Inventario.producto_id, Inventario.cantidad_actual
+    ).filter(
+        Inventario.empresa_id == empresa_id,
+        Inventario.producto_id.in_(producto_ids),
+    ).order_by(Inventario.id).all()
+
+    stock = {}
+    for producto_id, cantidad in filas:
+        stock.setdefault(producto_id, cantidad)
+    return stock
+
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_precios_escritos(session, _flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, PrecioEmpresaProducto):
+            session.info.setdefault(_CLAVE_SESION, set()).add(obj.empresa_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_precios(session):
+    for empresa_id in session.info.pop(_CLAVE_SESION, ()):
+        _PRECIOS_CACHE.pop(empresa_id, None)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_precios_escritos(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)
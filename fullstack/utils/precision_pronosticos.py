@@ -0,0 +1,135 @@
+"""
+Seguimiento de la precisión realizada de los pronósticos
+Al cierre de cada día compara los pronósticos guardados para ese día contra
+la demanda real (vendido + perdido) y acumula errores por empresa y método
+"""
+
+from typing import Dict, List
+from sqlalchemy import func
+from extensions import db
+from models import Empresa, Venta, Pronostico, PrecisionPronostico
+
+
+ALPHA_MAPE_MOVIL = 0.3
+
+
+def actualizar_precision_pronosticos(simulacion, dia: int, empresas: List = None) -> int:
+    """
+    Acumula la precisión de los pronósticos cuyo semana_pronostico es el día procesado
+
+    Si un mismo método se guardó varias veces para el mismo producto y día,
+    solo cuenta el más reciente. No hace commit: corre dentro del cierre del día.
+
+    Args:
+        simulacion: Simulación activa
+        dia: Día recién procesado
+        empresas: Empresas a evaluar (todas las activas de la simulación si es None)
+
+    Returns:
+        Número de pronósticos evaluados
+    """
+    if empresas is None:
+        empresas = Empresa.query.filter_by(activa=True, simulacion_id=simulacion.id).all()
+    empresa_ids = [e.id for e in empresas]
+    if not empresa_ids:
+        return 0
+
+    consulta = Pronostico.query.filter(
+        Pronostico.empresa_id.in_(empresa_ids),
+        Pronostico.semana_pronostico == dia,
+    )
+    if simulacion.fecha_inicio:
+        consulta = consulta.filter(Pronostico.created_at >= simulacion.fecha_inicio)
+
+    vigentes = {}
+    for p in consulta.order_by(Pronostico.id).all():
+        vigentes[(p.empresa_id, p.producto_id, p.metodo_usado)] = p
+    if not vigentes:
+        return 0
+
+    demanda_real = {
+        (empresa_id, producto_id): float(total or 0)
+        for empresa_id, producto_id, total in db.session.query(
+            Venta.empresa_id,
+            Venta.producto_id,
+            func.sum(Venta.cantidad_vendida + Venta.cantidad_perdida),
+        ).filter(
+            Venta.empresa_id.in_(empresa_ids),
+            Venta.semana_simulacion == dia,
+        ).group_by(Venta.empresa_id, Venta.producto_id).all()
+    }
+
+    # Errores del día agrupados por (empresa, método)
+    errores_dia: Dict[tuple, Dict[str, float]] = {}
+    for (empresa_id, producto_id, metodo), pronostico in vigentes.items():
+        real = demanda_real.get((empresa_id, producto_id), 0.0)
+        error = float(pronostico.demanda_pronosticada or 0) - real
+        acumulado = errores_dia.setdefault((empresa_id, metodo), {
+            'n': 0, 'n_pct': 0, 'abs': 0.0, 'pct': 0.0, 'error': 0.0,
+        })
+        acumulado['n'] += 1
+        acumulado['abs'] += abs(error)
+        acumulado['error'] += error
+        if real > 0:
+            acumulado['n_pct'] += 1
+            acumulado['pct'] += abs(error) / real * 100
+
+    existentes = {
+        (r.empresa_id, r.metodo_usado): r
+        for r in PrecisionPronostico.query.filter(
+            PrecisionPronostico.simulacion_id == simulacion.id,
+            PrecisionPronostico.empresa_id.in_(empresa_ids),
+        ).all()
+    }
+
+    for (empresa_id, metodo), acumulado in errores_dia.items():
+        registro = existentes.get((empresa_id, metodo))
+        if not registro:
+            registro = PrecisionPronostico(
+                simulacion_id=simulacion.id,
+                empresa_id=empresa_id,
+                metodo_usado=metodo,
+                observaciones=0,
+                observaciones_porcentuales=0,
+                suma_error_absoluto=0.0,
+                suma_error_porcentual=0.0,
+                suma_error=0.0,
+            )
+            db.session.add(registro)
+
+        registro.observaciones += acumulado['n']
+        registro.observaciones_porcentuales += acumulado['n_pct']
+        registro.suma_error_absoluto += acumulado['abs']
+        registro.suma_error_porcentual += acumulado['pct']
+        registro.suma_error += acumulado['error']
+        registro.ultimo_dia = dia
+
+        if acumulado['n_pct']:
+            mape_dia = acumulado['pct'] / acumulado['n_pct']
+            if registro.mape_movil is None:
+                registro.mape_movil = mape_dia
+            else:
+                registro.mape_movil = ALPHA_MAPE_MOVIL * mape_dia + (1 - ALPHA_MAPE_MOVIL) * registro.mape_movil
+
+    return len(vigentes)
+
+
+def obtener_precision_empresa(simulacion, empresa_id: int) -> List[PrecisionPronostico]:
+    """
+    Precisión acumulada de la empresa en la simulación, mejor método primero
+
+    Args:
+        simulacion: Simulación de referencia
+        empresa_id: ID de la empresa
+
+    Returns:
+        Lista de PrecisionPronostico ordenada por MAPE móvil
+    """
+    if not simulacion:
+        return []
+
+    registros = PrecisionPronostico.query.filter_by(
+        simulacion_id=simulacion.id,
+        empresa_id=empresa_id,
+    ).all()
+    return sorted(registros, key=lambda r: (r.mape_movil is None, r.mape_movil or 0))
@@ -2,44 +2,61 @@
 Utilidades para procesamiento automático de semanas de simulación
 """
 
+import numpy as np
 from models import (Simulacion, Empresa, Producto, Inventario, Venta, Compra,
-                    DespachoRegional, MovimientoInventario, Metrica, DisrupcionEmpresa, Decision)
+                    DespachoRegional, MovimientoInventario, Metrica, DisrupcionEmpresa, AprobacionVentaDiaria)
 from extensions import db
 from datetime import datetime
 from sqlalchemy import func
 from flask import current_app
 from utils.demanda_central import obtener_demanda_base, validar_cobertura_demanda_dia
+from utils.eventos import (
+    publicar_al_confirmar, EVENTO_DIA_AVANZADO, EVENTO_DISRUPCION_ACTIVADA,
+    EVENTO_DISRUPCION_EXPIRADA, EVENTO_COMPRA_LLEGADA
+)
+from utils.precios import cargar_precios_simulacion, precio_vigente
+from utils.demanda_competitiva import (
+    asignar_demanda_competitiva, calcular_market_share_vector, distribuir_demanda_mercado
+)
 
 
-def calcular_precios_mercado(simulacion, producto_id, region):
+REGIONES_VENTA = ['Andina', 'Caribe', 'Pacífica', 'Orinoquía', 'Amazonía']
+
+
+def calcular_precios_mercado(simulacion, producto_id, region, precios=None):
     """
     Calcula el precio promedio del mercado para un producto en una región
+    precios: libro de precios del día por empresa (se carga si es None)
     Retorna: (precio_promedio, lista de (empresa_id, precio, stock_disponible))
     """
     empresas_activas = Empresa.query.filter_by(simulacion_id=simulacion.id).all()
     precios_mercado = []
+    producto = Producto.query.get(producto_id)
+    if not producto:
+        return 0, precios_mercado
+    if precios is None:
+        precios = cargar_precios_simulacion(simulacion.id, simulacion.dia_actual)
+    
+    # Inventario del producto de todas las empresas en una consulta (primer registro de cada una)
+    inventarios = {}
+    for inventario in Inventario.query.filter(
+        Inventario.empresa_id.in_([empresa.id for empresa in empresas_activas]),
+        Inventario.producto_id == producto_id
+    ).order_by(Inventario.id).all():
+        inventarios.setdefault(inventario.empresa_id, inventario)
     
     for empresa in empresas_activas:
-        # Obtener precio del producto para esta empresa
-        producto = Producto.query.get(producto_id)
-        if not producto:
-            continue
-            
-        inventario = Inventario.query.filter_by(
-            empresa_id=empresa.id,
-            producto_id=producto_id
-        ).first()
+        inventario = inventarios.get(empresa.id)
         
         stock_disponible = 0
         if inventario:
             stock_disponible = inventario.cantidad_actual - inventario.cantidad_reservada
             stock_disponible = max(0, stock_disponible)
         
-        # El precio actual es el mismo para todas las regiones (precio_actual del producto)
-        # En el futuro podríamos tener precios por región
+        # Precio de esta empresa en la región (libro de precios o catálogo)
         precios_mercado.append({
             'empresa_id': empresa.id,
-            'precio': producto.precio_actual,
+            'precio': precio_vigente(precios.get(empresa.id, {}), producto, region),
             'stock': stock_disponible
         })
     
@@ -58,44 +75,10 @@ def calcular_market_share(precio_empresa, precio_promedio, stock_disponible, ela
     
     Retorna: porcentaje de 0 a 1
     """
-    if precio_promedio <= 0:
-        # Sin referencia de precio: distribución neutra, penalizada si no hay stock
-        return 0.3 if stock_disponible <= 0 else 1.0
-    
-    # Calcular ratio de precio
-    ratio_precio = precio_empresa / precio_promedio
-    
-    # Aplicar elasticidad del producto
-    # Productos premium (baja elasticidad) son menos sensibles al precio
-    # Productos económicos (alta elasticidad) son muy sensibles al precio
-    factor_elasticidad = elasticidad / 2.0  # Normalizar
-    
-    # Calcular market share base según ratio de precio
-    if ratio_precio > 1.5:  # Precio muy alto (>150% del promedio)
-        market_share = 0.0
-    elif ratio_precio > 1.2:  # Precio alto (120-150%)
-        market_share = 0.1 + (1.5 - ratio_precio) * 0.3 * factor_elasticidad
-    elif ratio_precio > 0.9:  # Precio competitivo (90-120%)
-        market_share = 0.5 + (1.2 - ratio_precio) * 0.5
-    elif ratio_precio > 0.7:  # Precio bajo (70-90%)
-        market_share = 0.6 + (0.9 - ratio_precio) * 1.0
-    else:  # Precio muy bajo (<70%)
-        # Sospecha de calidad - no siempre es mejor
-        market_share = 0.4
-    
-    # Sin stock: penalizar al 30% en lugar de bloquear completamente.
-    # El mercado sigue intentando ordenar a esta empresa (demanda registrada como no atendida)
-    # → esto hace que el nivel de servicio caiga visiblemente cuando hay desabastecimiento.
-    if stock_disponible <= 0:
-        market_share *= 0.3
-    
-    # Asegurar que esté entre 0 y 1
-    market_share = max(0.0, min(1.0, market_share))
-    
-    return market_share
+    return float(calcular_market_share_vector(precio_empresa, precio_promedio, stock_disponible, elasticidad))
 
 
-def distribuir_demanda_competitiva(simulacion, producto, region, demanda_total, semana_actual):
+def distribuir_demanda_competitiva(simulacion, producto, region, demanda_total, semana_actual, precios=None):
     """
     Distribuye la demanda total del mercado entre todas las empresas
     según su competitividad de precios y disponibilidad de stock
@@ -103,63 +86,36 @@ def distribuir_demanda_competitiva(simulacion, producto, region, demanda_total,
     Retorna: (lista de asignaciones, precio_promedio)
     """
     # Obtener precios de mercado
-    precio_promedio, empresas_info = calcular_precios_mercado(simulacion, producto.id, region)
+    precio_promedio, empresas_info = calcular_precios_mercado(simulacion, producto.id, region, precios)
     
     if precio_promedio <= 0 or not empresas_info:
         return [], 0  # Sin mercado activo - retornar tupla vacía
     
-    # Calcular market share para cada empresa
-    market_shares = []
-    total_market_share = 0
+    # Market share, normalización y redondeo por resto mayor (vectorizado)
+    resultado = asignar_demanda_competitiva(
+        np.array([[[info['precio']]] for info in empresas_info]),
+        np.array([[[info['stock']]] for info in empresas_info]),
+        np.array([[demanda_total]]),
+        np.array([producto.elasticidad_precio or 0]),
+    )
     
-    for info in empresas_info:
-        share = calcular_market_share(
-            info['precio'], 
-            precio_promedio, 
-            info['stock'],
-            producto.elasticidad_precio
-        )
-        market_shares.append({
+    # No se limita por stock aquí: el stock disponible limita las ventas reales
+    # en procesar_ventas_semana. Esto permite registrar demanda no atendida,
+    # lo que hace que el nivel de servicio baje correctamente cuando hay desabastecimiento.
+    asignaciones = [
+        {
             'empresa_id': info['empresa_id'],
+            'cantidad': int(resultado['cantidad'][i, 0, 0]),
             'precio': info['precio'],
-            'stock': info['stock'],
-            'market_share': share
-        })
-        total_market_share += share
-    
-    # Normalizar market shares
-    if total_market_share > 0:
-        for ms in market_shares:
-            ms['market_share'] = ms['market_share'] / total_market_share
-    
-    # Distribuir demanda según market share
-    asignaciones = []
-    demanda_restante = demanda_total
+            'market_share': float(resultado['market_share'][i, 0, 0]),
+            'stock_disponible': info['stock']
+        }
+        for i, info in enumerate(empresas_info)
+        if resultado['cantidad'][i, 0, 0] > 0
+    ]
     
     # Ordenar por market share descendente
-    market_shares.sort(key=lambda x: x['market_share'], reverse=True)
-    
-    for ms in market_shares:
-        if demanda_restante <= 0:
-            break
-            
-        # Calcular demanda asignada a esta empresa según market share
-        demanda_empresa = round(demanda_total * ms['market_share'])
-        
-        # No se limita por stock aquí: el stock disponible limita las ventas reales
-        # en procesar_ventas_semana. Esto permite registrar demanda no atendida,
-        # lo que hace que el nivel de servicio baje correctamente cuando hay desabastecimiento.
-        cantidad_asignada = min(demanda_empresa, demanda_restante)
-        
-        if cantidad_asignada > 0:
-            asignaciones.append({
-                'empresa_id': ms['empresa_id'],
-                'cantidad': cantidad_asignada,
-                'precio': ms['precio'],
-                'market_share': ms['market_share'],
-                'stock_disponible': ms['stock']
-            })
-            demanda_restante -= cantidad_asignada
+    asignaciones.sort(key=lambda x: x['market_share'], reverse=True)
     
     # Si queda demanda sin asignar (todas sin stock o precios muy altos)
     # Se registrará como ventas perdidas para cada empresa según su intención de compra
@@ -196,22 +152,28 @@ def verificar_y_activar_disrupciones(simulacion):
     from utils.catalogo_disrupciones import CATALOGO_DISRUPCIONES
 
     dia = simulacion.dia_actual
+    definiciones = [
+        definicion for definicion in CATALOGO_DISRUPCIONES
+        if int(definicion.get('dia_inicio', 0)) <= dia <= int(definicion.get('dia_fin', 0))
+    ]
+    if not definiciones:
+        return []
+
     empresas = Empresa.query.filter_by(activa=True, simulacion_id=simulacion.id).all()
+    existentes = set(db.session.query(
+        DisrupcionEmpresa.empresa_id, DisrupcionEmpresa.disrupcion_key
+    ).filter(
+        DisrupcionEmpresa.simulacion_id == simulacion.id,
+        DisrupcionEmpresa.disrupcion_key.in_([definicion['key'] for definicion in definiciones]),
+    ).all())
     nuevas = []
 
-    for definicion in CATALOGO_DISRUPCIONES:
+    for definicion in definiciones:
         dia_inicio = int(definicion.get('dia_inicio', 0))
         dia_fin = int(definicion.get('dia_fin', 0))
 
-        if dia < dia_inicio or dia > dia_fin:
-            continue
         for empresa in empresas:
-            ya_existe = DisrupcionEmpresa.query.filter_by(
-                simulacion_id=simulacion.id,
-                empresa_id=empresa.id,
-                disrupcion_key=definicion['key']
-            ).first()
-            if ya_existe:
+            if (empresa.id, definicion['key']) in existentes:
                 continue
 
             producto = obtener_producto_mas_demandado(empresa)
@@ -226,6 +188,7 @@ def verificar_y_activar_disrupciones(simulacion):
             )
             db.session.add(nueva)
             nuevas.append(nueva)
+            existentes.add((empresa.id, definicion['key']))
 
     return nuevas
 
@@ -306,14 +269,16 @@ def asegurar_metricas_base_dia_uno(simulacion, commit=False):
         return 0
 
     empresas = Empresa.query.filter_by(simulacion_id=simulacion.id, activa=True).all()
+    con_metrica = {
+        empresa_id for (empresa_id,) in db.session.query(Metrica.empresa_id).filter(
+            Metrica.empresa_id.in_([empresa.id for empresa in empresas]),
+            Metrica.semana_simulacion == 1,
+        ).all()
+    }
     creadas = 0
 
     for empresa in empresas:
-        existe = Metrica.query.filter_by(
-            empresa_id=empresa.id,
-            semana_simulacion=1,
-        ).first()
-        if existe:
+        if empresa.id in con_metrica:
             continue
 
         db.session.add(Metrica(
@@ -339,34 +304,36 @@ def asegurar_metricas_base_dia_uno(simulacion, commit=False):
 
 # ---------------------------------------------------------------------------
 
-def procesar_ventas_semana(simulacion, empresa):
+def procesar_ventas_semana(simulacion, empresa, precios=None, demanda_asignada=None):
     """
     Procesa ventas del día para una empresa usando la base central de demanda.
     La demanda base por producto/región es idéntica para todas las empresas.
+    precios: mapa de precios vigentes de la empresa (se carga si es None).
+    demanda_asignada: {(producto_id, región): unidades} de la demanda competitiva;
+    si es None cada empresa recibe la demanda base completa.
     """
     semana_actual = simulacion.dia_actual
+    if precios is None:
+        precios = cargar_precios_simulacion(simulacion.id, semana_actual, [empresa.id]).get(empresa.id, {})
     productos = Producto.query.filter_by(activo=True).all()
-    regiones = ['Andina', 'Caribe', 'Pacífica', 'Orinoquía', 'Amazonía']
+    regiones = REGIONES_VENTA
     ventas_generadas = []
 
     # Obtener efectos de disrupciones activas una sola vez por empresa
     efectos_disrupcion = obtener_efectos_por_empresa(simulacion.id, empresa.id)
 
     # Aprobaciones de Ventas para el día (si no hay, se asume 0 aprobado).
-    decision_aprobaciones = Decision.query.filter_by(
-        empresa_id=empresa.id,
-        tipo_decision='ventas_aprobacion_diaria',
-        semana_simulacion=semana_actual
-    ).order_by(Decision.created_at.desc()).first()
-
-    aprobaciones_map = {}
-    if decision_aprobaciones and decision_aprobaciones.datos_decision:
-        for item in decision_aprobaciones.datos_decision.get('aprobaciones', []):
-            pid = int(item.get('producto_id', 0))
-            region = item.get('region')
-            cantidad = int(item.get('cantidad_aprobada', 0))
-            if pid and region:
-                aprobaciones_map[(pid, region)] = max(0, cantidad)
+    aprobaciones_map = {
+        (producto_id, region): max(0, int(cantidad or 0))
+        for producto_id, region, cantidad in db.session.query(
+            AprobacionVentaDiaria.producto_id,
+            AprobacionVentaDiaria.region,
+            AprobacionVentaDiaria.cantidad_aprobada,
+        ).filter(
+            AprobacionVentaDiaria.empresa_id == empresa.id,
+            AprobacionVentaDiaria.dia_simulacion == semana_actual,
+        ).all()
+    }
 
     for producto in productos:
         # Obtener inventario de esta empresa
@@ -398,7 +365,7 @@ def procesar_ventas_semana(simulacion, empresa):
                     cantidad_vendida=0,
                     cantidad_perdida=0,
                     demanda_mercado_total=0,
-                    precio_unitario=producto.precio_actual,
+                    precio_unitario=precio_vigente(precios, producto, region),
                     ingreso_total=0,
                     costo_unitario=inventario.costo_promedio or producto.costo_unitario,
                     margen=0
@@ -407,8 +374,11 @@ def procesar_ventas_semana(simulacion, empresa):
                 ventas_generadas.append(venta)
                 continue
             
-            # Pedido solicitado por región (desde base central).
+            # Pedido solicitado por región (desde base central, o la parte
+            # del mercado que ganó la empresa si la demanda es competitiva).
             cantidad_solicitada = cantidad_total_mercado
+            if demanda_asignada is not None:
+                cantidad_solicitada = int(demanda_asignada.get((producto.id, region), 0))
 
             # Pedido aprobado por Ventas (no puede superar lo solicitado).
             cantidad_aprobada = int(aprobaciones_map.get((producto.id, region), 0))
@@ -434,8 +404,8 @@ def procesar_ventas_semana(simulacion, empresa):
             ventas_perdidas_sin_stock = max(0, cantidad_solicitada - cantidad_vendida)
             cantidad_perdida_total = ventas_perdidas_sin_stock
 
-            # Precio unitario — ya actualizado en DB si el equipo eligió Opción D
-            precio_unitario = producto.precio_actual
+            # Precio unitario — libro de precios de la empresa (regional, general o de catálogo)
+            precio_unitario = precio_vigente(precios, producto, region)
             ingreso_total = cantidad_vendida * precio_unitario
             costo_unitario = inventario.costo_promedio or producto.costo_unitario
             margen = ingreso_total - (cantidad_vendida * costo_unitario)
@@ -584,9 +554,8 @@ def calcular_costos_operativos(simulacion, empresa):
     for venta in ventas_dia:
         cantidad_perdida = venta.cantidad_solicitada - venta.cantidad_vendida
         if cantidad_perdida > 0:
-            # Obtener precio actual del producto
-            producto = Producto.query.get(venta.producto_id)
-            precio_venta = producto.precio_actual if producto else 0
+            # Precio vigente del día (el mismo con el que se registró la venta)
+            precio_venta = venta.precio_unitario or 0
             penalizacion_ventas_perdidas += cantidad_perdida * precio_venta * 0.30  # 30% del precio
     
     # APLICAR COSTOS AL CAPITAL
@@ -767,9 +736,22 @@ def procesar_semana_completa(simulacion):
         'alertas': []
     }
     
+    # Libro de precios del día para todas las empresas en una consulta
+    precios = cargar_precios_simulacion(simulacion.id, semana_actual)
+    
+    # Demanda competitiva: reparto del mercado entre empresas por precio y stock
+    demanda_asignada = None
+    if current_app.config.get('DEMANDA_COMPETITIVA_ACTIVA', False):
+        demanda_asignada = distribuir_demanda_mercado(
+            simulacion, semana_actual, REGIONES_VENTA, empresas, precios
+        )['cantidades']
+    
     for empresa in empresas:
         # 1. Procesar ventas de la semana
-        ventas = procesar_ventas_semana(simulacion, empresa)
+        ventas = procesar_ventas_semana(
+            simulacion, empresa, precios.get(empresa.id, {}),
+            None if demanda_asignada is None else demanda_asignada.get(empresa.id, {})
+        )
         resumen['total_ventas'] += len(ventas)
         
         # 2. Procesar llegadas de compras
@@ -805,6 +787,42 @@ def procesar_semana_completa(simulacion):
     return resumen
 
 
+def _publicar_eventos_dia(simulacion, dia_procesado, nuevas, expiradas):
+    """
+    Encola las notificaciones del avance de día para los tableros (SSE)
+
+    Se publican al confirmar el avance: día nuevo para todas las empresas,
+    disrupciones activadas/expiradas y compras que ya llegaron al centro de
+    distribución, por empresa.
+    """
+    publicar_al_confirmar(EVENTO_DIA_AVANZADO, simulacion.id, datos={
+        'dia_procesado': dia_procesado,
+        'dia_actual': simulacion.dia_actual,
+        'estado': simulacion.estado,
+    })
+    for disrupcion in nuevas:
+        publicar_al_confirmar(EVENTO_DISRUPCION_ACTIVADA, simulacion.id, disrupcion.empresa_id,
+                              {'disrupcion_key': disrupcion.disrupcion_key})
+    for disrupcion in expiradas:
+        publicar_al_confirmar(EVENTO_DISRUPCION_EXPIRADA, simulacion.id, disrupcion.empresa_id,
+                              {'disrupcion_key': disrupcion.disrupcion_key})
+
+    if simulacion.dia_actual <= dia_procesado:
+        return
+    llegadas = db.session.query(
+        Compra.empresa_id,
+        func.count(Compra.id)
+    ).join(Empresa, Empresa.id == Compra.empresa_id).filter(
+        Empresa.simulacion_id == simulacion.id,
+        Compra.estado == 'en_transito',
+        Compra.semana_entrega > dia_procesado,
+        Compra.semana_entrega <= simulacion.dia_actual,
+    ).group_by(Compra.empresa_id).all()
+    for empresa_id, cantidad in llegadas:
+        publicar_al_confirmar(EVENTO_COMPRA_LLEGADA, simulacion.id, empresa_id,
+                              {'ordenes': int(cantidad), 'dia_actual': simulacion.dia_actual})
+
+
 def avanzar_simulacion():
     """
     Avanza la simulación a la siguiente semana y procesa todos los eventos
@@ -847,6 +865,10 @@ def avanzar_simulacion():
         # Procesar día completo (los efectos activos se consultan dentro)
         resumen = procesar_semana_completa(simulacion)
 
+        # Precisión realizada de los pronósticos guardados para el día procesado
+        from utils.precision_pronosticos import actualizar_precision_pronosticos
+        resumen['pronosticos_evaluados'] = actualizar_precision_pronosticos(simulacion, dia_procesado)
+
         # Activar nuevas disrupciones cuya ventana de días incluye el día actual
         nuevas = verificar_y_activar_disrupciones(simulacion)
 
@@ -864,6 +886,17 @@ def avanzar_simulacion():
             simulacion.dia_actual = dia_procesado + 1
             simulacion.semana_actual = (simulacion.dia_actual - 1) // 7 + 1
 
+        # Snapshot de pronósticos para Planeación/MRP con los datos del día cerrado
+        if current_app.config.get('SNAPSHOTS_PRONOSTICO_ACTIVOS', True):
+            from utils.snapshots_pronostico import generar_snapshots_pronostico
+            resumen['snapshots_pronostico'] = generar_snapshots_pronostico(simulacion, dia_procesado)
+
+        # Parte estática del dashboard general para el día que comienza
+        if current_app.config.get('SNAPSHOTS_DASHBOARD_ACTIVOS', True):
+            from utils.snapshots_dashboard import generar_snapshots_dashboard
+            resumen['snapshots_dashboard'] = generar_snapshots_dashboard(simulacion)
+
+        _publicar_eventos_dia(simulacion, dia_procesado, nuevas, expiradas)
         db.session.commit()
 
         if dia_procesado >= total_dias:
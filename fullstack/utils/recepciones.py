@@ -0,0 +1,118 @@
+"""
+Recepción en lote de órdenes de compra
+Agrupa las compras listas por producto, recalcula stock y costo promedio
+ponderado una sola vez por producto y registra movimientos y decisiones en lote
+"""
+
+from typing import Dict, List, Any
+from extensions import db
+from models import Decision, Inventario, MovimientoInventario
+from utils.logistica import _qty_int
+
+
+def recibir_compras_lote(compras: List, empresa_id: int, usuario_id: int, dia: int) -> List[Dict[str, Any]]:
+    """
+    Recibe varias compras en tránsito con un número fijo de consultas
+
+    Las compras se aplican en el orden recibido, de modo que los saldos de
+    cada movimiento y el costo promedio final coinciden con recibirlas una a
+    una. No hace commit.
+
+    Args:
+        compras: Compras en tránsito ya validadas como listas para recibir
+        empresa_id: ID de la empresa
+        usuario_id: Usuario de Logística que recibe
+        dia: Día de simulación de la recepción
+
+    Returns:
+        Resultado por compra (mismo formato que procesar_recepcion_compra)
+    """
+    if not compras:
+        return []
+
+    producto_ids = sorted({compra.producto_id for compra in compras})
+    inventarios = {
+        inventario.producto_id: inventario
+        for inventario in Inventario.query.filter(
+            Inventario.empresa_id == empresa_id,
+            Inventario.producto_id.in_(producto_ids),
+        ).all()
+    }
+
+    # Saldo y valor acumulado por producto, partiendo del inventario actual
+    saldos = {}
+    for compra in compras:
+        if compra.producto_id in saldos:
+            continue
+        inventario = inventarios.get(compra.producto_id)
+        if inventario is None:
+            inventario = Inventario(
+                empresa_id=empresa_id,
+                producto_id=compra.producto_id,
+                cantidad_actual=0,
+                costo_promedio=compra.costo_unitario
+            )
+            db.session.add(inventario)
+            inventarios[compra.producto_id] = inventario
+        saldos[compra.producto_id] = {
+            'cantidad': inventario.cantidad_actual or 0,
+            'costo_promedio': inventario.costo_promedio or 0,
+        }
+
+    resultados = []
+    movimientos = []
+    decisiones = []
+    for compra in compras:
+        saldo = saldos[compra.producto_id]
+        cantidad_anterior = saldo['cantidad']
+        valor_nueva_compra = compra.cantidad * compra.costo_unitario
+        cantidad_total = cantidad_anterior + compra.cantidad
+        if cantidad_total > 0:
+            saldo['costo_promedio'] = (cantidad_anterior * saldo['costo_promedio'] + valor_nueva_compra) / cantidad_total
+        saldo['cantidad'] = _qty_int(cantidad_total)
+
+        resultado = {
+            'cantidad_recibida': compra.cantidad,
+            'cantidad_anterior': cantidad_anterior,
+            'cantidad_nueva': saldo['cantidad'],
+            'costo_unitario': compra.costo_unitario,
+            'costo_promedio': saldo['costo_promedio'],
+            'valor_recepcion': valor_nueva_compra
+        }
+        resultados.append(resultado)
+        compra.estado = 'entregado'
+
+        movimientos.append(MovimientoInventario(
+            empresa_id=empresa_id,
+            producto_id=compra.producto_id,
+            usuario_id=usuario_id,
+            semana_simulacion=dia,
+            tipo_movimiento='entrada_compra',
+            cantidad=compra.cantidad,
+            saldo_anterior=cantidad_anterior,
+            saldo_nuevo=saldo['cantidad'],
+            compra_id=compra.id,
+            observaciones=f"Recepción de compra. Costo unitario: ${compra.costo_unitario:,.0f}"
+        ))
+        decisiones.append(Decision(
+            usuario_id=usuario_id,
+            empresa_id=empresa_id,
+            semana_simulacion=dia,
+            tipo_decision='recepcion_compra',
+            datos_decision={
+                'compra_id': compra.id,
+                'producto_id': compra.producto_id,
+                'cantidad': compra.cantidad
+            },
+            resultado=resultado
+        ))
+
+    # Una sola actualización por producto
+    for producto_id, saldo in saldos.items():
+        inventario = inventarios[producto_id]
+        inventario.cantidad_actual = saldo['cantidad']
+        inventario.costo_promedio = saldo['costo_promedio']
+
+    db.session.bulk_save_objects(movimientos)
+    db.session.bulk_save_objects(decisiones)
+    return resultados
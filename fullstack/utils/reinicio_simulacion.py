@@ -4,7 +4,8 @@ Utilidades para reiniciar simulación manteniendo histórico
 from models import (Simulacion, Empresa, Producto, Inventario,
                     Venta, Metrica, Compra, DespachoRegional,
                     MovimientoInventario, DisrupcionEmpresa, RequerimientoCompra,
-                    DisponibilidadVehiculo, Decision)
+                    DisponibilidadVehiculo, EstadoVehiculo, Decision, AprobacionVentaDiaria, PronosticoSnapshot,
+                    PrecisionPronostico, DashboardSnapshot, PrecioEmpresaProducto)
 from extensions import db
 from datetime import datetime
 from utils.demanda_central import generar_base_demanda_simulacion
@@ -107,7 +108,13 @@ def reiniciar_simulacion(capital_inicial=CAPITAL_INICIAL_EMPRESA_DEFAULT, nombre
             DisrupcionEmpresa.query.filter(DisrupcionEmpresa.empresa_id.in_(ids)).delete(synchronize_session=False)
             RequerimientoCompra.query.filter(RequerimientoCompra.empresa_id.in_(ids)).delete(synchronize_session=False)
             DisponibilidadVehiculo.query.filter(DisponibilidadVehiculo.empresa_id.in_(ids)).delete(synchronize_session=False)
+            EstadoVehiculo.query.filter(EstadoVehiculo.empresa_id.in_(ids)).delete(synchronize_session=False)
+            AprobacionVentaDiaria.query.filter(AprobacionVentaDiaria.empresa_id.in_(ids)).delete(synchronize_session=False)
             Decision.query.filter(Decision.empresa_id.in_(ids)).delete(synchronize_session=False)
+            PronosticoSnapshot.query.filter(PronosticoSnapshot.empresa_id.in_(ids)).delete(synchronize_session=False)
+            PrecisionPronostico.query.filter(PrecisionPronostico.empresa_id.in_(ids)).delete(synchronize_session=False)
+            DashboardSnapshot.query.filter(DashboardSnapshot.empresa_id.in_(ids)).delete(synchronize_session=False)
+            PrecioEmpresaProducto.query.filter(PrecioEmpresaProducto.empresa_id.in_(ids)).delete(synchronize_session=False)
 
         for empresa in empresas:
             empresa.simulacion_id = nueva_simulacion.id
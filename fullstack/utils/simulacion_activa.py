@@ -0,0 +1,128 @@
+"""
+Simulación activa cacheada por proceso
+Guarda una fotografía de la fila activa y solo la recarga cuando cambia el
+sello de versión, que se renueva al confirmar cualquier escritura sobre
+Simulacion (avance de día, control, reinicio) en este u otro proceso
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Simulacion
+
+
+# Relectura forzada para cambios hechos fuera de la aplicación (consola, SQL directo)
+SEGUNDOS_MAXIMOS_CACHE = 60
+_CLAVE_SESION = 'simulacion_modificada'
+
+
+class SimulacionActiva(NamedTuple):
+    """Fotografía de solo lectura de la simulación activa."""
+    id: int
+    nombre: str
+    semana_actual: int
+    dia_actual: int
+    estado: str
+    fecha_inicio: Optional[datetime]
+    fecha_fin: Optional[datetime]
+    duracion_semanas: int
+    capital_inicial_empresas: float
+    activa: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+# (sello, cargada_en, simulación): se publica entero con una sola asignación para
+# que dos recargas concurrentes no dejen una fila vieja bajo un sello nuevo
+_cache = {'vigente': None}
+
+
+def _ruta_sello() -> str:
+    return current_app.config['SIMULACION_VERSION_FILE']
+
+
+def _leer_sello():
+    """Sello de versión compartido entre procesos (una llamada a stat, sin consultas)."""
+    try:
+        estado = os.stat(_ruta_sello())
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+
+def invalidar_simulacion_activa():
+    """Renueva el sello de versión para que todos los procesos recarguen la simulación."""
+    _cache['vigente'] = None
+    ruta = _ruta_sello()
+    temporal = f'{ruta}.{os.getpid()}'
+    try:
+        with open(temporal, 'w') as archivo:
+            archivo.write(f'{time.time_ns()}\n')
+        os.replace(temporal, ruta)
+    except OSError:
+        current_app.logger.warning('No se pudo renovar el sello de la simulación activa en %s', ruta)
+
+
+def obtener_simulacion_activa() -> Optional[SimulacionActiva]:
+    """
+    Simulación activa sin consultar la base mientras no cambie su versión
+
+    Returns:
+        SimulacionActiva (inmutable) o None si no hay simulación activa. Para
+        modificar la simulación se debe cargar la fila con db.session.get.
+    """
+    sello = _leer_sello()
+    vigente = _cache['vigente']
+    if (
+        vigente is not None
+        and sello is not None
+        and vigente[0] == sello
+        and time.monotonic() - vigente[1] < SEGUNDOS_MAXIMOS_CACHE
+    ):
+        return vigente[2]
+
+    if sello is None:
+        invalidar_simulacion_activa()
+        sello = _leer_sello()
+
+    fila = db.session.query(
+        *[getattr(Simulacion, campo) for campo in SimulacionActiva._fields]
+    ).filter(Simulacion.activa == True).first()
+
+    # El sello se leyó antes de la consulta: la fila es al menos tan nueva como él
+    simulacion = SimulacionActiva(*fila) if fila else None
+    _cache['vigente'] = (sello, time.monotonic(), simulacion)
+    return simulacion
+
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_cambios_simulacion(session, _flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Simulacion):
+            session.info[_CLAVE_SESION] = True
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _detectar_escrituras_masivas(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Simulacion:
+        orm_execute_state.session.info[_CLAVE_SESION] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_al_confirmar(session):
+    if session.info.pop(_CLAVE_SESION, False):
+        invalidar_simulacion_activa()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_marca(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)
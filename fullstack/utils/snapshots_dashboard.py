@@ -0,0 +1,260 @@
+"""
+Snapshots diarios del dashboard general por empresa
+La parte del tablero que solo cambia al cerrar el día (métricas, acumulados,
+ventas del día e histórico operativo) se arma una vez para todas las empresas
+con consultas agrupadas y se guarda como un documento JSON
+"""
+
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import DashboardSnapshot, DemandaMercadoDiaria, Empresa, Metrica, Producto, Venta
+
+
+CAMPOS_METRICA = ('ingresos', 'costos', 'utilidad', 'nivel_servicio', 'rotacion_inventario', 'market_share')
+METRICA_VACIA = {
+    'ingresos': 0,
+    'costos': 0,
+    'utilidad': 0,
+    'nivel_servicio': 100.0,
+    'rotacion_inventario': 0,
+    'market_share': 0,
+}
+
+
+def construir_resumenes_dashboard(simulacion, empresa_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Calcula la parte estática del dashboard general para varias empresas
+
+    Usa cinco consultas sin importar el número de empresas.
+
+    Args:
+        simulacion: Simulación activa
+        empresa_ids: IDs de las empresas
+
+    Returns:
+        Diccionario {empresa_id: datos} listo para guardar en DashboardSnapshot.datos
+    """
+    if not empresa_ids:
+        return {}
+
+    dia_actual = int(simulacion.dia_actual or 1)
+    dias_periodo = list(range(1, dia_actual + 1))
+
+    productos = db.session.query(Producto.id, Producto.nombre).filter(Producto.activo == True).all()
+    producto_nombre_map = {pid: nombre for pid, nombre in productos}
+    producto_ids_ordenados = sorted(producto_nombre_map.keys(), key=lambda pid: producto_nombre_map[pid])
+
+    # Métrica del día (o la última disponible) y acumulados desde el día 1
+    metricas = db.session.query(
+        Metrica.empresa_id, Metrica.semana_simulacion,
+        *[getattr(Metrica, campo) for campo in CAMPOS_METRICA]
+    ).filter(
+        Metrica.empresa_id.in_(empresa_ids),
+        Metrica.semana_simulacion <= dia_actual,
+    ).order_by(Metrica.semana_simulacion.desc(), Metrica.id).all()
+
+    ventas_dia = db.session.query(
+        Venta.empresa_id, Venta.cantidad_vendida
+    ).filter(
+        Venta.empresa_id.in_(empresa_ids),
+        Venta.semana_simulacion == dia_actual,
+    ).order_by(Venta.id).all()
+
+    demanda_rows = db.session.query(
+        DemandaMercadoDiaria.dia_simulacion,
+        DemandaMercadoDiaria.producto_id,
+        func.sum(DemandaMercadoDiaria.demanda_base).label('demanda_total')
+    ).filter(
+        DemandaMercadoDiaria.simulacion_id == simulacion.id,
+        DemandaMercadoDiaria.dia_simulacion >= 1,
+        DemandaMercadoDiaria.dia_simulacion <= dia_actual,
+    ).group_by(
+        DemandaMercadoDiaria.dia_simulacion,
+        DemandaMercadoDiaria.producto_id,
+    ).all()
+
+    ventas_rows = db.session.query(
+        Venta.empresa_id,
+        Venta.semana_simulacion,
+        Venta.producto_id,
+        func.sum(Venta.cantidad_solicitada).label('pedidos_total'),
+        func.sum(Venta.cantidad_vendida).label('vendidas_total'),
+        func.sum(Venta.cantidad_perdida).label('perdidas_total'),
+        func.sum(Venta.ingreso_total).label('ingresos_total')
+    ).filter(
+        Venta.empresa_id.in_(empresa_ids),
+        Venta.semana_simulacion >= 1,
+        Venta.semana_simulacion <= dia_actual,
+    ).group_by(
+        Venta.empresa_id,
+        Venta.semana_simulacion,
+        Venta.producto_id,
+    ).all()
+
+    demanda_por_dia = {d: 0 for d in dias_periodo}
+    demanda_por_dia_producto = {}
+    for row in demanda_rows:
+        d = int(row.dia_simulacion)
+        p = int(row.producto_id)
+        demanda_valor = int(round(row.demanda_total or 0))
+        demanda_por_dia_producto[(d, p)] = demanda_valor
+        if d in demanda_por_dia:
+            demanda_por_dia[d] += demanda_valor
+
+    resumenes = {}
+    for empresa_id in empresa_ids:
+        resumenes[empresa_id] = {
+            'metrica_hoy': None,
+            'ingresos_acumulados': 0,
+            'costos_acumulados': 0,
+            'utilidad_acumulada': 0,
+            'ventas_dia': [],
+            '_ventas': {},
+        }
+
+    for fila in metricas:
+        resumen = resumenes[fila.empresa_id]
+        valores = {campo: getattr(fila, campo) for campo in CAMPOS_METRICA}
+        if resumen['metrica_hoy'] is None:
+            resumen['metrica_hoy'] = valores
+        if fila.semana_simulacion >= 1:
+            resumen['ingresos_acumulados'] += valores['ingresos'] or 0
+            resumen['costos_acumulados'] += valores['costos'] or 0
+            resumen['utilidad_acumulada'] += valores['utilidad'] or 0
+
+    for empresa_id, cantidad_vendida in ventas_dia:
+        resumenes[empresa_id]['ventas_dia'].append(cantidad_vendida)
+
+    for row in ventas_rows:
+        resumenes[row.empresa_id]['_ventas'][(int(row.semana_simulacion), int(row.producto_id))] = {
+            'pedidos_demandados': int(round(row.pedidos_total or 0)),
+            'unidades_vendidas': int(round(row.vendidas_total or 0)),
+            'unidades_perdidas': int(round(row.perdidas_total or 0)),
+            'ingresos': float(row.ingresos_total or 0),
+        }
+
+    for resumen in resumenes.values():
+        ventas_por_dia_producto = resumen.pop('_ventas')
+        vendidas_por_dia = {d: 0 for d in dias_periodo}
+        ingresos_por_dia = {d: 0 for d in dias_periodo}
+        for (d, _), venta_item in ventas_por_dia_producto.items():
+            if d in vendidas_por_dia:
+                vendidas_por_dia[d] += venta_item['unidades_vendidas']
+                ingresos_por_dia[d] += venta_item['ingresos']
+
+        historico_operacion = []
+        for d in reversed(dias_periodo):
+            for pid in producto_ids_ordenados:
+                demanda_base = demanda_por_dia_producto.get((d, pid), 0)
+                venta_item = ventas_por_dia_producto.get((d, pid), {})
+                pedidos_demandados = int(venta_item.get('pedidos_demandados', 0))
+                unidades_vendidas = int(venta_item.get('unidades_vendidas', 0))
+                unidades_perdidas = int(venta_item.get('unidades_perdidas', 0))
+                ingresos = float(venta_item.get('ingresos', 0))
+
+                if demanda_base <= 0 and pedidos_demandados <= 0 and unidades_vendidas <= 0 and unidades_perdidas <= 0 and ingresos <= 0:
+                    continue
+
+                historico_operacion.append({
+                    'dia': d,
+                    'producto': producto_nombre_map.get(pid, f'Producto {pid}'),
+                    'demanda_base': demanda_base,
+                    'pedidos_demandados': pedidos_demandados,
+                    'unidades_vendidas': unidades_vendidas,
+                    'unidades_perdidas': unidades_perdidas,
+                    'ingresos': ingresos,
+                })
+
+        total_ventas_periodo = sum(vendidas_por_dia.values())
+        resumen['historico_operacion'] = historico_operacion
+        resumen['total_ventas_periodo'] = total_ventas_periodo
+        resumen['ingresos_periodo'] = sum(ingresos_por_dia.values())
+        resumen['promedio_diario_periodo'] = (total_ventas_periodo / len(dias_periodo)) if dias_periodo else 0
+
+    return resumenes
+
+
+def generar_snapshots_dashboard(simulacion, empresas: List = None) -> int:
+    """
+    Guarda el snapshot del dashboard general de cada empresa para el día actual
+
+    No hace commit: se ejecuta dentro del cierre del día, después de mover
+    la simulación al día siguiente.
+
+    Args:
+        simulacion: Simulación activa
+        empresas: Empresas a procesar (todas las activas de la simulación si es None)
+
+    Returns:
+        Número de snapshots generados
+    """
+    if empresas is None:
+        empresas = Empresa.query.filter_by(activa=True, simulacion_id=simulacion.id).all()
+    empresa_ids = [e.id for e in empresas]
+    if not empresa_ids:
+        return 0
+
+    resumenes = construir_resumenes_dashboard(simulacion, empresa_ids)
+
+    DashboardSnapshot.query.filter(
+        DashboardSnapshot.simulacion_id == simulacion.id,
+        DashboardSnapshot.empresa_id.in_(empresa_ids),
+        DashboardSnapshot.dia_simulacion == simulacion.dia_actual,
+    ).delete(synchronize_session=False)
+
+    db.session.bulk_save_objects([
+        DashboardSnapshot(
+            simulacion_id=simulacion.id,
+            empresa_id=empresa_id,
+            dia_simulacion=simulacion.dia_actual,
+            datos=datos,
+        )
+        for empresa_id, datos in resumenes.items()
+    ])
+    return len(resumenes)
+
+
+def obtener_snapshot_dashboard(simulacion, empresa_id: int, commit: bool = False) -> Dict[str, Any]:
+    """
+    Parte estática del dashboard general de la empresa para el día actual
+
+    Si el día aún no tiene snapshot (primer día, simulación reiniciada) lo
+    arma y lo guarda en ese momento.
+
+    Args:
+        simulacion: Simulación activa
+        empresa_id: ID de la empresa
+        commit: Confirmar el snapshot recién creado
+
+    Returns:
+        Diccionario con las variables del template (metrica_hoy y ventas_dia
+        como objetos con atributos)
+    """
+    datos = db.session.query(DashboardSnapshot.datos).filter_by(
+        simulacion_id=simulacion.id,
+        empresa_id=empresa_id,
+        dia_simulacion=simulacion.dia_actual,
+    ).scalar()
+
+    if datos is None:
+        datos = construir_resumenes_dashboard(simulacion, [empresa_id])[empresa_id]
+        db.session.add(DashboardSnapshot(
+            simulacion_id=simulacion.id,
+            empresa_id=empresa_id,
+            dia_simulacion=simulacion.dia_actual,
+            datos=datos,
+        ))
+        if commit:
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Otro proceso lo creó al mismo tiempo; el contenido es el mismo
+                db.session.rollback()
+
+    resumen = dict(datos)
+    resumen['metrica_hoy'] = SimpleNamespace(**(datos['metrica_hoy'] or METRICA_VACIA))
+    resumen['ventas_dia'] = [SimpleNamespace(cantidad_vendida=cantidad) for cantidad in datos['ventas_dia']]
+    return resumen
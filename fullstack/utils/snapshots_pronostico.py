@@ -0,0 +1,161 @@
+"""
+Snapshots diarios de pronóstico por empresa y producto
+Se calculan al cierre del día para que Planeación y el MRP no recalculen
+los métodos de pronóstico en cada consulta
+"""
+
+from typing import Dict, List
+from sqlalchemy import func
+from extensions import db
+from models import Empresa, Producto, Venta, PronosticoSnapshot
+from utils.pronosticos import (
+    promedio_movil, suavizacion_exponencial_simple, suavizacion_exponencial_doble_holt,
+    comparar_metodos, obtener_mejor_metodo
+)
+
+
+DIAS_SERIE_SNAPSHOT = 30
+DIAS_PROYECCION_SNAPSHOT = 7
+
+
+def _dias_serie(dia_base: int, dias: int = DIAS_SERIE_SNAPSHOT) -> List[int]:
+    """Días de la ventana histórica que termina en dia_base (el día 0 no existe)."""
+    serie = []
+    dia = dia_base
+    while len(serie) < dias and dia >= -DIAS_SERIE_SNAPSHOT:
+        if dia != 0:
+            serie.append(dia)
+        dia -= 1
+    return list(reversed(serie))
+
+
+def proyectar_metodo(datos: List[float], metodo: str, parametros: Dict,
+                     dias: int = DIAS_PROYECCION_SNAPSHOT) -> List[float]:
+    """
+    Proyecta varios días con un método base, realimentando cada pronóstico
+
+    Args:
+        datos: Serie de demanda diaria
+        metodo: Nombre del método según comparar_metodos (ej. 'holt_03_02')
+        parametros: Parámetros del método
+        dias: Número de días a proyectar
+
+    Returns:
+        Lista con la demanda proyectada por día
+    """
+    serie = list(datos)
+    proyeccion = []
+    for _ in range(dias):
+        if 'promedio_movil' in metodo:
+            valor = promedio_movil(serie, parametros.get('n', 3))
+        elif 'exp_simple' in metodo:
+            valor = suavizacion_exponencial_simple(serie, parametros.get('alpha', 0.5))
+        elif 'holt' in metodo:
+            valor, _ = suavizacion_exponencial_doble_holt(
+                serie, parametros.get('alpha', 0.5), parametros.get('beta', 0.3)
+            )
+        else:
+            valor = sum(serie) / len(serie) if serie else 0.0
+        valor = max(0.0, float(valor))
+        proyeccion.append(round(valor, 2))
+        serie.append(valor)
+    return proyeccion
+
+
+def generar_snapshots_pronostico(simulacion, dia_base: int, empresas: List = None) -> int:
+    """
+    Calcula y guarda el snapshot de pronóstico de cada empresa y producto
+
+    La demanda diaria (vendido + perdido) de todas las empresas se obtiene con
+    una sola consulta agrupada. No hace commit: se ejecuta dentro del cierre
+    del día.
+
+    Args:
+        simulacion: Simulación activa
+        dia_base: Último día procesado (incluido en la serie)
+        empresas: Empresas a procesar (todas las activas de la simulación si es None)
+
+    Returns:
+        Número de snapshots generados
+    """
+    if empresas is None:
+        empresas = Empresa.query.filter_by(activa=True, simulacion_id=simulacion.id).all()
+    if not empresas:
+        return 0
+
+    productos = Producto.query.filter_by(activo=True).all()
+    empresa_ids = [e.id for e in empresas]
+    dias = _dias_serie(dia_base)
+
+    filas = db.session.query(
+        Venta.empresa_id,
+        Venta.producto_id,
+        Venta.semana_simulacion,
+        func.sum(Venta.cantidad_vendida + Venta.cantidad_perdida),
+    ).filter(
+        Venta.empresa_id.in_(empresa_ids),
+        Venta.semana_simulacion >= dias[0],
+        Venta.semana_simulacion <= dia_base,
+    ).group_by(
+        Venta.empresa_id, Venta.producto_id, Venta.semana_simulacion
+    ).all()
+
+    demanda = {}
+    for empresa_id, producto_id, dia, total in filas:
+        demanda[(empresa_id, producto_id, int(dia))] = float(total or 0)
+
+    PronosticoSnapshot.query.filter(
+        PronosticoSnapshot.simulacion_id == simulacion.id,
+        PronosticoSnapshot.empresa_id.in_(empresa_ids),
+        PronosticoSnapshot.dia_base == dia_base,
+    ).delete(synchronize_session=False)
+
+    snapshots = []
+    for empresa_id in empresa_ids:
+        for producto in productos:
+            serie = [demanda.get((empresa_id, producto.id, dia), 0.0) for dia in dias]
+            promedio = sum(serie) / len(serie) if serie else 0.0
+
+            metodos = comparar_metodos(serie)
+            mejor, datos_mejor = obtener_mejor_metodo(metodos)
+            if mejor:
+                proyeccion = proyectar_metodo(serie, mejor, datos_mejor.get('parametros', {}))
+            else:
+                proyeccion = [round(promedio, 2)] * DIAS_PROYECCION_SNAPSHOT
+
+            snapshots.append(PronosticoSnapshot(
+                simulacion_id=simulacion.id,
+                empresa_id=empresa_id,
+                producto_id=producto.id,
+                dia_base=dia_base,
+                metodos=metodos,
+                mejor_metodo=mejor,
+                pronostico_diario=proyeccion[0] if proyeccion else 0.0,
+                proyeccion=proyeccion,
+                demanda_promedio=round(promedio, 2),
+            ))
+
+    db.session.bulk_save_objects(snapshots)
+    return len(snapshots)
+
+
+def obtener_snapshots_pronostico(simulacion, empresa_id: int) -> Dict[int, PronosticoSnapshot]:
+    """
+    Retorna el snapshot vigente (cierre del día anterior) por producto_id
+
+    Args:
+        simulacion: Simulación activa
+        empresa_id: ID de la empresa
+
+    Returns:
+        Diccionario {producto_id: PronosticoSnapshot}; vacío si no hay snapshot
+    """
+    if not simulacion:
+        return {}
+
+    snapshots = PronosticoSnapshot.query.filter_by(
+        simulacion_id=simulacion.id,
+        empresa_id=empresa_id,
+        dia_base=simulacion.dia_actual - 1,
+    ).all()
+    return {s.producto_id: s for s in snapshots}
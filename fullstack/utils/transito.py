@@ -0,0 +1,151 @@
+"""
+Vista materializada del inventario en tránsito por empresa
+Compras y despachos en tránsito con el nombre del producto ya unido, agrupados
+por día de llegada y cacheados por (empresa, día, versión de escritura) hasta
+que se escriba una compra o un despacho de la empresa, también en otro proceso
+"""
+
+from types import SimpleNamespace
+from typing import Dict, Any, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Compra, DespachoRegional, Producto
+from utils.cache_respuestas import version_escritura_empresa
+
+
+_PIPELINE_CACHE = {}
+_CLAVE_SESION = 'transito_empresas_modificadas'
+_TODAS = None
+
+
+def obtener_pipeline_transito(empresa_id: int, dia_actual: int) -> Dict[str, Any]:
+    """
+    Compras y despachos en tránsito de una empresa (dos consultas, sin cargas perezosas)
+
+    Args:
+        empresa_id: ID de la empresa
+        dia_actual: Día actual de la simulación
+
+    Returns:
+        Diccionario con 'compras' (orden de llegada), 'despachos' (en tránsito),
+        'despachos_pendientes' (conteo) y 'por_dia' {día de llegada: {'compras', 'despachos'}}
+    """
+    # La versión de escritura invalida también los pipelines de otros workers
+    clave = (dia_actual, version_escritura_empresa(empresa_id))
+    cacheado = _PIPELINE_CACHE.get(empresa_id)
+    if cacheado and cacheado[0] == clave:
+        return cacheado[1]
+
+    compras = tuple(
+        SimpleNamespace(
+            id=compra.id,
+            producto_id=compra.producto_id,
+            producto=SimpleNamespace(
+                nombre=producto.nombre,
+                codigo=producto.codigo,
+                tiempo_entrega=producto.tiempo_entrega,
+            ),
+            cantidad=compra.cantidad,
+            costo_unitario=compra.costo_unitario,
+            costo_total=compra.costo_total,
+            semana_orden=compra.semana_orden,
+            semana_entrega=compra.semana_entrega,
+            created_at=compra.created_at,
+            estado=compra.estado,
+        )
+        for compra, producto in db.session.query(Compra, Producto).join(
+            Producto, Producto.id == Compra.producto_id
+        ).filter(
+            Compra.empresa_id == empresa_id,
+            Compra.estado == 'en_transito',
+        ).order_by(Compra.semana_entrega, Compra.id).all()
+    )
+
+    despachos = []
+    despachos_pendientes = 0
+    for despacho, nombre in db.session.query(DespachoRegional, Producto.nombre).join(
+        Producto, Producto.id == DespachoRegional.producto_id
+    ).filter(
+        DespachoRegional.empresa_id == empresa_id,
+        DespachoRegional.estado.in_(['pendiente', 'en_transito']),
+    ).order_by(DespachoRegional.semana_entrega_estimado, DespachoRegional.id).all():
+        if despacho.estado == 'pendiente':
+            despachos_pendientes += 1
+            continue
+        vehiculo = 'N/A'
+        if isinstance(despacho.ventas_asociadas, dict):
+            vehiculo = despacho.ventas_asociadas.get('vehiculo', vehiculo)
+        despachos.append(SimpleNamespace(
+            id=despacho.id,
+            producto_id=despacho.producto_id,
+            producto=SimpleNamespace(nombre=nombre),
+            cantidad=despacho.cantidad,
+            region=despacho.region,
+            semana_despacho=despacho.semana_despacho,
+            semana_entrega_estimado=despacho.semana_entrega_estimado,
+            costo_transporte=despacho.costo_transporte,
+            vehiculo=vehiculo,
+        ))
+    despachos = tuple(despachos)
+
+    por_dia = {}
+    for compra in compras:
+        por_dia.setdefault(compra.semana_entrega, {'compras': [], 'despachos': []})['compras'].append(compra)
+    for despacho in despachos:
+        por_dia.setdefault(despacho.semana_entrega_estimado, {'compras': [], 'despachos': []})['despachos'].append(despacho)
+
+    pipeline = {
+        'compras': compras,
+        'despachos': despachos,
+        'despachos_pendientes': despachos_pendientes,
+        'por_dia': dict(sorted(por_dia.items())),
+    }
+    _PIPELINE_CACHE[empresa_id] = (clave, pipeline)
+    return pipeline
+
+
+def invalidar_pipeline_transito(empresa_id: Optional[int] = _TODAS):
+    """Descarta el pipeline cacheado de una empresa (o de todas)."""
+    if empresa_id is _TODAS:
+        _PIPELINE_CACHE.clear()
+    else:
+        _PIPELINE_CACHE.pop(empresa_id, None)
+
+
+def marcar_transito_modificado(empresa_id: Optional[int] = _TODAS, session=None):
+    """
+    Marca el pipeline de una empresa para invalidarse al confirmar la transacción
+
+    Las escrituras por la unidad de trabajo del ORM se detectan solas; esto es
+    para inserciones en lote (bulk_save_objects) que no pasan por el flush.
+    """
+    session = session or db.session
+    session.info.setdefault(_CLAVE_SESION, set()).add(empresa_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_cambios_transito(session, _flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Compra, DespachoRegional)):
+            marcar_transito_modificado(obj.empresa_id, session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _detectar_escrituras_masivas(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (Compra, DespachoRegional):
+        marcar_transito_modificado(_TODAS, orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_al_confirmar(session):
+    for empresa_id in session.info.pop(_CLAVE_SESION, ()):
+        invalidar_pipeline_transito(empresa_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_marcas(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)
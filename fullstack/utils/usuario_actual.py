@@ -0,0 +1,182 @@
+"""
+Usuario autenticado liviano para Flask-Login
+Mantiene en memoria del proceso los campos de autorización de cada usuario
+(rol, empresa, tipo, super admin, activo) y solo carga la fila completa de
+Usuario cuando la vista necesita otro atributo o modificarlo. Cada escritura
+confirmada sobre un usuario renueva su archivo de versión, que todos los
+procesos comparan antes de usar su copia
+"""
+
+import os
+import time
+from typing import NamedTuple, Optional
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Empresa, Usuario
+
+
+# Relectura forzada para cambios hechos fuera de la aplicación (consola, SQL directo)
+SEGUNDOS_MAXIMOS_CACHE = 30
+_CLAVE_SESION = 'usuarios_modificados'
+_TODOS = None
+
+
+class DatosUsuario(NamedTuple):
+    """Campos de autorización cacheados de un usuario."""
+    id: int
+    rol: Optional[str]
+    empresa_id: Optional[int]
+    tipo_usuario: Optional[str]
+    es_super_admin: bool
+    activo: bool
+
+
+_USUARIOS_CACHE = {}
+
+
+def _ruta_version(usuario_id: Optional[int]) -> str:
+    nombre = 'todos' if usuario_id is _TODOS else f'usuario_{int(usuario_id)}'
+    return os.path.join(current_app.config['USUARIOS_VERSION_DIR'], f'{nombre}.version')
+
+
+def _leer_version(usuario_id: Optional[int]):
+    """Versión compartida entre procesos (una llamada a stat, sin consultas)."""
+    try:
+        estado = os.stat(_ruta_version(usuario_id))
+    except OSError:
+        return None
+    return (estado.st_ino, estado.st_mtime_ns)
+
+
+def _renovar_version(usuario_id: Optional[int]):
+    ruta = _ruta_version(usuario_id)
+    temporal = f'{ruta}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(temporal, 'w') as archivo:
+            archivo.write(f'{time.time_ns()}\n')
+        os.replace(temporal, ruta)
+    except OSError:
+        current_app.logger.warning('No se pudo renovar la versión de usuarios en %s', ruta)
+
+
+class UsuarioActual(UserMixin):
+    """
+    current_user de cada solicitud
+
+    Los campos de DatosUsuario se responden sin consultar la base; cualquier
+    otro atributo (nombre_completo, password, foto_perfil...) se lee o se
+    escribe sobre la fila de Usuario, que se carga la primera vez que se pide.
+    """
+
+    def __init__(self, datos: DatosUsuario):
+        object.__setattr__(self, '_datos', datos)
+        object.__setattr__(self, '_usuario', None)
+
+    id = property(lambda self: self._datos.id)
+    rol = property(lambda self: self._datos.rol)
+    empresa_id = property(lambda self: self._datos.empresa_id)
+    tipo_usuario = property(lambda self: self._datos.tipo_usuario)
+    es_super_admin = property(lambda self: self._datos.es_super_admin)
+    activo = property(lambda self: self._datos.activo)
+
+    @property
+    def usuario(self) -> Usuario:
+        """Fila completa de Usuario en la sesión de la solicitud."""
+        if self._usuario is None:
+            object.__setattr__(self, '_usuario', db.session.get(Usuario, self._datos.id))
+        return self._usuario
+
+    @property
+    def empresa(self) -> Optional[Empresa]:
+        """Empresa asignada, sin pasar por la fila del usuario."""
+        if self._usuario is not None:
+            return self._usuario.empresa
+        if not self._datos.empresa_id:
+            return None
+        return db.session.get(Empresa, self._datos.empresa_id)
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+        return getattr(self.usuario, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self.usuario, nombre, valor)
+
+    def __repr__(self):
+        return f'<UsuarioActual {self._datos.id} - {self._datos.rol if self._datos.rol else "Sin rol"}>'
+
+
+def cargar_usuario_actual(user_id) -> Optional[UsuarioActual]:
+    """
+    user_loader de Flask-Login: a lo sumo una consulta de seis columnas
+
+    Args:
+        user_id: ID guardado en la sesión firmada
+
+    Returns:
+        UsuarioActual o None si el usuario ya no existe
+    """
+    usuario_id = int(user_id)
+    # Leída antes de la consulta: la fila cargada es al menos tan nueva como la versión
+    version = (_leer_version(usuario_id), _leer_version(_TODOS))
+    cacheado = _USUARIOS_CACHE.get(usuario_id)
+    if cacheado and cacheado[1] == version and time.monotonic() - cacheado[0] < SEGUNDOS_MAXIMOS_CACHE:
+        return UsuarioActual(cacheado[2])
+
+    fila = db.session.query(
+        *[getattr(Usuario, campo) for campo in DatosUsuario._fields]
+    ).filter(Usuario.id == usuario_id).first()
+    if fila is None:
+        _USUARIOS_CACHE.pop(usuario_id, None)
+        return None
+
+    datos = DatosUsuario(*fila)
+    _USUARIOS_CACHE[usuario_id] = (time.monotonic(), version, datos)
+    return UsuarioActual(datos)
+
+
+def invalidar_usuario_actual(usuario_id: Optional[int] = _TODOS):
+    """Descarta los campos cacheados de un usuario (o de todos) en todos los procesos."""
+    if usuario_id is _TODOS:
+        _USUARIOS_CACHE.clear()
+    else:
+        _USUARIOS_CACHE.pop(int(usuario_id), None)
+    _renovar_version(usuario_id)
+
+
+def marcar_usuario_modificado(usuario_id: Optional[int] = _TODOS, session=None):
+    """Marca un usuario para invalidarse al confirmar la transacción."""
+    session = session or db.session
+    session.info.setdefault(_CLAVE_SESION, set()).add(usuario_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _detectar_cambios_usuarios(session, _flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Usuario):
+            marcar_usuario_modificado(obj.id, session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _detectar_escrituras_masivas(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Usuario:
+        marcar_usuario_modificado(_TODOS, orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_al_confirmar(session):
+    for usuario_id in session.info.pop(_CLAVE_SESION, ()):
+        invalidar_usuario_actual(usuario_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_marcas(session, _previous_transaction):
+    session.info.pop(_CLAVE_SESION, None)